@@ -2,6 +2,7 @@
 Точка входа: ``python -m manga_downloader``.
 """
 
+import multiprocessing
 import sys
 
 from PyQt5.QtWidgets import QApplication
@@ -10,6 +11,9 @@ from manga_downloader.gui import DownloaderApp
 
 
 def main() -> None:
+    # Движок скачивания работает в дочернем процессе; в собранном EXE
+    # без freeze_support() дочерний процесс запустил бы GUI заново.
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     window = DownloaderApp()
     window.show()
@@ -0,0 +1,156 @@
+"""
+Быстрая проверка авторизации по cookies с кэшированием вердикта.
+
+Без неё об устаревших cookies приложение узнаёт только после провала
+разбора страницы или скачивания -- и только после попыток с cookies и без.
+Один лёгкий запрос к странице, доступной лишь вошедшему пользователю,
+отвечает на вопрос заранее. Вердикт живёт ``AUTH_PROBE_TTL`` секунд и
+привязан к отпечатку авторизационных cookies: новые cookies проверяются
+заново сразу.
+"""
+
+from __future__ import annotations
+
+import codecs
+import hashlib
+import logging
+import time
+from threading import Lock
+from typing import Any
+
+import curl_cffi
+
+from manga_downloader.cancellation import CancelToken
+from manga_downloader.clearance import refresh_clearance
+from manga_downloader.config import (
+    AUTH_PROBE_MARKER,
+    AUTH_PROBE_TTL,
+    AUTH_PROBE_URL,
+    BROWSE_HEADERS,
+    IMPORTANT_COOKIE_NAMES,
+)
+from manga_downloader.cookies import CookieManager
+from manga_downloader.metrics import host_timeouts
+from manga_downloader.rate_limit import site_limiter
+from manga_downloader.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# --- Вердикты ---
+AUTH_OK = "ok"                # cookies авторизуют
+AUTH_EXPIRED = "expired"      # сайт отправил на вход (/login или 401)
+AUTH_CHALLENGE = "challenge"  # Cloudflare не пускает: нужен свежий cf_clearance
+AUTH_NO_MARKER = "no_marker"  # 200 без маркера: форма входа или другая разметка
+AUTH_UNKNOWN = "unknown"      # сеть или сайт недоступны -- не кэшируется
+
+_CHUNK_SIZE = 16 * 1024
+_READ_LIMIT = 512 * 1024  # маркер ищется в шапке, дальше не читаем
+
+
+class AuthProbe:
+    """Кэш вердиктов о cookies; одновременные проверки схлопываются в одну.
+
+    Потокобезопасен: один экземпляр делят все потоки процесса.
+    """
+
+    def __init__(self, ttl: float = AUTH_PROBE_TTL) -> None:
+        self._ttl = ttl
+        self._verdicts: dict[str, tuple[str, float]] = {}
+        self._lock = Lock()
+        self._flights: SingleFlight[str] = SingleFlight()
+
+    # -- Публичный интерфейс ---------------------------------------------------
+
+    def check(self, cookie_manager: CookieManager, cancel: CancelToken | None = None) -> str:
+        """Вердикт для cookies менеджера: из кэша или одним запросом."""
+        key = _fingerprint(cookie_manager)
+        with self._lock:
+            cached = self._verdicts.get(key)
+        if cached is not None and time.monotonic() - cached[1] < self._ttl:
+            return cached[0]
+        return self._flights.do(key, lambda: self._probe(key, cookie_manager, cancel))
+
+    # -- Внутренние методы -----------------------------------------------------
+
+    def _probe(self, key: str, cookie_manager: CookieManager, cancel: CancelToken | None) -> str:
+        if not site_limiter.acquire(cancel):
+            return AUTH_UNKNOWN
+        session = curl_cffi.Session()
+        session.headers.update(BROWSE_HEADERS)
+        cookie_manager.apply_to_session(session)
+        try:
+            verdict = self._request(session)
+        except Exception as exc:
+            logger.debug("Проверка авторизации не удалась: %s", exc)
+            verdict = AUTH_UNKNOWN
+        finally:
+            session.close()
+
+        logger.debug("Проверка авторизации: %s", verdict)
+        if verdict != AUTH_UNKNOWN:
+            with self._lock:
+                self._verdicts[key] = (verdict, time.monotonic())
+        return verdict
+
+    @staticmethod
+    def _request(session: curl_cffi.Session) -> str:
+        response = session.get(
+            AUTH_PROBE_URL,
+            impersonate="chrome",
+            timeout=host_timeouts.request_timeout(AUTH_PROBE_URL),
+            stream=True,
+        )
+        try:
+            if response.status_code in (403, 503):
+                return AUTH_CHALLENGE
+            if response.status_code == 401 or "/login" in str(response.url):
+                return AUTH_EXPIRED
+            if response.status_code != 200:
+                return AUTH_UNKNOWN
+            # Без маркера это может быть и другая разметка страницы, а не
+            # выход из аккаунта: работу не останавливаем, но вердикт кэшируем,
+            # чтобы не повторять запрос на каждом тике.
+            return AUTH_OK if _has_marker(response) else AUTH_NO_MARKER
+        finally:
+            response.close()
+
+
+def ensure_auth(cookie_manager: CookieManager, cancel: CancelToken | None = None) -> str:
+    """Проверяет cookies; если не пускает Cloudflare -- обновляет допуск.
+
+    После успешного обновления ``cf_clearance`` отпечаток cookies меняется,
+    так что повторная проверка идёт новым запросом.
+    """
+    verdict = auth_probe.check(cookie_manager, cancel)
+    if verdict == AUTH_CHALLENGE and refresh_clearance(cookie_manager):
+        verdict = auth_probe.check(cookie_manager, cancel)
+    return verdict
+
+
+def _has_marker(response: Any) -> bool:
+    """Ищет маркер вошедшего пользователя, читая ответ потоком."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    tail = ""
+    read = 0
+    for chunk in response.iter_content(chunk_size=_CHUNK_SIZE):
+        text = tail + decoder.decode(chunk)
+        if AUTH_PROBE_MARKER in text:
+            return True
+        tail = text[-len(AUTH_PROBE_MARKER):]
+        read += len(chunk)
+        if read >= _READ_LIMIT:
+            break
+    return False
+
+
+def _fingerprint(cookie_manager: CookieManager) -> str:
+    values = sorted(
+        f"{c.get('name')}={c.get('value')}"
+        for c in cookie_manager.cookies
+        if c.get("name") in IMPORTANT_COOKIE_NAMES
+    )
+    return hashlib.sha1("\n".join(values).encode("utf-8")).hexdigest()
+
+
+# Общий на процесс: проверка обновлений и режим библиотеки видят один вердикт.
+auth_probe = AuthProbe()
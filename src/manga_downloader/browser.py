@@ -0,0 +1,130 @@
+"""
+Запуск Chrome для входа на сайт и восстановления сессии.
+
+Chrome запускается с постоянным профилем ``CHROME_PROFILE_DIR``: cookies
+и авторизация живут в самом профиле, и браузер сразу открывает нужную
+страницу уже вошедшим. Сохранённые cookies, которых в профиле нет или
+которые в файле свежее, кладутся в браузер одной командой CDP
+``Network.setCookies`` до первой навигации -- без захода на главную,
+``delete_all_cookies``, поштучных ``add_cookie`` и перезагрузки страницы.
+Иначе устаревшие cookies профиля потом перезаписали бы файл.
+"""
+
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Any
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+
+from manga_downloader.config import (
+    AUTH_COOKIES,
+    BASE_URL,
+    CHROME_PROFILE_DIR,
+    COOKIE_DOMAIN,
+    USER_AGENT,
+)
+from manga_downloader.cookies import CookieManager
+
+logger = logging.getLogger(__name__)
+
+_SAME_SITE = {"strict": "Strict", "lax": "Lax", "none": "None"}
+
+
+def open_chrome(*, detach: bool = False, profile: Path | None = CHROME_PROFILE_DIR) -> webdriver.Chrome:
+    """Запускает Chrome с профилем *profile* (``None`` -- временный профиль).
+
+    Профиль одновременно может открыть только один Chrome; если он занят
+    (браузер открыт другим окном приложения), запускается временный.
+    """
+    if profile is not None:
+        try:
+            profile.mkdir(parents=True, exist_ok=True)
+            return webdriver.Chrome(options=_options(detach, profile))
+        except (OSError, WebDriverException) as exc:
+            logger.warning("Профиль Chrome %s недоступен, запуск без него: %s", profile, exc)
+    return webdriver.Chrome(options=_options(detach, None))
+
+
+def restore_session(driver: webdriver.Chrome, cookie_manager: CookieManager) -> bool:
+    """Готовит авторизацию до первой навигации.
+
+    Кладёт через CDP сохранённые cookies, которых в профиле нет или которые
+    в файле свежее (истекают позже): их могли обновить другой процесс или
+    фоновое продление ``cf_clearance``. Драйвер без CDP для неавторизованного
+    профиля открывает главную и добавляет cookies по одному. Возвращает
+    ``True``, если профиль был авторизован сам.
+    """
+    profile = _site_cookies(driver)
+    authorized = all(name in profile for name in AUTH_COOKIES)
+    fresh = [
+        c for c in cookie_manager.cookies
+        if c.get("name") and _is_newer(c, profile.get(c["name"]))
+    ]
+    if not fresh:
+        return authorized
+    try:
+        driver.execute_cdp_cmd("Network.setCookies", {"cookies": [_cdp_cookie(c) for c in fresh]})
+    except WebDriverException as exc:
+        logger.debug("Network.setCookies недоступен: %s", exc)
+        if not authorized:
+            driver.get(BASE_URL)
+            cookie_manager.apply_to_driver(driver, COOKIE_DOMAIN)
+    return authorized
+
+
+def _site_cookies(driver: webdriver.Chrome) -> dict[str, dict[str, Any]]:
+    """Cookies сайта в браузере по имени (пусто, если CDP недоступен)."""
+    try:
+        result = driver.execute_cdp_cmd("Network.getCookies", {"urls": [BASE_URL]})
+    except WebDriverException:
+        return {}
+    return {c["name"]: c for c in result.get("cookies", []) if c.get("name")}
+
+
+def _is_newer(saved: dict[str, Any], current: dict[str, Any] | None) -> bool:
+    """Свежее ли cookie из файла, чем cookie профиля с тем же именем.
+
+    При разных значениях свежее то, что истекает позже; cookie сессии
+    (без срока) из файла профиль не перебивает.
+    """
+    if current is None:
+        return True
+    if saved.get("value") == current.get("value"):
+        return False
+    return float(saved.get("expiry") or 0) > float(current.get("expires") or 0)
+
+
+def _options(detach: bool, profile: Path | None) -> Options:
+    options = Options()
+    options.add_argument(f"--user-agent={USER_AGENT}")
+    options.add_argument("--log-level=3")
+    if profile is not None:
+        options.add_argument(f"--user-data-dir={profile.resolve()}")
+    options.add_experimental_option("detach", detach)
+    options.add_experimental_option("excludeSwitches", ["enable-logging"])
+    return options
+
+
+def _cdp_cookie(cookie: dict[str, Any]) -> dict[str, Any]:
+    """Cookie в формате Selenium / файла cookies -> параметр ``Network.setCookies``."""
+    result: dict[str, Any] = {
+        "name": cookie["name"],
+        "value": cookie.get("value", ""),
+        "domain": cookie.get("domain") or COOKIE_DOMAIN,
+        "path": cookie.get("path") or "/",
+    }
+    if cookie.get("secure"):
+        result["secure"] = True
+    if cookie.get("httpOnly"):
+        result["httpOnly"] = True
+    same_site = _SAME_SITE.get(str(cookie.get("sameSite", "")).lower())
+    # SameSite=None без Secure Chrome отвергает -- вместе со всей командой.
+    if same_site is not None and (same_site != "None" or result.get("secure")):
+        result["sameSite"] = same_site
+    if cookie.get("expiry"):
+        result["expires"] = float(cookie["expiry"])
+    return result
@@ -0,0 +1,34 @@
+"""
+Токен отмены, общий для всех ожиданий и передач одной загрузки.
+
+Вместо ``time.sleep`` загрузка ждёт на токене: отмена будит её сразу,
+а не после паузы или долгого сетевого запроса.
+"""
+
+from __future__ import annotations
+
+from threading import Event
+from typing import Any
+
+
+class CancelToken:
+    """Обёртка над событием отмены.
+
+    Принимает любое событие с ``set``/``is_set``/``wait`` -- в том числе
+    :func:`multiprocessing.Event`, чтобы отмена из GUI доходила до
+    дочернего процесса.
+    """
+
+    def __init__(self, event: Any | None = None) -> None:
+        self._event = event if event is not None else Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    def wait(self, seconds: float) -> bool:
+        """Пауза на *seconds*, прерываемая отменой. ``True``, если отменено."""
+        return bool(self._event.wait(seconds))
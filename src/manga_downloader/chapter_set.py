@@ -0,0 +1,138 @@
+"""
+Множество номеров глав в виде отрезков (run-length).
+
+Скачанные главы обычно идут сплошными кусками, поэтому тысячи номеров
+хранятся как несколько пар ``[начало, конец]``. Объединение идёт слиянием
+отрезков за O(n + m), пропуски и недостающие главы считаются по отрезкам,
+не разворачивая их в списки.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_right
+from typing import Any, Iterable, Iterator
+
+Range = tuple[int, int]
+
+
+class ChapterSet:
+    """Неизменяемое множество порядковых номеров глав (от 1).
+
+    Внутри -- отсортированные непересекающиеся и несоприкасающиеся
+    отрезки ``(start, end)`` включительно.
+    """
+
+    __slots__ = ("_ranges",)
+
+    def __init__(self, numbers: Iterable[int] = ()) -> None:
+        self._ranges: tuple[Range, ...] = _normalize((n, n) for n in numbers)
+
+    @classmethod
+    def from_ranges(cls, ranges: Iterable[Iterable[int]]) -> ChapterSet:
+        result = cls()
+        result._ranges = _normalize((int(a), int(b)) for a, b in ranges)
+        return result
+
+    @classmethod
+    def from_json(cls, value: Any) -> ChapterSet:
+        """Читает сохранённое значение: отрезки или старый список номеров."""
+        if not value:
+            return cls()
+        if isinstance(value[0], int):
+            return cls(value)
+        return cls.from_ranges(value)
+
+    def to_json(self) -> list[list[int]]:
+        return [[a, b] for a, b in self._ranges]
+
+    # -- Запросы ---------------------------------------------------------------
+
+    @property
+    def ranges(self) -> tuple[Range, ...]:
+        return self._ranges
+
+    def __len__(self) -> int:
+        return sum(b - a + 1 for a, b in self._ranges)
+
+    def __bool__(self) -> bool:
+        return bool(self._ranges)
+
+    def __contains__(self, number: object) -> bool:
+        if not isinstance(number, int):
+            return False
+        i = bisect_right(self._ranges, (number, float("inf"))) - 1
+        return i >= 0 and self._ranges[i][0] <= number <= self._ranges[i][1]
+
+    def __iter__(self) -> Iterator[int]:
+        for a, b in self._ranges:
+            yield from range(a, b + 1)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, ChapterSet) and self._ranges == other._ranges
+
+    def __repr__(self) -> str:
+        return f"ChapterSet({self.format()!r})"
+
+    def max(self) -> int:
+        """Наибольший номер или 0 для пустого множества."""
+        return self._ranges[-1][1] if self._ranges else 0
+
+    def union(self, other: ChapterSet | Iterable[int]) -> ChapterSet:
+        """Объединение слиянием отрезков."""
+        if not isinstance(other, ChapterSet):
+            other = ChapterSet(other)
+        result = ChapterSet()
+        result._ranges = _merge_sorted(self._ranges, other._ranges)
+        return result
+
+    __or__ = union
+
+    def missing(self, total: int) -> ChapterSet:
+        """Номера от 1 до *total*, которых нет в множестве."""
+        gaps: list[Range] = []
+        expected = 1
+        for a, b in self._ranges:
+            if a > total:
+                break
+            if a > expected:
+                gaps.append((expected, a - 1))
+            expected = max(expected, b + 1)
+        if expected <= total:
+            gaps.append((expected, total))
+        result = ChapterSet()
+        result._ranges = tuple(gaps)
+        return result
+
+    def gaps(self) -> ChapterSet:
+        """Пропуски внутри множества (до его наибольшего номера)."""
+        return self.missing(self.max())
+
+    def format(self, limit: int | None = None) -> str:
+        """``"1–5, 7, 9–12"``; при *limit* лишние отрезки заменяются на «…»."""
+        shown = self._ranges if limit is None else self._ranges[:limit]
+        parts = [str(a) if a == b else f"{a}–{b}" for a, b in shown]
+        if len(shown) < len(self._ranges):
+            parts.append("…")
+        return ", ".join(parts)
+
+
+def _normalize(ranges: Iterable[Range]) -> tuple[Range, ...]:
+    return _merge_sorted(tuple(sorted(r for r in ranges if r[0] <= r[1])), ())
+
+
+def _merge_sorted(left: tuple[Range, ...], right: tuple[Range, ...]) -> tuple[Range, ...]:
+    """Сливает два отсортированных списка отрезков, склеивая соседние."""
+    merged: list[list[int]] = []
+    i = j = 0
+    while i < len(left) or j < len(right):
+        if j >= len(right) or (i < len(left) and left[i] <= right[j]):
+            a, b = left[i]
+            i += 1
+        else:
+            a, b = right[j]
+            j += 1
+        if merged and a <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], b)
+        else:
+            merged.append([a, b])
+    return tuple((a, b) for a, b in merged)
@@ -0,0 +1,206 @@
+"""
+Кэш Cloudflare-допуска (``cf_clearance``) и его фоновое обновление.
+
+Cloudflare выдаёт ``cf_clearance`` на ограниченное время и привязывает его
+к User-Agent, с которым был пройден challenge. Здесь хранится срок действия
+и User-Agent текущего допуска, а :class:`ClearanceRefresher` обновляет его
+заранее через cloudscraper -- без запуска Selenium посреди скачивания.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from threading import Event, Thread
+from typing import TYPE_CHECKING, Any
+
+import cloudscraper
+
+from manga_downloader.config import (
+    BASE_URL,
+    BROWSE_HEADERS,
+    CLEARANCE_CHECK_INTERVAL,
+    CLEARANCE_COOKIE,
+    CLEARANCE_FILE,
+    CLEARANCE_REFRESH_MARGIN,
+    CLEARANCE_RETRY_DELAY,
+    USER_AGENT,
+)
+from manga_downloader.metrics import host_timeouts
+from manga_downloader.utils import atomic_write_json
+
+if TYPE_CHECKING:
+    from manga_downloader.cookies import CookieManager
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ClearanceInfo:
+    """Текущий допуск: значение cookie, срок и User-Agent выдачи."""
+
+    value: str
+    user_agent: str
+    expires_at: float = 0.0  # Unix time; 0 -- срок неизвестен
+    issued_at: float = 0.0
+
+    def seconds_left(self, now: float | None = None) -> float | None:
+        """Секунд до истечения или ``None``, если срок неизвестен."""
+        if not self.expires_at:
+            return None
+        return self.expires_at - (now if now is not None else time.time())
+
+
+class ClearanceCache:
+    """JSON-файл с метаданными ``cf_clearance``."""
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path or CLEARANCE_FILE
+        self._info: ClearanceInfo | None = None
+        self.load()
+
+    @property
+    def info(self) -> ClearanceInfo | None:
+        return self._info
+
+    def load(self) -> bool:
+        """Загружает кэш из файла. Возвращает ``True`` при успехе."""
+        if not self.path.exists():
+            return False
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                self._info = ClearanceInfo(**json.load(fh))
+            return True
+        except Exception as exc:
+            logger.error("Не удалось прочитать кэш cf_clearance: %s", exc)
+            return False
+
+    def save(self) -> bool:
+        """Сохраняет кэш в файл. Возвращает ``True`` при успехе."""
+        if self._info is None:
+            return False
+        try:
+            atomic_write_json(self.path, asdict(self._info), indent=2, ensure_ascii=False)
+            return True
+        except Exception as exc:
+            logger.error("Не удалось сохранить кэш cf_clearance: %s", exc)
+            return False
+
+    def record(self, value: str, user_agent: str, expires_at: float = 0.0) -> None:
+        """Запоминает новый допуск и сохраняет файл."""
+        if self._info is not None and self._info.value == value:
+            if expires_at:
+                self._info.expires_at = expires_at
+            self._info.user_agent = user_agent
+        else:
+            self._info = ClearanceInfo(
+                value=value,
+                user_agent=user_agent,
+                expires_at=expires_at,
+                issued_at=time.time(),
+            )
+        self.save()
+
+    def record_from_cookies(self, cookies: list[dict[str, Any]], user_agent: str) -> bool:
+        """Извлекает ``cf_clearance`` из списка cookies (формат Selenium).
+
+        Возвращает ``True``, если допуск найден.
+        """
+        for cookie in cookies:
+            if cookie.get("name") == CLEARANCE_COOKIE and cookie.get("value"):
+                self.record(cookie["value"], user_agent, float(cookie.get("expiry") or 0))
+                return True
+        return False
+
+    def user_agent_for(self, value: str) -> str | None:
+        """User-Agent, для которого выдан допуск *value* (если известен)."""
+        if self._info is not None and self._info.value == value:
+            return self._info.user_agent
+        return None
+
+    def needs_refresh(self, margin: float = CLEARANCE_REFRESH_MARGIN) -> bool:
+        """``True``, если допуск истекает в ближайшие *margin* секунд."""
+        if self._info is None:
+            return False
+        left = self._info.seconds_left()
+        return left is not None and left < margin
+
+
+def refresh_clearance(cookie_manager: CookieManager) -> bool:
+    """Получает свежий ``cf_clearance`` через cloudscraper.
+
+    Новый cookie попадает в *cookie_manager* (и в файл cookies), а его
+    срок и User-Agent -- в кэш допуска того же менеджера. Cloudflare
+    привязывает допуск к User-Agent, поэтому случайный UA cloudscraper
+    заменяется на ``USER_AGENT``, с которым ходят все сессии приложения.
+    Возвращает ``True``, если Cloudflare выдал новый допуск.
+    """
+    scraper = cloudscraper.create_scraper(
+        browser={
+            "browser": "chrome",
+            "platform": "windows",
+            "desktop": True,
+            "mobile": False,
+        }
+    )
+    scraper.headers["User-Agent"] = USER_AGENT
+    try:
+        old_value = None
+        for cookie in cookie_manager.cookies:
+            if cookie.get("name") == CLEARANCE_COOKIE:
+                old_value = cookie.get("value")
+            else:
+                scraper.cookies.set(cookie["name"], cookie["value"])
+
+        response = scraper.get(
+            BASE_URL, headers=BROWSE_HEADERS, timeout=host_timeouts.request_timeout(BASE_URL),
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}")
+
+        fresh = next(
+            (c for c in scraper.cookies if c.name == CLEARANCE_COOKIE), None,
+        )
+        if fresh is None or not fresh.value or fresh.value == old_value:
+            logger.debug("Cloudflare не выдал нового cf_clearance")
+            return False
+
+        expires_at = float(fresh.expires or 0)
+        cookie_manager.set_cookie(CLEARANCE_COOKIE, fresh.value, expiry=expires_at)
+        cookie_manager.save_all()
+        cookie_manager.clearance.record(fresh.value, USER_AGENT, expires_at)
+        logger.info("cf_clearance обновлён заранее")
+        return True
+    except Exception as exc:
+        logger.debug("Не удалось обновить cf_clearance: %s", exc)
+        return False
+    finally:
+        scraper.close()
+
+
+class ClearanceRefresher(Thread):
+    """Фоновый поток, продлевающий ``cf_clearance`` до его истечения.
+
+    Новый допуск попадает в менеджер cookies; живые HTTP-сессии
+    подхватывают его через :meth:`CookieManager.sync_session`.
+    """
+
+    def __init__(self, cookie_manager: CookieManager) -> None:
+        super().__init__(name="clearance-refresher", daemon=True)
+        self._cookie_manager = cookie_manager
+        self._stop_event = Event()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def run(self) -> None:
+        delay = 0.0
+        while not self._stop_event.wait(delay):
+            delay = CLEARANCE_CHECK_INTERVAL
+            if not self._cookie_manager.clearance.needs_refresh():
+                continue
+            if not refresh_clearance(self._cookie_manager):
+                delay = CLEARANCE_RETRY_DELAY
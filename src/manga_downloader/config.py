@@ -13,10 +13,19 @@ if getattr(sys, "frozen", False):
 else:
     BASE_DIR = Path(__file__).parent.parent.parent
 COOKIE_FILE = BASE_DIR / "comx_life_cookies_v3.json"
-HISTORY_FILE = BASE_DIR / "manga_history.json"
+HISTORY_DB = BASE_DIR / "manga_history.db"
+HISTORY_FILE = BASE_DIR / "manga_history.json"  # старый формат, импортируется в HISTORY_DB
+HISTORY_FLUSH_INTERVAL = 5  # секунд между отложенными записями истории на диск
+CLEARANCE_FILE = BASE_DIR / "cf_clearance.json"
+PAGE_CACHE_DB = BASE_DIR / "page_cache.db"
 DOWNLOADS_DIR = BASE_DIR / "downloads"
 TEMP_DIR = BASE_DIR / "combined_cbz_temp"
 OUTPUT_DIR = BASE_DIR / "output"
+# Постоянный профиль Chrome: вход на сайт переживает перезапуск браузера.
+# None -- каждый раз чистый временный профиль.
+CHROME_PROFILE_DIR = BASE_DIR / "chrome_profile"
+# Сколько ждать, пока другой процесс отпустит файл cookies.
+FILE_LOCK_TIMEOUT = 10
 
 # --- Сайт ---
 BASE_URL = "https://com-x.life"
@@ -60,16 +69,93 @@ BROWSE_HEADERS = {
 }
 
 # --- Таймауты (секунды) ---
-HTTP_TIMEOUT = 30
-DOWNLOAD_TIMEOUT = 60
+# Сетевые таймауты адаптивные (manga_downloader/metrics.py): первый байт ждём
+# TTFB_TIMEOUT_FACTOR × p95 по хосту, а зависшую передачу определяем по
+# скорости ниже STALL_RATE_FRACTION от медианной (но не ниже STALL_MIN_RATE).
+TTFB_TIMEOUT_DEFAULT = 20  # пока замеров меньше METRICS_MIN_SAMPLES
+TTFB_TIMEOUT_MIN = 5
+TTFB_TIMEOUT_MAX = 45
+TTFB_TIMEOUT_FACTOR = 3
+STALL_WINDOW = 10
+STALL_MIN_RATE = 8 * 1024  # байт/с
+STALL_RATE_FRACTION = 0.05
+METRICS_WINDOW = 50
+METRICS_MIN_SAMPLES = 5
 LOGIN_WAIT_TIMEOUT = 300  # 5 минут на ручной логин
 PAGE_LOAD_DELAY = 3
 POLL_INTERVAL = 0.5
+BROWSER_EVENT_WAIT = 2  # long-poll событий страницы внутри браузера, сек
+PAGE_ANALYSIS_WORKERS = 2  # потоков фонового разбора страниц, открытых в браузере
 REQUEST_DELAY = 1.5
 FALLBACK_DELAY = 1
 
+# --- Сегментированное скачивание ---
+# Архивы от SEGMENT_MIN_SIZE байт при поддержке Range качаются частями.
+SEGMENT_COUNT = 4
+SEGMENT_MIN_SIZE = 64 * 1024 * 1024
+
+# --- Хеджирование загрузки глав ---
+# Если первый метод не начал отдавать файл за HEDGE_PERCENTILE времени до
+# первого байта (по последним HEDGE_WINDOW главам), параллельно стартует второй.
+HEDGE_ENABLED = False
+HEDGE_PERCENTILE = 0.9
+HEDGE_WINDOW = 30
+HEDGE_MIN_SAMPLES = 5
+HEDGE_MIN_DELAY = 2.0  # секунд
+
+# --- Cloudflare clearance ---
+CLEARANCE_COOKIE = "cf_clearance"
+CLEARANCE_REFRESH_MARGIN = 15 * 60  # обновлять, если до истечения меньше 15 минут
+CLEARANCE_CHECK_INTERVAL = 60
+CLEARANCE_RETRY_DELAY = 5 * 60
+
+# --- Проверка авторизации ---
+# Лёгкий запрос к странице, доступной только вошедшему пользователю,
+# до массовых запросов. Вердикт кэшируется по отпечатку cookies.
+AUTH_PROBE_URL = f"{BASE_URL}/favorites/"
+AUTH_PROBE_MARKER = "action=logout"  # ссылка «Выход» есть только у вошедшего
+AUTH_PROBE_TTL = 5 * 60
+
+# --- Кэш страниц манги ---
+# Скачивание из библиотеки берёт данные из кэша, если страницу проверяли
+# не раньше этого срока (проверка обновлений идёт каждые 5 минут).
+PAGE_CACHE_FRESH = 10 * 60
+
+# --- Расписание проверок обновлений ---
+UPDATE_TICK = 60  # как часто таймер ищет тайтлы, которым пора проверку
+UPDATE_MIN_INTERVAL = 5 * 60
+UPDATE_MAX_INTERVAL = 24 * 60 * 60
+UPDATE_BACKOFF = 2.0  # рост интервала после проверки без изменений
+UPDATE_CADENCE_FRACTION = 0.25  # интервал после релиза = доля медианного промежутка
+UPDATE_JITTER = 0.2  # ±20% к моменту следующей проверки
+UPDATE_RELEASE_HISTORY = 10  # сколько последних релизов помнить
+
+# --- Массовая проверка обновлений ---
+UPDATE_CHECK_WORKERS = 8  # потоков пула, у каждого своя keep-alive сессия
+UPDATE_CHECK_RATE = 4.0  # запросов в секунду на весь процесс
+UPDATE_CHECK_BURST = 4
+UPDATE_BATCH_SIZE = 50  # результатов в одной пачке для GUI
+UPDATE_BATCH_INTERVAL = 0.5  # секунд между пачками
+
+# --- Лента подписок ---
+# Тайтлы, на которые аккаунт подписан на сайте. Если лента доступна,
+# страницы тайтлов запрашиваются только для тех, где она показывает обновление.
+# Разметка ленты не проверена на сайте -- по умолчанию выключено.
+FOLLOW_FEED_ENABLED = False
+FOLLOW_FEED_URL = f"{BASE_URL}/favorites/"
+FOLLOW_FEED_MAX_PAGES = 5  # страниц вида .../page/N/
+
+# --- Автодокачка новых глав ---
+# Окно, в которое разрешено запускать автодокачку: (с, до) часов
+# локального времени, может переходить через полночь, например (1, 7).
+# None -- в любое время.
+AUTO_SYNC_HOURS = None
+# Ограничение скорости загрузки глав при автодокачке, байт в секунду
+# (0 -- без ограничения). Ниже STALL_MIN_RATE ставить не стоит: такая
+# передача будет сочтена зависшей.
+AUTO_SYNC_MAX_RATE = 0
+
 # --- Selenium ---
-SELENIUM_WAIT_TIMEOUT = 10
 COOKIE_DOMAIN = ".com-x.life"
 
 # --- Форматы изображений ---
@@ -1,19 +1,44 @@
 """
 Менеджер cookies: загрузка, сохранение и применение к HTTP-сессиям.
+
+Файл cookies делят несколько процессов (второе окно, движок скачивания),
+поэтому чтение и запись идут под :class:`FileLock`. При сохранении поверх
+чужих изменений на диске накладываются только cookies, изменённые этим
+процессом, -- свежий допуск из другого процесса не затирается.
+
+Каждое изменение набора cookies увеличивает его поколение. Долгоживущие
+HTTP-сессии помнят, какое поколение в них применено, и
+:meth:`CookieManager.sync_session` перед запросом доливает в них новые
+cookies без пересоздания сессии; :meth:`CookieManager.subscribe` сообщает
+о смене сразу.
 """
 
 from __future__ import annotations
 
 import json
 import logging
+import os
+import threading
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
+from weakref import WeakKeyDictionary
 
-from manga_downloader.config import AUTH_COOKIES, COOKIE_FILE, IMPORTANT_COOKIE_NAMES
+from manga_downloader.clearance import ClearanceCache
+from manga_downloader.config import (
+    AUTH_COOKIES,
+    CLEARANCE_COOKIE,
+    COOKIE_FILE,
+    IMPORTANT_COOKIE_NAMES,
+    USER_AGENT,
+)
+from manga_downloader.file_lock import FileLock
+from manga_downloader.utils import atomic_write_json
 
 logger = logging.getLogger(__name__)
 
 CookieList = list[dict[str, Any]]
+FileSignature = tuple[int, int]
+Subscriber = Callable[[int], None]
 
 
 class CookieManager:
@@ -22,6 +47,15 @@ class CookieManager:
     def __init__(self, path: Path | None = None) -> None:
         self.path = path or COOKIE_FILE
         self._cookies: CookieList = []
+        self._clearance = ClearanceCache()
+        self._lock = FileLock(self.path)
+        self._signature: FileSignature | None = None  # файл, который мы видели
+        self._changed: set[str] = set()  # cookies, изменённые после загрузки
+        self._replace_all = False  # cookies заменены целиком (из браузера)
+        self._generation = 0
+        self._subscribers: list[Subscriber] = []
+        self._applied: WeakKeyDictionary[Any, int] = WeakKeyDictionary()
+        self._state_lock = threading.Lock()
 
     # -- Публичный интерфейс --------------------------------------------------
 
@@ -32,6 +66,51 @@ class CookieManager:
     @cookies.setter
     def cookies(self, value: CookieList) -> None:
         self._cookies = value
+        self._bump()
+
+    @property
+    def generation(self) -> int:
+        """Поколение набора cookies: растёт при каждом его изменении."""
+        return self._generation
+
+    def subscribe(self, callback: Subscriber) -> Callable[[], None]:
+        """Вызывает *callback(generation)* при каждой смене cookies.
+
+        Вызов идёт в потоке, который изменил cookies, поэтому
+        подписчику стоит только отметить смену. Возвращает функцию отписки.
+        """
+        with self._state_lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe() -> None:
+            with self._state_lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+
+        return unsubscribe
+
+    @property
+    def clearance(self) -> ClearanceCache:
+        """Метаданные ``cf_clearance``: срок действия и User-Agent выдачи."""
+        return self._clearance
+
+    @property
+    def user_agent(self) -> str:
+        """User-Agent, на который выдан текущий ``cf_clearance``.
+
+        Cloudflare отклоняет допуск, предъявленный с другим User-Agent.
+        """
+        for cookie in self._cookies:
+            if cookie.get("name") == CLEARANCE_COOKIE:
+                return self._clearance.user_agent_for(cookie.get("value", "")) or USER_AGENT
+        return USER_AGENT
+
+    def set_cookie(self, name: str, value: str, **attrs: Any) -> None:
+        """Добавляет или заменяет cookie с именем *name*."""
+        cookie = {"name": name, "value": value, **attrs}
+        self._cookies = [c for c in self._cookies if c.get("name") != name] + [cookie]
+        self._changed.add(name)
+        self._bump()
 
     def load(self) -> bool:
         """Загружает cookies из JSON-файла.
@@ -39,20 +118,48 @@ class CookieManager:
         Возвращает ``True`` при успехе.
         """
         try:
-            with open(self.path, "r", encoding="utf-8") as fh:
-                raw = json.load(fh)
-            if isinstance(raw, list):
-                self._cookies = raw
-            else:
-                self._cookies = [
-                    {"name": k, "value": v} for k, v in raw.items()
-                ]
+            with self._lock:
+                self._cookies = self._read_file()
+                self._signature = self._file_signature()
+            self._changed.clear()
+            self._replace_all = False
+            self._bump()
             logger.info("Загружено %d cookies из %s", len(self._cookies), self.path)
             return True
         except Exception as exc:
             logger.error("Не удалось загрузить cookies: %s", exc)
             return False
 
+    def changed_on_disk(self) -> bool:
+        """Файл cookies переписан другим процессом после нашей загрузки/записи."""
+        return self._file_signature() != self._signature
+
+    def reload_if_changed(self) -> bool:
+        """Перечитывает файл, если его изменил другой процесс.
+
+        Cookies, изменённые этим процессом и ещё не сохранённые,
+        остаются поверх прочитанных. Возвращает ``True``, если набор
+        cookies от этого изменился.
+        """
+        if not self.changed_on_disk():
+            return False
+        try:
+            with self._lock:
+                disk = self._read_file()
+                self._signature = self._file_signature()
+        except Exception as exc:
+            logger.error("Не удалось перечитать cookies: %s", exc)
+            return False
+        if self._replace_all:
+            return False
+        merged = self._overlay_changed(disk)
+        if merged == self._cookies:
+            return False
+        self._cookies = merged
+        self._bump()
+        logger.info("Cookies обновлены другим процессом: %s", self.path)
+        return True
+
     def save(self, only_important: bool = True) -> bool:
         """Сохраняет cookies в JSON-файл.
 
@@ -60,14 +167,24 @@ class CookieManager:
         ``IMPORTANT_COOKIE_NAMES``.
         """
         try:
-            data = self._cookies
-            if only_important:
-                data = [
-                    c for c in self._cookies
-                    if c.get("name") in IMPORTANT_COOKIE_NAMES
-                ]
-            with open(self.path, "w", encoding="utf-8") as fh:
-                json.dump(data, fh, indent=2, ensure_ascii=False)
+            with self._lock:
+                merged = False
+                if not self._replace_all and self.changed_on_disk() and self.path.exists():
+                    disk = self._overlay_changed(self._read_file())
+                    merged = disk != self._cookies
+                    self._cookies = disk
+                data = self._cookies
+                if only_important:
+                    data = [
+                        c for c in self._cookies
+                        if c.get("name") in IMPORTANT_COOKIE_NAMES
+                    ]
+                atomic_write_json(self.path, data, indent=2, ensure_ascii=False)
+                self._signature = self._file_signature()
+            self._changed.clear()
+            self._replace_all = False
+            if merged:
+                self._bump()
             logger.info("Сохранено %d cookies в %s", len(data), self.path)
             return True
         except Exception as exc:
@@ -80,13 +197,33 @@ class CookieManager:
 
     def apply_to_session(self, session: Any) -> None:
         """Устанавливает cookies в HTTP-сессию (curl_cffi / requests)."""
+        generation = self._generation
         for cookie in self._cookies:
             session.cookies.set(cookie["name"], cookie["value"])
+        session.headers["User-Agent"] = self.user_agent
+        self._mark_applied(session, generation)
 
     def apply_to_scraper(self, scraper: Any) -> None:
         """Устанавливает cookies в cloudscraper."""
+        generation = self._generation
         cookies_dict = {c["name"]: c["value"] for c in self._cookies}
         scraper.cookies.update(cookies_dict)
+        scraper.headers["User-Agent"] = self.user_agent
+        self._mark_applied(scraper, generation)
+
+    def sync_session(self, session: Any) -> bool:
+        """Доливает в живую сессию cookies, сменившиеся после их применения.
+
+        Пока поколение не менялось, это одно сравнение. Сессии, в которые
+        cookies не применялись, не трогает. Возвращает ``True``, если
+        cookies переприменены.
+        """
+        with self._state_lock:
+            applied = self._applied.get(session)
+        if applied is None or applied == self._generation:
+            return False
+        self.apply_to_session(session)
+        return True
 
     def apply_to_driver(self, driver: Any, domain: str = ".com-x.life") -> None:
         """Добавляет cookies в Selenium WebDriver."""
@@ -104,8 +241,21 @@ class CookieManager:
                 )
 
     def update_from_driver(self, driver: Any) -> None:
-        """Обновляет cookies из Selenium WebDriver."""
-        self._cookies = driver.get_cookies()
+        """Обновляет cookies из Selenium WebDriver.
+
+        Заодно запоминает срок ``cf_clearance`` и User-Agent браузера,
+        которому он выдан.
+        """
+        cookies = driver.get_cookies()
+        if cookies != self._cookies:
+            self._cookies = cookies
+            self._bump()
+        self._replace_all = True
+        try:
+            user_agent = driver.execute_script("return navigator.userAgent") or USER_AGENT
+        except Exception:
+            user_agent = USER_AGENT
+        self._clearance.record_from_cookies(self._cookies, user_agent)
 
     def has_auth(self, driver: Any | None = None) -> bool:
         """Проверяет наличие авторизационных cookies.
@@ -116,3 +266,43 @@ class CookieManager:
             return all(driver.get_cookie(name) for name in AUTH_COOKIES)
         names = {c.get("name") for c in self._cookies}
         return all(name in names for name in AUTH_COOKIES)
+
+    # -- Внутренние методы -----------------------------------------------------
+
+    def _bump(self) -> None:
+        with self._state_lock:
+            self._generation += 1
+            generation = self._generation
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(generation)
+            except Exception as exc:
+                logger.warning("Подписчик на смену cookies упал: %s", exc)
+
+    def _mark_applied(self, session: Any, generation: int) -> None:
+        try:
+            with self._state_lock:
+                self._applied[session] = generation
+        except TypeError:
+            pass  # объект без weakref -- синхронизировать не будем
+
+    def _read_file(self) -> CookieList:
+        with open(self.path, "r", encoding="utf-8") as fh:
+            raw = json.load(fh)
+        if isinstance(raw, list):
+            return raw
+        return [{"name": k, "value": v} for k, v in raw.items()]
+
+    def _file_signature(self) -> FileSignature | None:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _overlay_changed(self, disk: CookieList) -> CookieList:
+        """Cookies с диска, поверх которых -- изменённые этим процессом."""
+        ours = {c.get("name"): c for c in self._cookies if c.get("name") in self._changed}
+        merged = [c for c in disk if c.get("name") not in ours]
+        return merged + list(ours.values())
@@ -2,28 +2,108 @@
 Базовый класс загрузчика глав.
 
 Содержит общую логику: формирование payload, парсинг URL ответа,
-скачивание файла и валидацию ZIP.
+потоковое скачивание файла и валидацию ZIP.
 """
 
 from __future__ import annotations
 
 import abc
 import logging
+import os
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Callable
+from threading import Event, Lock
+from typing import Any, BinaryIO, Callable
 
-from manga_downloader.config import DEFAULT_HEADERS
+from manga_downloader.cancellation import CancelToken
+from manga_downloader.config import API_URL, DEFAULT_HEADERS, SEGMENT_COUNT, SEGMENT_MIN_SIZE
+from manga_downloader.cookies import CookieManager
+from manga_downloader.metrics import StallDetector, host_timeouts
+from manga_downloader.rate_limit import RateLimiter
 from manga_downloader.utils import get_file_size_kb, parse_download_url, validate_zip_file
 
 logger = logging.getLogger(__name__)
 
 LogCallback = Callable[[str], None]
 
+_CHUNK_SIZE = 64 * 1024
+_WAIT_SLICE = 0.1  # как часто пауза попытки проверяет второй флаг, сек
+
+
+class TransferAborted(RuntimeError):
+    """Передача остановлена извне (например, проиграла хедж-попытке)."""
+
+
+class Transfer:
+    """Наблюдаемое состояние одной попытки скачивания главы.
+
+    Позволяет снаружи узнать, пошли ли данные, и прервать передачу --
+    самой попытке (флаг *abort*) или всей загрузке (токен *cancel*).
+    *limiter* (байт в секунду) ограничивает скорость передачи.
+    """
+
+    def __init__(
+        self, cancel: CancelToken | None = None, limiter: RateLimiter | None = None,
+    ) -> None:
+        self.cancel = cancel
+        self.limiter = limiter
+        self.started_at = time.monotonic()
+        self.first_byte_at: float | None = None
+        self.bytes_received = 0
+        self.first_byte = Event()
+        self.abort = Event()
+        self._lock = Lock()
+
+    @property
+    def ttfb(self) -> float | None:
+        """Секунд от начала попытки до первого байта файла."""
+        if self.first_byte_at is None:
+            return None
+        return self.first_byte_at - self.started_at
+
+    def on_chunk(self, size: int) -> None:
+        with self._lock:
+            if self.first_byte_at is None:
+                self.first_byte_at = time.monotonic()
+                self.first_byte.set()
+            self.bytes_received += size
+
+    def pace(self, size: int) -> None:
+        """Выдерживает ограничение скорости после *size* полученных байт."""
+        if self.limiter is not None:
+            self.limiter.acquire(self.cancel, size)
+
+    def wait(self, seconds: float) -> bool:
+        """Пауза на *seconds*, прерываемая отменой загрузки или прерыванием
+        попытки. ``True``, если прервана."""
+        deadline = time.monotonic() + seconds
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            step = min(remaining, _WAIT_SLICE)
+            if self.cancel is not None:
+                if self.cancel.wait(step):
+                    return True
+            elif self.abort.wait(step):
+                return True
+            if self.abort.is_set():
+                return True
+
+    def check(self) -> None:
+        if self.abort.is_set():
+            raise TransferAborted("Передача прервана")
+        if self.cancel is not None and self.cancel.cancelled:
+            raise TransferAborted("Загрузка отменена")
+
 
 class BaseDownloader(abc.ABC):
     """Абстрактный загрузчик одной главы.
 
-    Подклассы реализуют :meth:`_create_session` и :meth:`_post` / :meth:`_get`.
+    Подклассы реализуют :meth:`_create_session`, :meth:`_api_request`
+    и :meth:`_open_stream`.
     """
 
     name: str = "base"
@@ -31,6 +111,8 @@ class BaseDownloader(abc.ABC):
     def __init__(self, referer_url: str, log_fn: LogCallback | None = None) -> None:
         self.referer_url = referer_url
         self._log_fn = log_fn
+        self._session: Any = None
+        self._cookie_manager: CookieManager | None = None
 
     # -- Логирование -----------------------------------------------------------
 
@@ -48,18 +130,22 @@ class BaseDownloader(abc.ABC):
         news_id: int | str,
         zip_path: Path,
         title: str,
+        transfer: Transfer | None = None,
     ) -> bool:
         """Скачивает главу. Возвращает ``True`` при успехе."""
+        transfer = transfer or Transfer()
+        session = None
         try:
             self.log(f"  🔄 Метод {self.name} для {title}...")
 
-            api_response = self._api_request(chapter_id, news_id)
+            session = self._ensure_session()
+            api_response = self._timed_api_request(session, chapter_id, news_id)
             raw_url = api_response.get("data")
             if not raw_url:
                 raise ValueError("Нет URL в ответе API")
 
             download_url = parse_download_url(raw_url)
-            self._download_file(download_url, zip_path)
+            self._download_file(session, download_url, zip_path, transfer)
 
             if not validate_zip_file(zip_path):
                 raise ValueError("Скачанный файл не является ZIP-архивом")
@@ -68,19 +154,196 @@ class BaseDownloader(abc.ABC):
             self.log(f"  ✅ Метод {self.name} успешен ({size:.1f} KB)")
             return True
 
+        except TransferAborted:
+            return False
         except Exception as exc:
             self.log(f"  ⚠️ Метод {self.name} не сработал: {str(exc)[:100]}")
             return False
+        finally:
+            # Сессию могли отцепить, пока шла передача -- тогда она наша.
+            if session is not None and session is not self._session:
+                session.close()
 
     # -- Абстрактные методы (реализуются в подклассах) -------------------------
 
     @abc.abstractmethod
-    def _api_request(self, chapter_id: int | str, news_id: int | str) -> dict[str, Any]:
+    def _create_session(self) -> Any:
+        """Создаёт HTTP-сессию с заголовками и cookies."""
+
+    @abc.abstractmethod
+    def _api_request(
+        self, session: Any, chapter_id: int | str, news_id: int | str,
+    ) -> dict[str, Any]:
         """Отправляет POST-запрос к API и возвращает JSON-ответ."""
 
     @abc.abstractmethod
-    def _download_file(self, url: str, dest: Path) -> None:
-        """Скачивает файл по URL и сохраняет в *dest*."""
+    def _open_stream(self, session: Any, url: str, headers: dict[str, str] | None = None) -> Any:
+        """Начинает потоковый GET файла и возвращает ответ с ``iter_content``.
+
+        *headers* дополняют заголовки сессии (например, ``Range``).
+        """
+
+    # -- Скачивание файла ------------------------------------------------------
+
+    def _timed_api_request(
+        self, session: Any, chapter_id: int | str, news_id: int | str,
+    ) -> dict[str, Any]:
+        """API-запрос с замером задержки для адаптивных таймаутов."""
+        started = time.monotonic()
+        result = self._api_request(session, chapter_id, news_id)
+        host_timeouts.record_ttfb(API_URL, time.monotonic() - started)
+        return result
+
+    def _download_file(self, session: Any, url: str, dest: Path, transfer: Transfer) -> None:
+        """Скачивает файл по URL в *dest*, отчитываясь в *transfer*.
+
+        Общего таймаута нет: передача обрывается, только если скорость
+        падает ниже адаптивного минимума для хоста. Большие файлы с
+        поддержкой ``Range`` качаются несколькими частями параллельно.
+        """
+        transfer.check()
+        started = time.monotonic()
+        response = self._open_stream(session, url)
+        host_timeouts.record_ttfb(url, time.monotonic() - started)
+        try:
+            if response.status_code != 200:
+                raise RuntimeError(f"Ошибка скачивания: HTTP {response.status_code}")
+            size = self._segmentable_size(response)
+            if size:
+                received = self._download_segmented(response, url, dest, size, transfer)
+            else:
+                with open(dest, "wb") as fh:
+                    received = self._copy_stream(
+                        response, fh, transfer, host_timeouts.stall_detector(url),
+                    )
+        finally:
+            response.close()
+
+        if transfer.first_byte_at is not None:
+            host_timeouts.record_transfer(url, received, time.monotonic() - transfer.first_byte_at)
+
+    @staticmethod
+    def _copy_stream(
+        response: Any,
+        fh: BinaryIO,
+        transfer: Transfer,
+        stall: StallDetector,
+        limit: int | None = None,
+        stop: Event | None = None,
+    ) -> int:
+        """Пишет тело ответа в *fh* (не больше *limit* байт). Возвращает объём."""
+        received = 0
+        for chunk in response.iter_content(chunk_size=_CHUNK_SIZE):
+            transfer.check()
+            if stop is not None and stop.is_set():
+                raise TransferAborted("Соседняя часть файла не скачалась")
+            if chunk:
+                if limit is not None:
+                    chunk = chunk[:limit - received]
+                fh.write(chunk)
+                transfer.on_chunk(len(chunk))
+                transfer.pace(len(chunk))
+                received += len(chunk)
+                if limit is not None and received >= limit:
+                    break
+            stall.update(received)
+        return received
+
+    # -- Сегментированное скачивание -------------------------------------------
+
+    @staticmethod
+    def _segmentable_size(response: Any) -> int | None:
+        """Размер файла, если его стоит качать частями, иначе ``None``."""
+        if SEGMENT_COUNT < 2:
+            return None
+        if response.headers.get("Accept-Ranges", "").lower() != "bytes":
+            return None
+        if response.headers.get("Content-Encoding", "identity").lower() != "identity":
+            return None  # диапазоны считались бы по сжатым байтам
+        try:
+            size = int(response.headers.get("Content-Length", ""))
+        except ValueError:
+            return None
+        return size if size >= SEGMENT_MIN_SIZE else None
+
+    def _download_segmented(
+        self,
+        response: Any,
+        url: str,
+        dest: Path,
+        size: int,
+        transfer: Transfer,
+    ) -> int:
+        """Качает файл *SEGMENT_COUNT* диапазонами в заранее выделенный файл.
+
+        Первая часть читается из уже открытого ответа, остальные -- отдельными
+        сессиями с заголовком ``Range``. Каждая часть пишет по своему смещению.
+        """
+        part = -(-size // SEGMENT_COUNT)
+        bounds = [(start, min(start + part, size) - 1) for start in range(0, size, part)]
+        self.log(
+            f"  ⚡ Файл {size / (1024 * 1024):.0f} MB: качаю {len(bounds)} частями параллельно"
+        )
+
+        with open(dest, "wb") as fh:
+            fh.truncate(size)
+
+        stop = Event()
+        min_rate = host_timeouts.min_rate(url) / len(bounds)
+
+        def fetch(index: int, start: int, end: int) -> None:
+            length = end - start + 1
+            seg_session = None
+            seg_response = response
+            try:
+                if index > 0:
+                    seg_session = self._create_session()
+                    seg_response = self._open_stream(
+                        seg_session, url, {"Range": f"bytes={start}-{end}"},
+                    )
+                    content_range = seg_response.headers.get("Content-Range", "")
+                    if seg_response.status_code != 206 or not content_range.startswith(
+                        f"bytes {start}-{end}/"
+                    ):
+                        raise RuntimeError(
+                            f"Часть {index + 1}: сервер не отдал диапазон "
+                            f"(HTTP {seg_response.status_code})"
+                        )
+                with open(dest, "r+b") as fh:
+                    fh.seek(start)
+                    got = self._copy_stream(
+                        seg_response, fh, transfer, StallDetector(min_rate), length, stop,
+                    )
+                if got != length:
+                    raise RuntimeError(f"Часть {index + 1}: получено {got} из {length} байт")
+            except BaseException:
+                stop.set()
+                raise
+            finally:
+                if seg_session is not None:
+                    seg_response.close()
+                    seg_session.close()
+
+        with ThreadPoolExecutor(max_workers=len(bounds)) as pool:
+            futures = [pool.submit(fetch, i, start, end) for i, (start, end) in enumerate(bounds)]
+        errors = [f.exception() for f in futures if f.exception() is not None]
+        if errors:
+            # Соседние части прерываются с TransferAborted -- показываем причину.
+            raise next((e for e in errors if not isinstance(e, TransferAborted)), errors[0])
+
+        self._verify_assembled(dest, size)
+        return size
+
+    @staticmethod
+    def _verify_assembled(dest: Path, size: int) -> None:
+        """Проверяет собранный из частей файл целиком: размер и CRC всех записей."""
+        actual = os.path.getsize(dest)
+        if actual != size:
+            raise RuntimeError(f"Размер собранного файла {actual} вместо {size}")
+        with zipfile.ZipFile(dest) as zf:
+            bad = zf.testzip()
+        if bad is not None:
+            raise RuntimeError(f"Повреждена запись {bad} после сборки частей")
 
     # -- Вспомогательные -------------------------------------------------------
 
@@ -97,8 +360,36 @@ class BaseDownloader(abc.ABC):
 
     # -- Управление ресурсами --------------------------------------------------
 
+    def _ensure_session(self) -> Any:
+        if self._session is None:
+            self._session = self._create_session()
+        elif self._cookie_manager is not None:
+            # Cookies могли смениться после создания сессии (Selenium,
+            # продление cf_clearance, другой процесс) -- доливаем их.
+            self._cookie_manager.sync_session(self._session)
+        return self._session
+
+    def detach_session(self) -> None:
+        """Отцепляет текущую сессию, не закрывая её.
+
+        Нужна, когда передача продолжается в фоне: её поток сам закроет
+        сессию, а следующий запрос загрузчика получит новую.
+        """
+        self._session = None
+
+    def abandon(self) -> None:
+        """Бросает попытку, которая ещё идёт в фоне (см. :meth:`detach_session`).
+
+        Загрузчики, держащие внешние ресурсы (браузер), освобождают их здесь:
+        поток брошенной попытки может не дожить до своего ``finally``.
+        """
+        self.detach_session()
+
     def close(self) -> None:
-        """Освобождает ресурсы. Переопределяется в подклассах."""
+        """Закрывает сессию (следующий запрос создаст новую)."""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
 
     def __enter__(self) -> "BaseDownloader":
         return self
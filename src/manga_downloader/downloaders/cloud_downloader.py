@@ -4,14 +4,14 @@
 
 from __future__ import annotations
 
-from pathlib import Path
 from typing import Any
 
 import cloudscraper
 
-from manga_downloader.config import API_URL, HTTP_TIMEOUT, DOWNLOAD_TIMEOUT
+from manga_downloader.config import API_URL
 from manga_downloader.cookies import CookieManager
 from manga_downloader.downloaders.base import BaseDownloader, LogCallback
+from manga_downloader.metrics import host_timeouts
 
 
 class CloudscraperDownloader(BaseDownloader):
@@ -27,47 +27,45 @@ class CloudscraperDownloader(BaseDownloader):
     ) -> None:
         super().__init__(referer_url, log_fn)
         self._cookie_manager = cookie_manager
-        self._scraper: cloudscraper.CloudScraper | None = None
 
-    def _ensure_scraper(self) -> cloudscraper.CloudScraper:
-        if self._scraper is None:
-            self._scraper = cloudscraper.create_scraper(
-                browser={
-                    "browser": "chrome",
-                    "platform": "windows",
-                    "desktop": True,
-                    "mobile": False,
-                }
-            )
-            self._scraper.headers.update(self._make_headers())
-            self._cookie_manager.apply_to_scraper(self._scraper)
-        return self._scraper
+    def _create_session(self) -> cloudscraper.CloudScraper:
+        scraper = cloudscraper.create_scraper(
+            browser={
+                "browser": "chrome",
+                "platform": "windows",
+                "desktop": True,
+                "mobile": False,
+            }
+        )
+        scraper.headers.update(self._make_headers())
+        self._cookie_manager.apply_to_scraper(scraper)
+        return scraper
 
-    def _api_request(self, chapter_id: int | str, news_id: int | str) -> dict[str, Any]:
-        scraper = self._ensure_scraper()
+    def _api_request(
+        self, session: cloudscraper.CloudScraper, chapter_id: int | str, news_id: int | str,
+    ) -> dict[str, Any]:
         payload = self._make_payload(chapter_id, news_id)
-        response = scraper.post(API_URL, data=payload, timeout=HTTP_TIMEOUT)
+        response = session.post(
+            API_URL, data=payload, timeout=host_timeouts.request_timeout(API_URL),
+        )
         if response.status_code != 200:
             raise RuntimeError(f"HTTP {response.status_code}")
         return response.json()
 
-    def _download_file(self, url: str, dest: Path) -> None:
-        scraper = self._ensure_scraper()
-        response = scraper.get(
+    def _open_stream(
+        self,
+        session: cloudscraper.CloudScraper,
+        url: str,
+        headers: dict[str, str] | None = None,
+    ) -> Any:
+        return session.get(
             url,
-            timeout=DOWNLOAD_TIMEOUT,
+            timeout=host_timeouts.stream_timeout(url),
             allow_redirects=True,
+            stream=True,
             headers={
                 "Referer": self.referer_url,
                 "Accept": "application/zip,*/*",
+                **(headers or {}),
             },
         )
-        if response.status_code != 200:
-            raise RuntimeError(f"Ошибка скачивания: HTTP {response.status_code}")
-        with open(dest, "wb") as fh:
-            fh.write(response.content)
-
-    def close(self) -> None:
-        if self._scraper is not None:
-            self._scraper.close()
-            self._scraper = None
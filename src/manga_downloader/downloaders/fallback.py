@@ -5,30 +5,68 @@
 from __future__ import annotations
 
 import logging
+import os
+import queue
 import time
 from pathlib import Path
+from threading import Thread
 
-from manga_downloader.config import FALLBACK_DELAY
+from manga_downloader.cancellation import CancelToken
+from manga_downloader.config import (
+    FALLBACK_DELAY,
+    HEDGE_ENABLED,
+    HEDGE_MIN_DELAY,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_PERCENTILE,
+    HEDGE_WINDOW,
+)
 from manga_downloader.cookies import CookieManager
-from manga_downloader.downloaders.base import LogCallback
+from manga_downloader.downloaders.base import BaseDownloader, LogCallback, Transfer
 from manga_downloader.downloaders.curl_downloader import CurlCffiDownloader
 from manga_downloader.downloaders.cloud_downloader import CloudscraperDownloader
+from manga_downloader.metrics import RollingWindow
 from manga_downloader.downloaders.selenium_downloader import SeleniumRecoveryDownloader
+from manga_downloader.rate_limit import RateLimiter
 
 logger = logging.getLogger(__name__)
 
+_HEDGE_POLL = 0.05
+_CANCEL_POLL = 0.1  # верхняя граница задержки реакции на отмену, сек
+
+AttemptResult = tuple[BaseDownloader, Transfer, Path, bool]
+
 
 class FallbackDownloader:
-    """Пробует загрузчики по цепочке: curl_cffi -> cloudscraper -> Selenium."""
+    """Пробует загрузчики по цепочке: curl_cffi -> cloudscraper -> Selenium.
+
+    В режиме хеджирования медленная (но не упавшая) попытка первого метода
+    дублируется вторым: если за перцентиль времени до первого байта,
+    выученный на последних главах, данные не пошли, параллельно стартует
+    следующий метод, и побеждает тот, кто закончит первым.
+
+    Каждая попытка идёт в своём потоке, а вызывающий ждёт её на токене
+    *cancel*: отмена прерывает ожидание сразу, даже посреди сетевого
+    запроса, а брошенная попытка остановится сама на ближайшей проверке.
+
+    *max_rate* (байт в секунду, 0 -- без ограничения) делят все попытки
+    и части сегментированной загрузки.
+    """
 
     def __init__(
         self,
         referer_url: str,
         cookie_manager: CookieManager,
         log_fn: LogCallback | None = None,
+        hedging: bool = HEDGE_ENABLED,
+        cancel: CancelToken | None = None,
+        max_rate: int = 0,
     ) -> None:
         self._log_fn = log_fn
-        self._downloaders = [
+        self._hedging = hedging
+        self._cancel = cancel or CancelToken()
+        self._limiter = RateLimiter(max_rate, max_rate) if max_rate > 0 else None
+        self._ttfb = RollingWindow(HEDGE_WINDOW)
+        self._downloaders: list[BaseDownloader] = [
             CurlCffiDownloader(referer_url, cookie_manager, log_fn),
             CloudscraperDownloader(referer_url, cookie_manager, log_fn),
             SeleniumRecoveryDownloader(referer_url, cookie_manager, log_fn),
@@ -48,15 +86,157 @@ class FallbackDownloader:
         title: str,
     ) -> bool:
         """Пробует все методы по очереди, возвращает ``True`` при первом успехе."""
-        for i, dl in enumerate(self._downloaders):
-            if dl.download(chapter_id, news_id, zip_path, title):
+        start = 0
+        hedge_delay = self._hedge_delay()
+        if hedge_delay is not None:
+            ok, start = self._download_hedged(chapter_id, news_id, zip_path, title, hedge_delay)
+            if ok:
                 return True
-            if i < len(self._downloaders) - 1:
-                time.sleep(FALLBACK_DELAY)
+            if start < len(self._downloaders) and self._cancel.wait(FALLBACK_DELAY):
+                return False
 
-        self.log(f"  ❌ Все методы не сработали для {title}")
+        for i in range(start, len(self._downloaders)):
+            dl = self._downloaders[i]
+            finished: queue.Queue = queue.Queue()
+            transfer = self._launch(dl, chapter_id, news_id, zip_path, title, finished)
+            result = self._next_finished(finished)
+            if result is None:
+                self._abandon(dl, transfer)
+                return False
+            if result[3]:
+                self._record(transfer)
+                return True
+            if i < len(self._downloaders) - 1 and self._cancel.wait(FALLBACK_DELAY):
+                return False
+
+        if not self._cancel.cancelled:
+            self.log(f"  ❌ Все методы не сработали для {title}")
         return False
 
+    # -- Попытки в потоках -----------------------------------------------------
+
+    def _launch(
+        self,
+        dl: BaseDownloader,
+        chapter_id: int | str,
+        news_id: int | str,
+        zip_path: Path,
+        title: str,
+        finished: queue.Queue,
+    ) -> Transfer:
+        """Запускает попытку *dl* в фоне; результат придёт в *finished*."""
+        transfer = Transfer(self._cancel, self._limiter)
+        Thread(
+            target=lambda: finished.put(
+                (dl, transfer, zip_path, dl.download(chapter_id, news_id, zip_path, title, transfer))
+            ),
+            name=f"download-{dl.name}",
+            daemon=True,
+        ).start()
+        return transfer
+
+    def _next_finished(self, finished: queue.Queue) -> AttemptResult | None:
+        """Ждёт результат попытки или ``None``, если загрузку отменили."""
+        while not self._cancel.cancelled:
+            try:
+                return finished.get(timeout=_CANCEL_POLL)
+            except queue.Empty:
+                continue
+        return None
+
+    @staticmethod
+    def _abandon(dl: BaseDownloader, transfer: Transfer) -> None:
+        """Бросает незавершённую попытку: она остановится сама."""
+        transfer.abort.set()
+        # Передача ещё может висеть в сети: её сессию закроет её же
+        # поток, а загрузчику достанется новая. Браузер Selenium
+        # закрывается сразу -- иначе он пережил бы процесс движка.
+        dl.abandon()
+
+    # -- Хеджирование ----------------------------------------------------------
+
+    def _hedge_delay(self) -> float | None:
+        """Порог ожидания первого байта или ``None``, если хеджировать рано."""
+        if not self._hedging or len(self._ttfb) < HEDGE_MIN_SAMPLES:
+            return None
+        return max(HEDGE_MIN_DELAY, self._ttfb.percentile(HEDGE_PERCENTILE) or 0.0)
+
+    def _download_hedged(
+        self,
+        chapter_id: int | str,
+        news_id: int | str,
+        zip_path: Path,
+        title: str,
+        delay: float,
+    ) -> tuple[bool, int]:
+        """Скачивает главу первым методом с хедж-попыткой вторым.
+
+        Возвращает ``(успех, индекс следующего непробованного метода)``.
+        """
+        finished: queue.Queue = queue.Queue()
+        attempts: list[tuple[BaseDownloader, Transfer, Path]] = []
+
+        def launch(dl: BaseDownloader) -> Transfer:
+            part = zip_path.with_suffix(f".part{len(attempts)}")
+            transfer = self._launch(dl, chapter_id, news_id, part, title, finished)
+            attempts.append((dl, transfer, part))
+            return transfer
+
+        primary, backup = self._downloaders[0], self._downloaders[1]
+        primary_transfer = launch(primary)
+
+        deadline = time.monotonic() + delay
+        while time.monotonic() < deadline and finished.empty() and not self._cancel.cancelled:
+            if primary_transfer.first_byte.wait(_HEDGE_POLL):
+                break
+        if (
+            finished.empty()
+            and not primary_transfer.first_byte.is_set()
+            and not self._cancel.cancelled
+        ):
+            self.log(
+                f"  🐢 {primary.name}: нет данных за {delay:.1f} с — "
+                f"параллельно запускаю {backup.name}"
+            )
+            launch(backup)
+
+        winner: tuple[BaseDownloader, Transfer, Path] | None = None
+        done: list[Transfer] = []
+        for _ in range(len(attempts)):
+            result = self._next_finished(finished)
+            if result is None:
+                break
+            dl, transfer, part, ok = result
+            done.append(transfer)
+            if ok:
+                winner = (dl, transfer, part)
+                break
+
+        for dl, transfer, _part in attempts:
+            if transfer not in done:
+                self._abandon(dl, transfer)
+
+        if winner is None:
+            return False, len(attempts)
+
+        dl, transfer, part = winner
+        os.replace(part, zip_path)
+        self._record(transfer)
+        if len(attempts) > 1:
+            self.log(f"  🏁 Первым успел метод {dl.name}")
+        return True, len(attempts)
+
+    def _record(self, transfer: Transfer) -> None:
+        if transfer.ttfb is not None:
+            self._ttfb.add(transfer.ttfb)
+
+    # -- Управление ресурсами --------------------------------------------------
+
+    def reset_sessions(self) -> None:
+        """Сбрасывает HTTP-сессии: следующие запросы возьмут свежие cookies."""
+        for dl in self._downloaders:
+            dl.close()
+
     def close(self) -> None:
         for dl in self._downloaders:
             dl.close()
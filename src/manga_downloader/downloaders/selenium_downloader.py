@@ -7,24 +7,23 @@
 
 from __future__ import annotations
 
-import time
 from pathlib import Path
+from threading import Lock
 from typing import Any
 
 import curl_cffi
 from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-
-from manga_downloader.config import (
-    API_URL,
-    BASE_URL,
-    COOKIE_DOMAIN,
-    DOWNLOAD_TIMEOUT,
-    HTTP_TIMEOUT,
-    USER_AGENT,
-)
+
+from manga_downloader.browser import open_chrome, restore_session
+from manga_downloader.config import API_URL, BASE_URL
 from manga_downloader.cookies import CookieManager
-from manga_downloader.downloaders.base import BaseDownloader, LogCallback
+from manga_downloader.downloaders.base import (
+    BaseDownloader,
+    LogCallback,
+    Transfer,
+    TransferAborted,
+)
+from manga_downloader.metrics import host_timeouts
 from manga_downloader.utils import get_file_size_kb, parse_download_url, validate_zip_file
 
 
@@ -41,6 +40,8 @@ class SeleniumRecoveryDownloader(BaseDownloader):
     ) -> None:
         super().__init__(referer_url, log_fn)
         self._cookie_manager = cookie_manager
+        self._driver: webdriver.Chrome | None = None  # браузер идущей попытки
+        self._driver_lock = Lock()
 
     # Переопределяем download целиком, т.к. логика сильно отличается:
     # нужно открыть браузер, обновить cookies, затем скачать через curl_cffi.
@@ -50,24 +51,30 @@ class SeleniumRecoveryDownloader(BaseDownloader):
         news_id: int | str,
         zip_path: Path,
         title: str,
+        transfer: Transfer | None = None,
     ) -> bool:
+        transfer = transfer or Transfer()
         driver = None
         session = None
         try:
             self.log(f"  🔄 Метод {self.name} для {title}...")
 
             driver = self._open_browser()
-            self._refresh_cookies(driver)
+            with self._driver_lock:
+                self._driver = driver
+            transfer.check()
+            self._refresh_cookies(driver, transfer)
+            transfer.check()
 
-            session = self._build_session()
-            json_data = self._api_post(session, chapter_id, news_id)
+            session = self._create_session()
+            json_data = self._api_request(session, chapter_id, news_id)
 
             raw_url = json_data.get("data")
             if not raw_url:
                 raise ValueError("Нет URL в ответе API")
 
             download_url = parse_download_url(raw_url)
-            self._fetch_file(session, download_url, zip_path)
+            self._download_file(session, download_url, zip_path, transfer)
 
             if not validate_zip_file(zip_path):
                 raise ValueError("Скачанный файл не является ZIP-архивом")
@@ -79,41 +86,54 @@ class SeleniumRecoveryDownloader(BaseDownloader):
             self.log("  💾 Обновленные куки сохранены")
             return True
 
+        except TransferAborted:
+            return False
         except Exception as exc:
-            self.log(f"  ⚠️ Метод {self.name} не сработал: {str(exc)[:100]}")
+            if not transfer.abort.is_set():  # брошенной попытке браузер закрыли
+                self.log(f"  ⚠️ Метод {self.name} не сработал: {str(exc)[:100]}")
             return False
         finally:
             if session is not None:
                 session.close()
-            if driver is not None:
+            with self._driver_lock:
+                owned = self._driver is driver
+                if owned:
+                    self._driver = None
+            if driver is not None and owned:
+                driver.quit()
+
+    def abandon(self) -> None:
+        """Бросает попытку и сразу закрывает её браузер."""
+        super().abandon()
+        with self._driver_lock:
+            driver, self._driver = self._driver, None
+        if driver is not None:
+            try:
                 driver.quit()
+            except Exception as exc:
+                self.log(f"  ⚠️ Браузер брошенной попытки не закрыт: {exc}")
 
     # -- Внутренние методы -----------------------------------------------------
 
     def _open_browser(self) -> webdriver.Chrome:
-        options = Options()
-        options.add_argument(f"--user-agent={USER_AGENT}")
-        options.add_argument("--log-level=3")
-        options.add_experimental_option("detach", False)
-        options.add_experimental_option("excludeSwitches", ["enable-logging"])
-        driver = webdriver.Chrome(options=options)
-        driver.get(BASE_URL)
-        return driver
+        return open_chrome(detach=False)
 
-    def _refresh_cookies(self, driver: webdriver.Chrome) -> None:
-        self._cookie_manager.apply_to_driver(driver, COOKIE_DOMAIN)
-        driver.refresh()
-        time.sleep(2)
+    def _refresh_cookies(self, driver: webdriver.Chrome, transfer: Transfer) -> None:
+        # Cookies -- до навигации (или уже в профиле): главная грузится один раз.
+        restore_session(driver, self._cookie_manager)
+        driver.get(BASE_URL)
+        if transfer.wait(2):
+            transfer.check()
         self._cookie_manager.update_from_driver(driver)
         self.log("  🔄 Повторная попытка с обновленными куками...")
 
-    def _build_session(self) -> curl_cffi.Session:
+    def _create_session(self) -> curl_cffi.Session:
         session = curl_cffi.Session()
         session.headers.update(self._make_headers())
         self._cookie_manager.apply_to_session(session)
         return session
 
-    def _api_post(
+    def _api_request(
         self,
         session: curl_cffi.Session,
         chapter_id: int | str,
@@ -124,28 +144,20 @@ class SeleniumRecoveryDownloader(BaseDownloader):
             API_URL,
             data=payload,
             impersonate="chrome",
-            timeout=HTTP_TIMEOUT,
+            timeout=host_timeouts.request_timeout(API_URL),
         )
         if response.status_code != 200:
             raise RuntimeError(f"HTTP {response.status_code}")
         return response.json()
 
-    @staticmethod
-    def _fetch_file(session: curl_cffi.Session, url: str, dest: Path) -> None:
-        response = session.get(
+    def _open_stream(
+        self, session: curl_cffi.Session, url: str, headers: dict[str, str] | None = None,
+    ) -> Any:
+        return session.get(
             url,
+            headers=headers,
             impersonate="chrome",
             allow_redirects=True,
-            timeout=DOWNLOAD_TIMEOUT,
+            timeout=host_timeouts.stream_timeout(url),
+            stream=True,
         )
-        if response.status_code != 200:
-            raise RuntimeError(f"Ошибка скачивания: HTTP {response.status_code}")
-        with open(dest, "wb") as fh:
-            fh.write(response.content)
-
-    # Не используются в Selenium-загрузчике, но нужны для ABC
-    def _api_request(self, chapter_id: int | str, news_id: int | str) -> dict[str, Any]:
-        raise NotImplementedError  # pragma: no cover
-
-    def _download_file(self, url: str, dest: Path) -> None:
-        raise NotImplementedError  # pragma: no cover
@@ -0,0 +1,93 @@
+"""
+Межпроцессная блокировка файла (Windows -- msvcrt, POSIX -- fcntl).
+
+Несколько процессов приложения (второе окно, движок скачивания) читают
+и переписывают одни и те же файлы; чтение-изменение-запись под этой
+блокировкой не теряет чужих обновлений.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+from pathlib import Path
+from types import TracebackType
+
+from manga_downloader.config import FILE_LOCK_TIMEOUT
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+_RETRY_DELAY = 0.05
+
+
+class FileLock:
+    """Эксклюзивная блокировка ``<path>.lock`` на время блока ``with``.
+
+    Блокировка рекомендательная: её соблюдают только те, кто её берёт.
+    Внутри одного процесса не реентерабельна.
+    """
+
+    def __init__(self, path: Path, timeout: float = FILE_LOCK_TIMEOUT) -> None:
+        self.path = path.with_name(path.name + ".lock")
+        self._timeout = timeout
+        self._fd: int | None = None
+
+    def acquire(self) -> None:
+        """Ждёт блокировку не дольше *timeout*, иначе ``TimeoutError``."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = time.monotonic() + self._timeout
+        while True:
+            try:
+                _lock(fd)
+                self._fd = fd
+                return
+            except OSError:
+                if time.monotonic() >= deadline:
+                    os.close(fd)
+                    raise TimeoutError(f"Файл занят другим процессом: {self.path}")
+                time.sleep(_RETRY_DELAY)
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        try:
+            _unlock(self._fd)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self) -> FileLock:
+        self.acquire()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.release()
+
+
+if sys.platform == "win32":
+
+    def _lock(fd: int) -> None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+
+    def _unlock(fd: int) -> None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+else:
+
+    def _lock(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def _unlock(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
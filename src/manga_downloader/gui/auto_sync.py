@@ -0,0 +1,52 @@
+"""
+Очередь автодокачки: новые главы тайтлов с включённой опцией «Авто».
+
+Проверка обновлений ставит такие тайтлы в очередь, а главное окно
+забирает их по одному, когда не идёт другое скачивание и текущее время
+попадает в окно ``AUTO_SYNC_HOURS``.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from datetime import datetime
+
+from manga_downloader.config import AUTO_SYNC_HOURS
+
+
+class AutoSyncQueue:
+    """FIFO тайтлов для автодокачки без повторов."""
+
+    def __init__(self, hours: tuple[int, int] | None = AUTO_SYNC_HOURS) -> None:
+        self._hours = hours
+        self._urls: OrderedDict[str, None] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._urls)
+
+    def enqueue(self, url: str) -> bool:
+        """Ставит тайтл в очередь. ``False``, если он уже там."""
+        if url in self._urls:
+            return False
+        self._urls[url] = None
+        return True
+
+    def discard(self, url: str) -> None:
+        self._urls.pop(url, None)
+
+    def pop(self, now: datetime | None = None) -> str | None:
+        """Следующий тайтл, если очередь не пуста и окно открыто."""
+        if not self._urls or not self.in_window(now):
+            return None
+        url, _ = self._urls.popitem(last=False)
+        return url
+
+    def in_window(self, now: datetime | None = None) -> bool:
+        """Попадает ли *now* в разрешённые часы (окно может идти через полночь)."""
+        if self._hours is None:
+            return True
+        start, end = self._hours
+        hour = (now or datetime.now()).hour
+        if start <= end:
+            return start <= hour < end
+        return hour >= start or hour < end
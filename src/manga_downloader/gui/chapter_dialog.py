@@ -1,8 +1,9 @@
 """
 Модальный диалог выбора глав перед скачиванием.
 
-Показывает информацию о манге, позволяет выбрать диапазон глав
-и режим скачивания (новый архив / дополнить существующий).
+Показывает информацию о манге, позволяет выбрать все главы, диапазон
+или только недостающие (по ID глав) и режим скачивания (новый архив /
+дополнить существующий).
 """
 
 from __future__ import annotations
@@ -22,6 +23,11 @@ from PyQt5.QtWidgets import (
     QWidget,
 )
 
+from manga_downloader.chapter_set import ChapterSet
+
+# Сколько отрезков недостающих глав показывать в подсказке.
+_MISSING_RANGES_SHOWN = 8
+
 
 class ChapterSelectDialog(QDialog):
     """Модальное окно выбора глав и режима скачивания."""
@@ -35,6 +41,8 @@ class ChapterSelectDialog(QDialog):
         url: str = "",
         last_chapter: int = 0,
         existing_cbz_path: str = "",
+        missing_count: int | None = None,
+        missing_chapters: ChapterSet | None = None,
     ) -> None:
         super().__init__(parent)
         self.setWindowTitle("Выбор глав для скачивания")
@@ -46,8 +54,10 @@ class ChapterSelectDialog(QDialog):
         self._total = total_chapters
         self._existing_cbz_path = existing_cbz_path
         self._cbz_exists = bool(existing_cbz_path) and Path(existing_cbz_path).exists()
+        self._last_chapter = last_chapter
+        self._missing_chapters = missing_chapters
 
-        self._build_ui(title, total_chapters, url, last_chapter)
+        self._build_ui(title, total_chapters, url, last_chapter, missing_count, missing_chapters)
 
     # -- Построение UI ---------------------------------------------------------
 
@@ -57,6 +67,8 @@ class ChapterSelectDialog(QDialog):
         total: int,
         url: str,
         last_chapter: int,
+        missing_count: int | None,
+        missing_chapters: ChapterSet | None,
     ) -> None:
         layout = QVBoxLayout(self)
         layout.setSpacing(12)
@@ -87,10 +99,14 @@ class ChapterSelectDialog(QDialog):
         self._radio_all.setChecked(False)
         self._radio_range = QRadioButton("Диапазон глав:")
         self._radio_range.setChecked(False)
+        self._radio_missing = QRadioButton(f"Только недостающие ({missing_count or 0})")
+        self._radio_missing.setChecked(False)
+        self._radio_missing.setVisible(bool(missing_count))
 
         mode_row = QHBoxLayout()
         mode_row.addWidget(self._radio_all)
         mode_row.addWidget(self._radio_range)
+        mode_row.addWidget(self._radio_missing)
         mode_row.addStretch()
 
         spin_row = QHBoxLayout()
@@ -121,7 +137,7 @@ class ChapterSelectDialog(QDialog):
         range_layout.addLayout(mode_row)
         range_layout.addLayout(spin_row)
 
-        # --- Режим архива (только для диапазона + существующий архив) ---
+        # --- Режим архива (только для части глав + существующий архив) ---
         self._mode_container = QVBoxLayout()
         self._mode_container.setSpacing(4)
 
@@ -150,17 +166,36 @@ class ChapterSelectDialog(QDialog):
         self._warning_label.hide()
         self._mode_container.addWidget(self._warning_label)
 
+        # Дописать можно только главы после уже скачанных: страницы
+        # в архиве идут подряд, вставить главу в середину нельзя.
+        self._order_label = QLabel(
+            "⚠️ Среди выбранных есть главы до уже скачанных — в конец архива их "
+            "не дописать. Для правильного порядка скачайте все главы заново."
+        )
+        self._order_label.setObjectName("dialog_warning")
+        self._order_label.setWordWrap(True)
+        self._order_label.hide()
+        self._mode_container.addWidget(self._order_label)
+
         range_layout.addLayout(self._mode_container)
 
         # --- Подсказка о докачке ---
-        has_new = last_chapter > 0 and last_chapter < total
+        # Если известны ID глав, недостающие считаются точно, а не по номеру.
+        has_missing = bool(missing_count)
+        has_new = not has_missing and missing_count is None and 0 < last_chapter < total
 
         self._hint_label = QLabel("")
         self._hint_label.setObjectName("dialog_hint")
         self._hint_label.setWordWrap(True)
         self._hint_label.hide()
 
-        if has_new:
+        if has_missing:
+            self._hint_label.setText(
+                f"💡 Не скачано глав: {missing_count}. "
+                "Будут скачаны только они, даже если главы на сайте сдвинулись."
+            )
+            self._hint_label.show()
+        elif has_new:
             self._hint_label.setText(
                 f"💡 Ранее скачано до главы {last_chapter}. "
                 f"Предложен диапазон {last_chapter + 1}–{total}."
@@ -168,6 +203,17 @@ class ChapterSelectDialog(QDialog):
             self._hint_label.show()
 
         range_layout.addWidget(self._hint_label)
+
+        # Какие именно главы не скачаны (с пропусками в середине)
+        self._missing_label = QLabel("")
+        self._missing_label.setObjectName("dialog_hint")
+        self._missing_label.setWordWrap(True)
+        self._missing_label.setVisible(bool(missing_chapters))
+        if missing_chapters:
+            self._missing_label.setText(
+                f"Не скачаны главы: {missing_chapters.format(_MISSING_RANGES_SHOWN)}"
+            )
+        range_layout.addWidget(self._missing_label)
         range_group.setLayout(range_layout)
 
         # --- Кнопки ---
@@ -192,13 +238,20 @@ class ChapterSelectDialog(QDialog):
         # --- Сигналы ---
         self._radio_all.toggled.connect(self._on_chapter_mode_changed)
         self._radio_range.toggled.connect(self._on_chapter_mode_changed)
+        self._radio_missing.toggled.connect(self._on_chapter_mode_changed)
         self._radio_mode_new.toggled.connect(self._on_archive_mode_changed)
         self._radio_mode_append.toggled.connect(self._on_archive_mode_changed)
+        self._spin_start.valueChanged.connect(self._update_append_allowed)
         self._btn_download.clicked.connect(self.accept)
         self._btn_cancel.clicked.connect(self.reject)
 
         # --- Установка дефолтов ---
-        if has_new:
+        if has_missing and self._cbz_exists and self._missing_has_gaps():
+            # Пропуски в середине: в порядке глав архив соберёт только полная закачка.
+            self._radio_all.setChecked(True)
+        elif has_missing:
+            self._radio_missing.setChecked(True)
+        elif has_new:
             self._radio_range.setChecked(True)
             self._spin_start.setValue(last_chapter + 1)
             self._spin_end.setValue(total)
@@ -224,8 +277,8 @@ class ChapterSelectDialog(QDialog):
         self._spin_start.setEnabled(is_range)
         self._spin_end.setEnabled(is_range)
 
-        if is_range and self._cbz_exists:
-            # Диапазон + архив есть → показать выбор режима, дефолт "Дополнить"
+        if not self._radio_all.isChecked() and self._cbz_exists:
+            # Часть глав + архив есть → показать выбор режима, дефолт "Дополнить"
             self._mode_widget.show()
             self._radio_mode_append.setChecked(True)
         else:
@@ -233,27 +286,51 @@ class ChapterSelectDialog(QDialog):
             self._mode_widget.hide()
             self._radio_mode_new.setChecked(True)
 
+        self._update_append_allowed()
+
+    def _update_append_allowed(self) -> None:
+        """Запрещает «Дополнить», если выбранные главы не идут после скачанных."""
+        allowed = self._appends_in_order()
+        self._radio_mode_append.setEnabled(allowed)
+        if not allowed and self._radio_mode_append.isChecked():
+            self._radio_mode_new.setChecked(True)
+        self._order_label.setVisible(self._mode_widget.isVisibleTo(self) and not allowed)
         self._update_warning()
 
+    def _appends_in_order(self) -> bool:
+        if self._radio_range.isChecked():
+            return self._spin_start.value() > self._last_chapter
+        if self._radio_missing.isChecked():
+            return not self._missing_has_gaps()
+        return True
+
+    def _missing_has_gaps(self) -> bool:
+        """Есть ли недостающие главы до последней скачанной."""
+        missing = self._missing_chapters
+        return bool(missing) and missing.ranges[0][0] <= self._last_chapter
+
     def _on_archive_mode_changed(self) -> None:
         self._update_warning()
 
     def _update_warning(self) -> None:
         """Показывает предупреждение если будет создан новый архив при существующем."""
         will_overwrite = self._cbz_exists and (
-            self._radio_all.isChecked()
-            or (self._radio_range.isChecked() and self._radio_mode_new.isChecked())
+            self._radio_all.isChecked() or self._radio_mode_new.isChecked()
         )
         self._warning_label.setVisible(will_overwrite)
 
     # -- Публичный API ---------------------------------------------------------
 
     def get_chapter_range(self) -> tuple[int, int] | None:
-        """Возвращает ``(start, end)`` или ``None`` если выбраны все главы."""
-        if self._radio_all.isChecked():
+        """Возвращает ``(start, end)`` или ``None``, если выбран не диапазон."""
+        if not self._radio_range.isChecked():
             return None
         return (self._spin_start.value(), self._spin_end.value())
 
+    def only_missing(self) -> bool:
+        """``True``, если выбрано скачивание только недостающих глав."""
+        return self._radio_missing.isChecked()
+
     def get_download_mode(self) -> str:
         """Возвращает ``'new'`` или ``'append'``."""
         if self._radio_all.isChecked():
@@ -18,6 +18,7 @@ from PyQt5.QtGui import QCloseEvent, QTextCursor
 from PyQt5.QtCore import QSize, Qt, QTimer
 from PyQt5.QtWidgets import (
     QApplication,
+    QCheckBox,
     QFileDialog,
     QHBoxLayout,
     QLabel,
@@ -32,7 +33,15 @@ from PyQt5.QtWidgets import (
     QWidget,
 )
 
-from manga_downloader.config import OUTPUT_DIR
+from manga_downloader.auth_probe import AUTH_CHALLENGE
+from manga_downloader.chapter_set import ChapterSet
+from manga_downloader.config import (
+    AUTO_SYNC_MAX_RATE,
+    HISTORY_FLUSH_INTERVAL,
+    OUTPUT_DIR,
+    UPDATE_TICK,
+)
+from manga_downloader.gui.auto_sync import AutoSyncQueue
 from manga_downloader.gui.chapter_dialog import ChapterSelectDialog
 from manga_downloader.gui.donation_dialog import DonationDialog
 from manga_downloader.gui.styles import (
@@ -44,6 +53,7 @@ from manga_downloader.gui.styles import (
     LOG_COLOR_WARNING,
 )
 from manga_downloader.gui.update_checker import UpdateChecker
+from manga_downloader.gui.update_scheduler import UpdateScheduler
 from manga_downloader.history import DownloadHistory
 from manga_downloader.manga.chapter_worker import ChapterWorker
 
@@ -61,7 +71,11 @@ class DownloaderApp(QWidget):
         self._update_checker: UpdateChecker | None = None
         self._last_cbz_path: str | None = None
         self._history = DownloadHistory()
+        self._scheduler = UpdateScheduler(self._history)
         self._new_chapters: dict[str, int] = {}
+        self._feed_attempts: dict[str, str] = {}
+        self._auto_sync = AutoSyncQueue()
+        self._auto_sync_url: str | None = None
 
         self._build_ui()
         self._apply_theme()
@@ -70,7 +84,12 @@ class DownloaderApp(QWidget):
 
         self._update_timer = QTimer(self)
         self._update_timer.timeout.connect(self._start_update_check)
-        self._update_timer.start(5 * 60 * 1000)
+        self._update_timer.timeout.connect(self._run_auto_sync)
+        self._update_timer.start(UPDATE_TICK * 1000)
+
+        self._flush_timer = QTimer(self)
+        self._flush_timer.timeout.connect(self._flush_history)
+        self._flush_timer.start(HISTORY_FLUSH_INTERVAL * 1000)
         self._start_update_check()
 
     # -- Построение интерфейса -------------------------------------------------
@@ -107,9 +126,18 @@ class DownloaderApp(QWidget):
         button_layout.addWidget(self._btn_donate)
 
         # === Библиотека ===
+        library_header = QHBoxLayout()
         library_label = QLabel("Библиотека")
         library_label.setObjectName("label_section_library")
 
+        self._btn_check_now = QPushButton("Проверить сейчас")
+        self._btn_check_now.setObjectName("btn_check_updates")
+        self._btn_check_now.setToolTip("Проверить новые главы у всех тайтлов, не дожидаясь расписания")
+
+        library_header.addWidget(library_label)
+        library_header.addStretch()
+        library_header.addWidget(self._btn_check_now)
+
         self._library_list = QListWidget()
         self._library_list.setMinimumHeight(60)
         self._library_list.setMaximumHeight(200)
@@ -152,7 +180,7 @@ class DownloaderApp(QWidget):
 
         # === Собираем layout ===
         main_layout.addLayout(button_layout)
-        main_layout.addWidget(library_label)
+        main_layout.addLayout(library_header)
         main_layout.addWidget(self._library_list)
         main_layout.addLayout(progress_layout)
         main_layout.addLayout(log_header)
@@ -168,12 +196,14 @@ class DownloaderApp(QWidget):
         self._btn_clear_log.clicked.connect(self._on_clear_log)
         self._btn_save_log.clicked.connect(self._on_save_log)
         self._btn_donate.clicked.connect(self._on_donate)
+        self._btn_check_now.clicked.connect(self._on_check_now)
 
     # -- Закрытие окна ---------------------------------------------------------
 
     def closeEvent(self, event: QCloseEvent) -> None:  # noqa: N802
         """Корректно останавливаем фоновые потоки перед закрытием."""
         self._update_timer.stop()
+        self._flush_timer.stop()
 
         if self._update_checker is not None and self._update_checker.isRunning():
             self._update_checker.stop()
@@ -183,6 +213,7 @@ class DownloaderApp(QWidget):
             self._worker.cancel()
             self._worker.wait(5000)
 
+        self._history.close()
         super().closeEvent(event)
 
     # -- Вспомогательные -------------------------------------------------------
@@ -230,9 +261,7 @@ class DownloaderApp(QWidget):
             label.setObjectName("library_item_label")
             label.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
 
-            new_count = self._new_chapters.get(url, 0)
-            if new_count == 0 and known_total > last_ch:
-                new_count = known_total - last_ch
+            new_count = self._history.new_chapter_count(url)
             badge = QLabel(f"+{new_count}")
             badge.setObjectName("badge_new_chapters")
             badge.setVisible(new_count > 0)
@@ -243,6 +272,12 @@ class DownloaderApp(QWidget):
             btn_download.setEnabled(new_count > 0 or known_total == 0)
             btn_download.clicked.connect(lambda checked, u=url: self._on_download_selected(u))
 
+            chk_auto = QCheckBox("Авто")
+            chk_auto.setObjectName("chk_lib_auto_sync")
+            chk_auto.setToolTip("Автоматически докачивать новые главы в существующий архив")
+            chk_auto.setChecked(bool(entry.get("auto_sync")))
+            chk_auto.toggled.connect(lambda checked, u=url: self._on_auto_sync_toggled(u, checked))
+
             btn_delete = QPushButton("✕")
             btn_delete.setObjectName("btn_lib_delete")
             btn_delete.setToolTip("Удалить из истории")
@@ -251,6 +286,7 @@ class DownloaderApp(QWidget):
 
             row_layout.addWidget(label)
             row_layout.addWidget(badge)
+            row_layout.addWidget(chk_auto)
             row_layout.addWidget(btn_download)
             row_layout.addWidget(btn_delete)
 
@@ -290,40 +326,94 @@ class DownloaderApp(QWidget):
                 self._append_log(f'⚠️ Не удалось удалить архив: {exc}')
 
         self._history.delete(url)
+        self._auto_sync.discard(url)
         self._refresh_library_list()
         self._append_log(f'📊 "{title}" удалена из библиотеки')
 
     # -- Проверка обновлений ---------------------------------------------------
 
-    def _start_update_check(self) -> None:
-        """Запускает фоновую проверку новых глав для всех тайтлов."""
-        entries = self._history.get_all()
-        if not entries:
-            return
+    def _start_update_check(self, force: bool = False) -> None:
+        """Запускает фоновую проверку тайтлов, которым пора по расписанию.
+
+        С *force* проверяются все тайтлы библиотеки. Тайтлы из ленты
+        подписок сверяются с ней при каждой проверке.
+        """
         if self._update_checker and self._update_checker.isRunning():
             return
+        library = self._history.get_all()
+        due = library if force else self._scheduler.due()
+        if not due:
+            return
 
+        due_urls = {e["url"] for e in due if e.get("url")}
+        self._scheduler.mark_dispatched(list(due_urls))
         self._new_chapters.clear()
-        self._append_log("🔄 Проверка обновлений библиотеки...")
+        if len(due) == len(library):
+            self._append_log("🔄 Проверка обновлений библиотеки...")
+        else:
+            self._append_log(f"🔄 Проверка обновлений: {len(due)} из {len(library)} тайтлов...")
 
-        self._update_checker = UpdateChecker(entries, self)
-        self._update_checker.result.connect(self._on_update_check_result)
+        self._update_checker = UpdateChecker(
+            library, self, due=None if force else due_urls,
+            feed_attempts=self._feed_attempts,
+        )
+        self._update_checker.results.connect(self._on_update_check_results)
+        self._update_checker.unchanged.connect(self._on_update_check_unchanged)
+        self._update_checker.feed_synced.connect(self._on_follow_feed_synced)
+        self._update_checker.stats.connect(self._on_update_check_stats)
+        self._update_checker.auth_failed.connect(self._on_update_check_auth_failed)
         self._update_checker.finished_all.connect(self._on_update_check_finished)
         self._update_checker.start()
 
-    def _on_update_check_result(self, url: str, total_on_site: int) -> None:
-        """Получен результат проверки одного тайтла -- сохраняем данные."""
-        entry = self._history.get(url)
-        if not entry:
+    def _on_update_check_results(self, batch: list) -> None:
+        """Получена пачка результатов проверки -- обновляем историю в памяти."""
+        for url, total_on_site, site_ids, feed_marker in batch:
+            if not self._history.get(url):
+                continue
+            changed = self._history.update_total(
+                url, total_on_site, site_ids, feed_marker=feed_marker,
+            )
+            self._scheduler.record_result(url, changed)
+            self._note_new_chapters(url)
+
+    def _on_update_check_unchanged(self, urls: list) -> None:
+        """Тайтлы без обновлений по ленте подписок -- страницы не запрашивались."""
+        for url in urls:
+            if not self._history.get(url):
+                continue
+            self._scheduler.record_result(url, False)
+            self._note_new_chapters(url)
+
+    def _note_new_chapters(self, url: str) -> None:
+        """Запоминает новые главы тайтла; тайтл с «Авто» ставится в очередь."""
+        new_count = self._history.new_chapter_count(url)
+        if new_count <= 0:
             return
-        self._history.update_total(url, total_on_site)
-        last_ch = entry.get("last_chapter_downloaded", 0)
-        new_count = max(0, total_on_site - last_ch)
-        if new_count > 0:
-            self._new_chapters[url] = new_count
+        self._new_chapters[url] = new_count
+        entry = self._history.get(url) or {}
+        if entry.get("auto_sync") and url != self._auto_sync_url:
+            self._auto_sync.enqueue(url)
+
+    def _on_follow_feed_synced(self, followed: int, updated: int, outside: int) -> None:
+        message = f"📰 Лента подписок: {followed} тайтлов, обновились в библиотеке: {updated}"
+        if outside:
+            message += f", не в библиотеке: {outside}"
+        self._append_log(message)
+
+    def _on_update_check_stats(self, checked: int, rate: float, p95: float) -> None:
+        self._append_log(
+            f"📊 Проверено тайтлов: {checked} ({rate:.1f}/с, p95 {p95:.2f} с)"
+        )
+
+    def _on_update_check_auth_failed(self, verdict: str) -> None:
+        if verdict == AUTH_CHALLENGE:
+            self._append_log("⚠️ Cloudflare не пропускает проверку обновлений — нужен вход через браузер")
+        else:
+            self._append_log("⚠️ Cookies устарели — проверка обновлений пропущена, войдите через браузер")
 
     def _on_update_check_finished(self) -> None:
-        """Все проверки завершены -- обновляем UI один раз."""
+        """Все проверки завершены -- сохраняем историю и обновляем UI один раз."""
+        self._history.flush()
         total_new = sum(self._new_chapters.values())
         if total_new > 0:
             self._append_log(f"✅ Найдено новых глав: {total_new}")
@@ -333,6 +423,73 @@ class DownloaderApp(QWidget):
         if self._update_checker is not None:
             self._update_checker.deleteLater()
             self._update_checker = None
+        self._run_auto_sync()
+
+    # -- Автодокачка -----------------------------------------------------------
+
+    def _on_auto_sync_toggled(self, url: str, enabled: bool) -> None:
+        self._history.set_auto_sync(url, enabled)
+        if not enabled:
+            self._auto_sync.discard(url)
+            return
+        self._note_new_chapters(url)
+        self._run_auto_sync()
+
+    def _run_auto_sync(self) -> None:
+        """Запускает докачку следующего тайтла из очереди, если ничего не качается."""
+        if self._worker is not None:
+            return
+        while True:
+            url = self._auto_sync.pop()
+            if url is None:
+                return
+            entry = self._history.get(url)
+            if entry and entry.get("auto_sync") and self._history.new_chapter_count(url) > 0:
+                # Докачиваются только главы после последней скачанной: их можно
+                # дописать в конец архива. Пропуски в середине -- вручную.
+                trailing = self._history.trailing_ids(url)
+                last_chapter = entry.get("last_chapter_downloaded", 0)
+                if trailing is not None:
+                    has_new = bool(trailing)
+                else:
+                    has_new = entry.get("last_known_total", 0) > last_chapter
+                if has_new:
+                    break
+
+        title = entry.get("title", url)
+        cbz_path = entry.get("cbz_path", "")
+        append = bool(cbz_path) and Path(cbz_path).exists()
+        chapter_range: tuple[int, int] | None = None
+        after_ids: set[str] | None = None
+        if trailing is not None:
+            after_ids = set(entry.get("downloaded_ids", []))
+        else:
+            chapter_range = (last_chapter + 1, entry.get("last_known_total", 0))
+
+        self._append_log(f'🔁 Автодокачка новых глав: "{title}"')
+        self._auto_sync_url = url
+        self._create_and_start_worker(
+            initial_url=url,
+            chapter_range=chapter_range,
+            download_mode="append" if append else "new",
+            cbz_path=cbz_path if append else None,
+            after_ids=after_ids,
+            library_mode=True,
+            max_rate=AUTO_SYNC_MAX_RATE,
+        )
+
+    def _flush_history(self) -> None:
+        """Отложенная запись истории на диск и подхват чужих изменений.
+
+        Пока идёт проверка обновлений, запись откладывается до её конца:
+        весь проход стоит одной транзакции.
+        """
+        if self._update_checker is not None and self._update_checker.isRunning():
+            return
+        # Историю могли изменить другие окна/процессы приложения.
+        if self._history.refresh():
+            self._refresh_library_list()
+        self._history.flush()
 
     # -- Цветные логи ----------------------------------------------------------
 
@@ -373,7 +530,10 @@ class DownloaderApp(QWidget):
         chapter_range: tuple[int, int] | None = None,
         download_mode: str | None = None,
         cbz_path: str | None = None,
+        skip_ids: set[str] | None = None,
+        after_ids: set[str] | None = None,
         library_mode: bool = False,
+        max_rate: int = 0,
     ) -> None:
         """Общая логика создания и запуска воркера."""
         self._btn_start.setEnabled(False)
@@ -392,6 +552,12 @@ class DownloaderApp(QWidget):
             worker.set_download_mode(download_mode, cbz_path or "")
         if chapter_range:
             worker.set_chapter_range(*chapter_range)
+        elif after_ids is not None:
+            worker.set_after_chapter_ids(after_ids)
+        elif skip_ids is not None:
+            worker.set_skip_chapter_ids(skip_ids)
+        if max_rate:
+            worker.set_max_rate(max_rate)
 
         if library_mode:
             worker.set_library_mode(True)
@@ -430,27 +596,41 @@ class DownloaderApp(QWidget):
         existing_cbz = entry.get("cbz_path", "")
         known_total = entry.get("last_known_total", 0)
 
-        new_count = self._new_chapters.get(url, 0)
-        if new_count == 0 and known_total > last_chapter:
-            new_count = known_total - last_chapter
-        total = last_chapter + new_count if new_count > 0 else known_total
+        new_count = self._history.new_chapter_count(url)
+        missing = self._history.missing_ids(url)
+        if missing is not None:
+            total = known_total
+        else:
+            total = last_chapter + new_count if new_count > 0 else known_total
         if total <= 0:
             total = last_chapter
 
-        result = self._show_chapter_dialog(title, total, url, last_chapter, existing_cbz)
+        result = self._show_chapter_dialog(
+            title, total, url, last_chapter, existing_cbz,
+            missing_count=len(missing) if missing is not None else None,
+            missing_chapters=self._history.missing_chapters(url),
+        )
         if result is None:
             return
 
-        chapter_range, download_mode, cbz_path = result
+        chapter_range, download_mode, cbz_path, only_missing = result
+        self._auto_sync.discard(url)
         self._append_log(f'▶️ Скачивание из библиотеки: "{title}"')
         self._create_and_start_worker(
             initial_url=url,
             chapter_range=chapter_range,
             download_mode=download_mode,
             cbz_path=cbz_path,
+            skip_ids=set(entry.get("downloaded_ids", [])) if only_missing else None,
             library_mode=True,
         )
 
+    def _on_check_now(self) -> None:
+        if self._update_checker and self._update_checker.isRunning():
+            self._append_log("⏳ Проверка обновлений уже идёт")
+            return
+        self._start_update_check(force=True)
+
     def _on_cancel(self) -> None:
         if self._worker:
             self._worker.cancel()
@@ -500,11 +680,13 @@ class DownloaderApp(QWidget):
         url: str,
         last_chapter: int,
         existing_cbz: str,
-    ) -> tuple[tuple[int, int] | None, str, str | None] | None:
+        missing_count: int | None = None,
+        missing_chapters: ChapterSet | None = None,
+    ) -> tuple[tuple[int, int] | None, str, str | None, bool] | None:
         """Показывает диалог выбора глав.
 
-        Возвращает ``(chapter_range, download_mode, cbz_path)`` или ``None``
-        если пользователь отменил.
+        Возвращает ``(chapter_range, download_mode, cbz_path, only_missing)``
+        или ``None`` если пользователь отменил.
         """
         dialog = ChapterSelectDialog(
             self,
@@ -513,6 +695,8 @@ class DownloaderApp(QWidget):
             url=url,
             last_chapter=last_chapter,
             existing_cbz_path=existing_cbz,
+            missing_count=missing_count,
+            missing_chapters=missing_chapters,
         )
         dialog.setStyleSheet(APP_STYLE)
 
@@ -529,7 +713,7 @@ class DownloaderApp(QWidget):
                 old_path.unlink()
                 self._append_log(f"🗑️ Старый архив удалён: {old_path.name}")
 
-        return chapter_range, download_mode, cbz_path
+        return chapter_range, download_mode, cbz_path, dialog.only_missing()
 
     # -- Слоты от воркера (через сигналы) --------------------------------------
 
@@ -538,30 +722,41 @@ class DownloaderApp(QWidget):
         self._progress_bar.show()
         self._append_log("")
 
-    def _on_manga_info_ready(self, total: int, title: str, url: str) -> None:
+    def _on_manga_info_ready(self, total: int, title: str, url: str, site_ids: list) -> None:
         """Воркер получил информацию о манге -- показываем диалог выбора глав."""
         if not self._worker:
             return
 
         last_chapter = 0
         existing_cbz = ""
+        missing: list[str] | None = None
+        missing_chapters: ChapterSet | None = None
         entry = self._history.get(url)
         if entry:
+            self._history.update_total(url, total, site_ids)
             last_chapter = entry.get("last_chapter_downloaded", 0)
             existing_cbz = entry.get("cbz_path", "")
+            missing = self._history.missing_ids(url)
+            missing_chapters = self._history.missing_chapters(url)
 
-        result = self._show_chapter_dialog(title, total, url, last_chapter, existing_cbz)
+        result = self._show_chapter_dialog(
+            title, total, url, last_chapter, existing_cbz,
+            missing_count=len(missing) if missing is not None else None,
+            missing_chapters=missing_chapters,
+        )
         if result is None:
             self._append_log("⏹️ Скачивание отменено.")
             self._worker.cancel()
             return
 
-        chapter_range, download_mode, cbz_path = result
+        chapter_range, download_mode, cbz_path, only_missing = result
         self._worker.set_download_mode(download_mode, cbz_path)
         if chapter_range:
             self._worker.set_chapter_range(*chapter_range)
         else:
             self._worker.set_chapter_range()
+        if only_missing and entry:
+            self._worker.set_skip_chapter_ids(set(entry.get("downloaded_ids", [])))
 
         self._append_log(f'📊 Подтверждено скачивание "{title}"')
         self._worker.confirm_download()
@@ -580,17 +775,27 @@ class DownloaderApp(QWidget):
         self._btn_open_folder.show()
 
     def _on_download_complete_info(
-        self, url: str, title: str, news_id: str, indices_json: str, total_on_site: int,
+        self,
+        url: str,
+        title: str,
+        news_id: str,
+        indices_json: str,
+        ids_json: str,
+        total_on_site: int,
     ) -> None:
         """Обновляет историю после завершения скачивания."""
         try:
             indices = json.loads(indices_json)
+            chapter_ids = json.loads(ids_json)
         except (json.JSONDecodeError, TypeError):
-            indices = []
+            indices, chapter_ids = [], []
 
         cbz_path = self._last_cbz_path or ""
-        self._history.upsert(url, title, news_id, indices, cbz_path, total_on_site)
+        self._history.upsert(
+            url, title, news_id, indices, cbz_path, total_on_site, chapter_ids,
+        )
         self._new_chapters.pop(url, None)
+        self._history.flush()
 
     def _on_cancellation_info(self, skipped: int) -> None:
         self._append_log(f"\n⚠️ Завершено с пропусками ({skipped} глав не скачано)")
@@ -621,10 +826,13 @@ class DownloaderApp(QWidget):
         self._btn_open_folder.setVisible(self._has_output_files())
         self._refresh_library_list()
 
+        # Фоновая автодокачка не отвлекает пользователя сигналом.
         app = QApplication.instance()
-        if app:
+        if app and self._auto_sync_url is None:
             app.alert(self, 0)
             app.beep()
 
         self._worker = None
+        self._auto_sync_url = None
         self._start_update_check()
+        self._run_auto_sync()
@@ -286,6 +286,20 @@ QPushButton#btn_save_log:hover {{
     border-color: {_ACCENT};
 }}
 
+QPushButton#btn_check_updates {{
+    background-color: transparent;
+    border: 1px solid {_BORDER};
+    border-radius: 4px;
+    padding: 4px 10px;
+    font-size: 9pt;
+    font-weight: normal;
+    min-height: 16px;
+}}
+QPushButton#btn_check_updates:hover {{
+    background-color: {_BG_LIGHT};
+    border-color: {_ACCENT};
+}}
+
 /* --- Кнопки в строках библиотеки --- */
 QLabel#library_item_label {{
     background-color: transparent;
@@ -324,6 +338,25 @@ QPushButton#btn_lib_download:disabled {{
     background-color: #1a5c2a;
     color: {_TEXT_DIM};
 }}
+QCheckBox#chk_lib_auto_sync {{
+    spacing: 4px;
+    color: {_TEXT_DIM};
+    font-size: 8pt;
+}}
+QCheckBox#chk_lib_auto_sync:checked {{
+    color: {_TEXT};
+}}
+QCheckBox#chk_lib_auto_sync::indicator {{
+    width: 12px;
+    height: 12px;
+    border-radius: 3px;
+    border: 1px solid {_BORDER};
+    background-color: {_BG_INPUT};
+}}
+QCheckBox#chk_lib_auto_sync::indicator:checked {{
+    background-color: {_ACCENT};
+    border-color: {_ACCENT};
+}}
 QPushButton#btn_lib_delete {{
     background-color: transparent;
     color: {_RED};
@@ -1,24 +1,44 @@
 """
 Фоновый поток проверки новых глав для тайтлов в библиотеке.
 
-Парсит страницу каждой манги и сравнивает total_chapters с last_chapter_downloaded.
-Результаты отправляются по одному через сигнал.
+Парсит страницу каждой манги и отдаёт число и ID глав на сайте; новые главы
+определяются по ID относительно скачанных. Рассчитан на библиотеки из тысяч
+тайтлов: у каждого потока пула своя долгоживущая сессия, частота запросов
+ограничена общим token bucket, а результаты уходят в GUI пачками.
+
+Если доступна лента подписок аккаунта, сначала читается она: вне
+расписания страницы запрашиваются только для тайтлов, у которых в ленте
+появилась новая метка обновления, и только один раз на метку. Остальные
+тайтлы (вне ленты или с нераспознанной меткой) ждут расписания.
 """
 
 from __future__ import annotations
 
 import logging
+import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from threading import Event
+from typing import Optional
 
 from PyQt5.QtCore import QThread, pyqtSignal
 
+from manga_downloader.auth_probe import AUTH_CHALLENGE, AUTH_EXPIRED, ensure_auth
+from manga_downloader.cancellation import CancelToken
+from manga_downloader.config import (
+    FOLLOW_FEED_ENABLED,
+    UPDATE_BATCH_INTERVAL,
+    UPDATE_BATCH_SIZE,
+    UPDATE_CHECK_WORKERS,
+)
 from manga_downloader.cookies import CookieManager
-from manga_downloader.manga.parser import MangaParser
+from manga_downloader.manga.follow_feed import FollowFeed
+from manga_downloader.manga.models import MangaSummary
+from manga_downloader.manga.parser import ParserPool
+from manga_downloader.metrics import RollingWindow
+from manga_downloader.rate_limit import site_limiter
 
 logger = logging.getLogger(__name__)
 
-_MAX_WORKERS = 3
+CheckResult = tuple[str, int, list, Optional[str]]
 
 
 class UpdateChecker(QThread):
@@ -27,22 +47,53 @@ class UpdateChecker(QThread):
     Использует пул потоков для параллельных запросов.
     Тихо пропускает тайтлы, если cookies невалидны или сайт недоступен.
 
+    *entries* -- записи библиотеки; *due* -- URL, которым пора проверка
+    по расписанию (``None`` -- всем). Тайтлы с новой меткой в ленте
+    подписок проверяются независимо от расписания. *feed_attempts* --
+    ``{url: метка}`` уже запрошенных вне расписания страниц; поток
+    дополняет словарь, и следующая проверка не повторяет неудачный
+    запрос той же метки до расписания тайтла.
+
     Сигналы:
-        result(str, int): (url, total_chapters_on_site) — результат для одной манги.
+        results(list): пачка ``(url, total_chapters_on_site, ID глав на сайте,
+            метка из ленты или None)``.
+        unchanged(list): URL, которые лента подписок показала без обновлений.
+        feed_synced(int, int, int): (тайтлов в ленте, из них обновилось
+            в библиотеке, подписок вне библиотеки).
+        stats(int, float, float): (проверено тайтлов, тайтлов в секунду,
+            p95 длительности одной проверки в секундах).
+        auth_failed(str): cookies не авторизуют (``AUTH_EXPIRED`` или
+            ``AUTH_CHALLENGE``), проверка не запускалась.
         finished_all(): все проверки завершены.
     """
 
-    result = pyqtSignal(str, int)
+    results = pyqtSignal(list)
+    unchanged = pyqtSignal(list)
+    feed_synced = pyqtSignal(int, int, int)
+    stats = pyqtSignal(int, float, float)
+    auth_failed = pyqtSignal(str)
     finished_all = pyqtSignal()
 
-    def __init__(self, entries: list[dict], parent: object | None = None) -> None:
+    def __init__(
+        self,
+        entries: list[dict],
+        parent: object | None = None,
+        *,
+        due: set[str] | None = None,
+        use_feed: bool = FOLLOW_FEED_ENABLED,
+        feed_attempts: dict[str, str] | None = None,
+    ) -> None:
         super().__init__(parent)
         self._entries = entries
-        self._stop_event = Event()
+        self._due = due
+        self._use_feed = use_feed
+        self._markers: dict[str, str | None] = {}
+        self._feed_attempts = feed_attempts if feed_attempts is not None else {}
+        self._stop = CancelToken()
 
     def stop(self) -> None:
         """Запрашивает остановку потока."""
-        self._stop_event.set()
+        self._stop.cancel()
 
     def run(self) -> None:
         cookie_mgr = CookieManager()
@@ -57,40 +108,124 @@ class UpdateChecker(QThread):
             self.finished_all.emit()
             return
 
-        urls = [e.get("url", "") for e in self._entries if e.get("url")]
+        # С мёртвыми cookies каждый тайтл провалился бы дважды -- не начинаем.
+        verdict = ensure_auth(cookie_mgr, self._stop)
+        if verdict in (AUTH_EXPIRED, AUTH_CHALLENGE):
+            logger.debug("UpdateChecker: cookies не авторизуют (%s)", verdict)
+            self.auth_failed.emit(verdict)
+            self.finished_all.emit()
+            return
+
+        urls = self._plan(cookie_mgr)
         if not urls:
             self.finished_all.emit()
             return
 
         logger.debug("UpdateChecker: проверяю %d тайтлов", len(urls))
-        workers = min(_MAX_WORKERS, len(urls))
-
-        with ThreadPoolExecutor(max_workers=workers) as pool:
-            futures = {
-                pool.submit(self._check_one, url, cookie_mgr): url
-                for url in urls
-            }
-            for future in as_completed(futures):
-                if self._stop_event.is_set():
-                    pool.shutdown(wait=False, cancel_futures=True)
-                    break
-                url = futures[future]
-                try:
-                    total = future.result()
-                    if total is not None:
-                        logger.debug("UpdateChecker: %s -> %d глав", url, total)
-                        self.result.emit(url, total)
-                except Exception as exc:
-                    logger.debug("Ошибка проверки %s: %s", url, exc)
-
-        self.finished_all.emit()
+        workers = min(UPDATE_CHECK_WORKERS, len(urls))
+        latencies = RollingWindow(len(urls))
+        batch: list[CheckResult] = []
+        last_flush = time.monotonic()
+        started = last_flush
+        parsers = ParserPool(cookie_mgr)
 
-    @staticmethod
-    def _check_one(url: str, cookie_mgr: CookieManager) -> int | None:
-        """Проверяет один тайтл (выполняется в потоке пула)."""
-        parser = MangaParser(cookie_mgr)
         try:
-            info = parser.fetch_quick(url)
-            return info.total_chapters if info else None
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    pool.submit(self._check_one, url, parsers): url
+                    for url in urls
+                }
+                for future in as_completed(futures):
+                    if self._stop.cancelled:
+                        pool.shutdown(wait=False, cancel_futures=True)
+                        break
+                    url = futures[future]
+                    try:
+                        summary, elapsed = future.result()
+                        latencies.add(elapsed)
+                        if summary is not None:
+                            logger.debug(
+                                "UpdateChecker: %s -> %d глав", url, summary.total_chapters,
+                            )
+                            batch.append((
+                                url,
+                                summary.total_chapters,
+                                list(summary.chapter_ids),
+                                self._markers.get(url),
+                            ))
+                    except Exception as exc:
+                        logger.debug("Ошибка проверки %s: %s", url, exc)
+
+                    now = time.monotonic()
+                    if batch and (
+                        len(batch) >= UPDATE_BATCH_SIZE
+                        or now - last_flush >= UPDATE_BATCH_INTERVAL
+                    ):
+                        self.results.emit(batch)
+                        batch = []
+                        last_flush = now
         finally:
-            parser.close()
+            parsers.close()
+
+        if batch:
+            self.results.emit(batch)
+
+        checked = len(latencies)
+        if checked:
+            elapsed = max(time.monotonic() - started, 1e-6)
+            self.stats.emit(checked, checked / elapsed, latencies.percentile(0.95) or 0.0)
+        self.finished_all.emit()
+
+    # -- Лента подписок --------------------------------------------------------
+
+    def _plan(self, cookie_mgr: CookieManager) -> list[str]:
+        """URL, страницы которых нужно запросить.
+
+        Без ленты это тайтлы, которым пора по расписанию. С лентой тайтлы
+        из неё с прежней меткой сразу отдаются как ``unchanged``, с новой --
+        проверяются (вне расписания -- один раз на метку), остальные --
+        по расписанию.
+        """
+        library = [e for e in self._entries if e.get("url")]
+        due = [e["url"] for e in library if self._due is None or e["url"] in self._due]
+        if not self._use_feed:
+            return due
+
+        feed = FollowFeed(cookie_mgr).fetch(self._stop)
+        if feed is None:
+            return due
+
+        to_check: list[str] = []
+        unchanged: list[str] = []
+        for entry in library:
+            url = entry["url"]
+            is_due = self._due is None or url in self._due
+            item = feed.get(url)
+            if item is None or item.marker is None:
+                if is_due:
+                    to_check.append(url)
+            elif item.marker == entry.get("feed_marker"):
+                unchanged.append(url)
+            elif is_due or self._feed_attempts.get(url) != item.marker:
+                to_check.append(url)
+                self._markers[url] = item.marker
+                self._feed_attempts[url] = item.marker
+
+        followed_outside = len(feed.keys() - {e["url"] for e in library})
+        self.feed_synced.emit(len(feed), len(self._markers), followed_outside)
+        if unchanged:
+            self.unchanged.emit(unchanged)
+        return to_check
+
+    # -- Проверка тайтла -------------------------------------------------------
+
+    def _check_one(self, url: str, parsers: ParserPool) -> tuple[MangaSummary | None, float]:
+        """Проверяет один тайтл (выполняется в потоке пула).
+
+        Возвращает сводку и длительность проверки без ожидания лимита.
+        """
+        if not site_limiter.acquire(self._stop):
+            return None, 0.0
+        started = time.monotonic()
+        summary = parsers.get().fetch_quick(url)
+        return summary, time.monotonic() - started
@@ -0,0 +1,104 @@
+"""
+Планировщик проверок обновлений: у каждого тайтла свой интервал.
+
+Интервал подстраивается под наблюдаемую частоту выхода глав: после
+обновления он становится долей медианного промежутка между релизами,
+а пока тайтл молчит -- растёт экспоненциально до ``UPDATE_MAX_INTERVAL``.
+Момент следующей проверки размазывается случайным jitter, чтобы тайтлы
+не собирались в одну пачку запросов.
+"""
+
+from __future__ import annotations
+
+import random
+import statistics
+import time
+from typing import Any
+
+from manga_downloader.config import (
+    UPDATE_BACKOFF,
+    UPDATE_CADENCE_FRACTION,
+    UPDATE_JITTER,
+    UPDATE_MAX_INTERVAL,
+    UPDATE_MIN_INTERVAL,
+    UPDATE_RELEASE_HISTORY,
+)
+from manga_downloader.history import DownloadHistory
+
+
+class UpdateScheduler:
+    """Решает, какие тайтлы пора проверить, и хранит расписание в истории.
+
+    Состояние тайтла -- словарь ``schedule`` в записи истории:
+    ``interval`` (сек), ``next_check`` (Unix time) и ``releases`` --
+    моменты последних замеченных обновлений.
+    """
+
+    def __init__(self, history: DownloadHistory) -> None:
+        self._history = history
+
+    # -- Публичный интерфейс ---------------------------------------------------
+
+    def due(self, now: float | None = None) -> list[dict[str, Any]]:
+        """Записи истории, которые пора проверить."""
+        now = now if now is not None else time.time()
+        return [
+            entry
+            for entry in self._history.get_all()
+            if entry.get("url") and entry.get("schedule", {}).get("next_check", 0) <= now
+        ]
+
+    def mark_dispatched(self, urls: list[str], now: float | None = None) -> None:
+        """Отодвигает следующую проверку отправленных тайтлов.
+
+        Если проверка не вернёт результата (сайт недоступен), тайтл
+        не будет перепроверяться на каждом тике таймера.
+        """
+        now = now if now is not None else time.time()
+        for url in urls:
+            state = self._state(url)
+            if state is not None:
+                state["next_check"] = now + self._jittered(state["interval"])
+                self._history.save(url)
+
+    def record_result(self, url: str, changed: bool, now: float | None = None) -> None:
+        """Пересчитывает интервал тайтла по результату проверки."""
+        now = now if now is not None else time.time()
+        state = self._state(url)
+        if state is None:
+            return
+
+        if changed:
+            releases = state["releases"]
+            releases.append(now)
+            del releases[:-UPDATE_RELEASE_HISTORY]
+            interval = self._cadence_interval(releases)
+        else:
+            interval = state["interval"] * UPDATE_BACKOFF
+
+        state["interval"] = min(max(interval, UPDATE_MIN_INTERVAL), UPDATE_MAX_INTERVAL)
+        state["next_check"] = now + self._jittered(state["interval"])
+        self._history.save(url)
+
+    # -- Внутренние методы -----------------------------------------------------
+
+    def _state(self, url: str) -> dict[str, Any] | None:
+        entry = self._history.get(url)
+        if entry is None:
+            return None
+        return entry.setdefault(
+            "schedule",
+            {"interval": UPDATE_MIN_INTERVAL, "next_check": 0.0, "releases": []},
+        )
+
+    @staticmethod
+    def _cadence_interval(releases: list[float]) -> float:
+        """Доля медианного промежутка между релизами (или минимум)."""
+        if len(releases) < 2:
+            return UPDATE_MIN_INTERVAL
+        gaps = [b - a for a, b in zip(releases, releases[1:])]
+        return statistics.median(gaps) * UPDATE_CADENCE_FRACTION
+
+    @staticmethod
+    def _jittered(interval: float) -> float:
+        return interval * random.uniform(1 - UPDATE_JITTER, 1 + UPDATE_JITTER)
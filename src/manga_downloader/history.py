@@ -1,63 +1,303 @@
 """
 Хранилище истории скачанных манг.
 
-Сохраняет метаданные в JSON-файл для быстрого доступа к ранее скачанным мангам
-и определения новых глав для докачки.
+Сохраняет метаданные в SQLite (WAL) для быстрого доступа к ранее скачанным
+мангам и определения новых глав для докачки. Записи держатся в памяти.
+Запись на диск отложенная (write-behind): :meth:`DownloadHistory.save`
+только отмечает изменённые URL, а :meth:`DownloadHistory.flush` (по таймеру
+GUI и при закрытии) сериализует и пишет в базу одной транзакцией только их.
+Старый ``manga_history.json`` импортируется один раз.
+
+Базу могут делить несколько процессов. Каждая запись несёт ревизию ``rev``;
+:meth:`DownloadHistory.refresh` по ``PRAGMA data_version`` узнаёт о чужих
+коммитах и подтягивает только записи с новой ревизией. Сброс идёт под
+``BEGIN IMMEDIATE``: сначала чужие изменения сливаются с нашими, потом
+пишется результат, так что обновления не теряются.
 """
 
 from __future__ import annotations
 
 import json
 import logging
+import sqlite3
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Iterator
 
-from manga_downloader.config import HISTORY_FILE
+from manga_downloader.chapter_set import ChapterSet
+from manga_downloader.config import HISTORY_DB, HISTORY_FILE
 
 logger = logging.getLogger(__name__)
 
-_CURRENT_VERSION = 1
+_SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS manga (
+    url TEXT PRIMARY KEY,
+    title TEXT NOT NULL DEFAULT '',
+    last_download_date TEXT NOT NULL DEFAULT '',
+    data TEXT NOT NULL,
+    rev INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+# Счётчик ревизий: номер выдаётся один раз, даже если запись с наибольшей
+# ревизией потом удалят (``MAX(rev) + 1`` выдал бы его повторно).
+_REVISION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS revision (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    value INTEGER NOT NULL
+)
+"""
+
+_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_manga_last_download_date ON manga (last_download_date)",
+    "CREATE INDEX IF NOT EXISTS idx_manga_rev ON manga (rev)",
+)
+
+_BUSY_TIMEOUT = 10  # секунд ожидания, пока другой процесс держит запись
 
 
 class DownloadHistory:
-    """Управляет JSON-файлом с историей скачанных манг."""
+    """Управляет SQLite-базой с историей скачанных манг.
 
-    def __init__(self, path: Path | None = None) -> None:
-        self._path = path or HISTORY_FILE
-        self._data: dict[str, Any] = {"version": _CURRENT_VERSION, "manga": {}}
+    Каждая запись -- словарь (как в прежнем JSON-формате) в колонке
+    ``data``; ``url`` и ``last_download_date`` вынесены в индексируемые
+    колонки, ``rev`` -- ревизия последней записи.
+    """
+
+    def __init__(self, path: Path | None = None, legacy_json: Path | None = None) -> None:
+        self._path = path or HISTORY_DB
+        self._legacy_json = legacy_json or HISTORY_FILE
+        self._manga: dict[str, dict[str, Any]] = {}
+        self._saved: dict[str, str] = {}  # url -> JSON записи в базе
+        self._rev = 0  # наибольшая ревизия, которую мы видели
+        self._data_version: int | None = None
+        self._dirty_urls: set[str] = set()
+        self._check_all = False  # изменено неизвестно что: сравнить все записи
+        self._conn: sqlite3.Connection | None = None
         self.load()
 
     # -- Чтение / запись -------------------------------------------------------
 
     def load(self) -> bool:
-        """Загружает историю из файла. Возвращает ``True`` при успехе."""
-        if not self._path.exists():
-            return False
+        """Загружает историю из базы. Возвращает ``True`` при успехе."""
         try:
-            with open(self._path, encoding="utf-8") as f:
-                self._data = json.load(f)
-            return True
+            conn = self._connect()
+            rows = conn.execute("SELECT url, data, rev FROM manga").fetchall()
+            self._data_version = _data_version(conn)
         except Exception as exc:
             logger.error("Ошибка чтения истории: %s", exc)
             return False
+        self._manga = {url: json.loads(data) for url, data, _ in rows}
+        self._saved = {url: data for url, data, _ in rows}
+        self._rev = max((rev for _, _, rev in rows), default=0)
+        self._dirty_urls.clear()
+        self._check_all = False
+        return True
+
+    def refresh(self) -> set[str]:
+        """Подтягивает изменения, записанные другими процессами.
 
-    def save(self) -> bool:
-        """Сохраняет историю в файл. Возвращает ``True`` при успехе."""
+        Пока чужих коммитов не было, это один ``PRAGMA``. Возвращает URL
+        изменившихся (в том числе удалённых) записей.
+        """
         try:
-            self._path.parent.mkdir(parents=True, exist_ok=True)
-            with open(self._path, "w", encoding="utf-8") as f:
-                json.dump(self._data, f, ensure_ascii=False, indent=2)
+            conn = self._connect()
+            version = _data_version(conn)
+            if version == self._data_version:
+                return set()
+            self._data_version = version
+            with _transaction(conn, "BEGIN"):
+                return self._pull(conn)
+        except Exception as exc:
+            logger.error("Ошибка чтения истории: %s", exc)
+            return set()
+
+    def save(self, url: str | None = None) -> None:
+        """Отмечает, что запись *url* изменилась; на диск её запишет :meth:`flush`.
+
+        Без *url* при сбросе сравниваются все записи. Сколько бы изменений
+        ни накопилось между сбросами, они стоят одной транзакции.
+        """
+        if url is None:
+            self._check_all = True
+        else:
+            self._dirty_urls.add(url)
+
+    @property
+    def dirty(self) -> bool:
+        """Есть ли изменения, ещё не записанные на диск."""
+        return self._check_all or bool(self._dirty_urls)
+
+    def flush(self) -> bool:
+        """Пишет изменившиеся записи одной транзакцией. ``True`` при успехе.
+
+        Перед записью под блокировкой базы сливает чужие изменения.
+        При ошибке изменения остаются в памяти и пишутся следующим сбросом.
+        """
+        if not self.dirty:
             return True
+        try:
+            conn = self._connect()
+            with _transaction(conn, "BEGIN IMMEDIATE"):
+                self._pull(conn)
+                urls = self._manga.keys() | self._saved.keys() if self._check_all else self._dirty_urls
+                written: dict[str, str] = {}
+                changed = []
+                removed = []
+                for url in urls:
+                    entry = self._manga.get(url)
+                    if entry is None:
+                        if url in self._saved:
+                            removed.append((url,))
+                        continue
+                    data = _dumps(entry)
+                    if self._saved.get(url) != data:
+                        written[url] = data
+                        changed.append((
+                            url, entry.get("title", ""), entry.get("last_download_date", ""), data,
+                        ))
+                # Ревизия берётся, только если есть что писать: иначе чужой
+                # коммит с тем же номером мы бы сочли уже виденным.
+                rev = _next_revision(conn) if changed or removed else self._rev
+                conn.executemany(
+                    "INSERT OR REPLACE INTO manga (url, title, last_download_date, data, rev)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    [row + (rev,) for row in changed],
+                )
+                conn.executemany("DELETE FROM manga WHERE url = ?", removed)
         except Exception as exc:
             logger.error("Ошибка записи истории: %s", exc)
             return False
+        self._saved.update(written)
+        for (url,) in removed:
+            del self._saved[url]
+        self._rev = max(self._rev, rev)
+        self._dirty_urls.clear()
+        self._check_all = False
+        return True
 
-    # -- Доступ к данным -------------------------------------------------------
+    def close(self) -> None:
+        """Сбрасывает изменения на диск и закрывает соединение с базой."""
+        self.flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
 
-    @property
-    def _manga(self) -> dict[str, Any]:
-        return self._data.setdefault("manga", {})
+    # -- База ------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            # Транзакции открываются явно (см. _transaction).
+            conn = sqlite3.connect(self._path, timeout=_BUSY_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(_SCHEMA)
+            self._conn = conn
+            if _user_version(conn) < _SCHEMA_VERSION:
+                self._migrate(conn)
+            conn.execute(_REVISION_SCHEMA)
+            conn.execute(
+                "INSERT OR IGNORE INTO revision (id, value)"
+                " SELECT 0, COALESCE(MAX(rev), 0) FROM manga"
+            )
+            for statement in _INDEXES:
+                conn.execute(statement)
+        return self._conn
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        """Обновляет схему; версия перечитывается под блокировкой записи,
+        чтобы одновременный запуск двух процессов не мигрировал дважды."""
+        with _transaction(conn, "BEGIN IMMEDIATE"):
+            # Колонку проверяем по схеме, а не по версии: база, где импорт
+            # старого JSON не удался, осталась на версии 0 без ``rev``.
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(manga)")}
+            if "rev" not in columns:
+                conn.execute("ALTER TABLE manga ADD COLUMN rev INTEGER NOT NULL DEFAULT 0")
+            version = _user_version(conn)
+            if version == 0 and not self._import_legacy_json(conn):
+                return  # повторим при следующем запуске
+            if version < _SCHEMA_VERSION:
+                conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+
+    def _import_legacy_json(self, conn: sqlite3.Connection) -> bool:
+        """Однократно переносит записи из старого JSON-файла в базу.
+
+        Файл не удаляется: при откате на старую версию он остаётся на месте.
+        Возвращает ``False``, если файл есть, но прочитать его не удалось.
+        """
+        entries: dict[str, Any] = {}
+        if self._legacy_json.exists():
+            try:
+                with open(self._legacy_json, encoding="utf-8") as f:
+                    entries = json.load(f).get("manga", {})
+            except Exception as exc:
+                logger.error("Ошибка чтения старой истории %s: %s", self._legacy_json, exc)
+                return False
+        conn.executemany(
+            "INSERT OR IGNORE INTO manga (url, title, last_download_date, data)"
+            " VALUES (?, ?, ?, ?)",
+            [
+                (url, e.get("title", ""), e.get("last_download_date", ""), _dumps(e))
+                for url, e in entries.items()
+            ],
+        )
+        if entries:
+            logger.info("📦 История перенесена из %s: %d записей", self._legacy_json.name, len(entries))
+        return True
+
+    def _pull(self, conn: sqlite3.Connection) -> set[str]:
+        """Сливает в память записи, изменённые в базе другими процессами.
+
+        Запись, которую мы не меняли, просто заменяется; изменённая с обеих
+        сторон сливается по полям (:func:`_merge_entry`).
+        """
+        rows = conn.execute(
+            "SELECT url, data, rev FROM manga WHERE rev > ?", (self._rev,),
+        ).fetchall()
+        present = {url for (url,) in conn.execute("SELECT url FROM manga")}
+        changed: set[str] = set()
+
+        for url, data, rev in rows:
+            self._rev = max(self._rev, rev)
+            base = self._saved.get(url)
+            if base == data:
+                continue
+            local = self._manga.get(url)
+            if local is None:
+                if base is None:
+                    self._manga[url] = json.loads(data)
+                    changed.add(url)
+                # Иначе мы её удалили: удаление запишется при сбросе.
+            elif _dumps(local) == base:
+                self._manga[url] = json.loads(data)
+                changed.add(url)
+            else:
+                self._manga[url] = _merge_entry(
+                    json.loads(base) if base else {}, local, json.loads(data),
+                )
+                self._dirty_urls.add(url)
+                changed.add(url)
+            self._saved[url] = data
+
+        for url in self._saved.keys() - present:
+            # Удалена другим процессом; если мы её меняли -- вернём при сбросе.
+            base = self._saved.pop(url)
+            local = self._manga.get(url)
+            if local is None or _dumps(local) == base:
+                self._manga.pop(url, None)
+                changed.add(url)
+            else:
+                self._dirty_urls.add(url)
+
+        if changed:
+            logger.debug("История изменена другим процессом: %d записей", len(changed))
+        return changed
+
+    # -- Доступ к данным -------------------------------------------------------
 
     def get_all(self) -> list[dict[str, Any]]:
         """Все записи, отсортированные по дате последнего скачивания (новые первые)."""
@@ -74,42 +314,209 @@ class DownloadHistory:
         url: str,
         title: str,
         news_id: str,
-        downloaded_chapters: list[int],
+        downloaded_chapters: Iterable[int],
         cbz_path: str,
         total_on_site: int = 0,
+        downloaded_ids: list[str] | None = None,
     ) -> None:
-        """Создаёт или обновляет запись о манге и сохраняет файл."""
+        """Создаёт или обновляет запись о манге и сохраняет её.
+
+        Номера скачанных глав хранятся отрезками (:class:`ChapterSet`).
+        """
         existing = self._manga.get(url, {})
-        prev_chapters: list[int] = existing.get("downloaded_chapters", [])
-        merged = sorted(set(prev_chapters) | set(downloaded_chapters))
+        prev_chapters = ChapterSet.from_json(existing.get("downloaded_chapters"))
+        merged = prev_chapters.union(downloaded_chapters)
+        site_ids = existing.get("site_ids", [])
 
         known_total = total_on_site or existing.get("last_known_total", 0)
 
-        self._manga[url] = {
+        entry = {
             "title": title,
             "url": url,
             "news_id": news_id,
-            "downloaded_chapters": merged,
-            "last_chapter_downloaded": max(merged) if merged else 0,
+            "downloaded_chapters": merged.to_json(),
+            "site_ids": site_ids,
+            "last_chapter_downloaded": merged.max(),
             "last_known_total": known_total,
             "cbz_path": cbz_path,
             "last_download_date": datetime.now().isoformat(timespec="seconds"),
             "download_count": existing.get("download_count", 0) + 1,
         }
-        self.save()
+        for key in ("schedule", "feed_marker", "auto_sync"):
+            if key in existing:
+                entry[key] = existing[key]
+        if "downloaded_ids" in existing or not prev_chapters:
+            merged_ids = set(existing.get("downloaded_ids", [])) | set(downloaded_ids or [])
+            entry["downloaded_ids"] = sorted(merged_ids)
+        elif site_ids:
+            _backfill_ids(entry, site_ids)
+        # Иначе запись остаётся «по номерам», пока проверка не принесёт ID.
+        self._manga[url] = entry
+        self.save(url)
+
+    def update_total(
+        self,
+        url: str,
+        total_on_site: int,
+        site_ids: list[str] | None = None,
+        *,
+        feed_marker: str | None = None,
+    ) -> bool:
+        """Обновляет ``last_known_total`` и ID глав на сайте (из фоновой проверки).
 
-    def update_total(self, url: str, total_on_site: int) -> None:
-        """Обновляет ``last_known_total`` для манги (из фоновой проверки)."""
+        Для записей, скачанных до появления ID, скачанные ID однократно
+        восстанавливаются по порядковым номерам глав.
+        *feed_marker* -- метка тайтла из ленты подписок, с которой
+        сверены эти данные.
+        Возвращает ``True``, если список глав на сайте изменился.
+        """
         entry = self._manga.get(url)
-        if entry and total_on_site > 0:
-            entry["last_known_total"] = total_on_site
-            self.save()
+        if not entry or total_on_site <= 0:
+            return False
+        if site_ids and entry.get("site_ids"):
+            changed = list(site_ids) != entry["site_ids"]
+        else:
+            changed = total_on_site != entry.get("last_known_total", 0)
+        entry["last_known_total"] = total_on_site
+        if site_ids:
+            entry["site_ids"] = list(site_ids)
+            if "downloaded_ids" not in entry:
+                _backfill_ids(entry, site_ids)
+        if feed_marker:
+            entry["feed_marker"] = feed_marker
+        self.save(url)
+        return changed
+
+    def set_auto_sync(self, url: str, enabled: bool) -> None:
+        """Включает или выключает автодокачку новых глав тайтла."""
+        entry = self._manga.get(url)
+        if not entry:
+            return
+        if enabled:
+            entry["auto_sync"] = True
+        else:
+            entry.pop("auto_sync", None)
+        self.save(url)
+
+    def missing_ids(self, url: str) -> list[str] | None:
+        """ID глав, которые есть на сайте, но не скачаны (в порядке сайта).
+
+        ``None``, если для записи ещё неизвестны ID глав на сайте.
+        """
+        entry = self._manga.get(url)
+        if not entry or not entry.get("site_ids") or "downloaded_ids" not in entry:
+            return None
+        downloaded = set(entry["downloaded_ids"])
+        return [cid for cid in entry["site_ids"] if cid not in downloaded]
+
+    def trailing_ids(self, url: str) -> list[str] | None:
+        """ID недостающих глав после последней скачанной (без пропусков в середине).
+
+        Только их можно дописать в конец существующего архива, не нарушив
+        порядок глав. ``None``, если ID глав на сайте ещё неизвестны.
+        """
+        entry = self._manga.get(url)
+        if not entry or not entry.get("site_ids") or "downloaded_ids" not in entry:
+            return None
+        site_ids = entry["site_ids"]
+        downloaded = set(entry["downloaded_ids"])
+        last = max((i for i, cid in enumerate(site_ids) if cid in downloaded), default=-1)
+        return site_ids[last + 1:]
+
+    def downloaded_chapters(self, url: str) -> ChapterSet:
+        """Порядковые номера скачанных глав."""
+        entry = self._manga.get(url) or {}
+        return ChapterSet.from_json(entry.get("downloaded_chapters"))
+
+    def missing_chapters(self, url: str) -> ChapterSet:
+        """Порядковые номера глав на сайте, которые не скачаны.
+
+        По ID, если они известны, иначе -- по номерам до ``last_known_total``
+        (включая пропуски в середине).
+        """
+        entry = self._manga.get(url) or {}
+        site_ids = entry.get("site_ids")
+        if site_ids and "downloaded_ids" in entry:
+            downloaded = set(entry["downloaded_ids"])
+            return ChapterSet(i for i, cid in enumerate(site_ids, 1) if cid not in downloaded)
+        return self.downloaded_chapters(url).missing(entry.get("last_known_total", 0))
+
+    def new_chapter_count(self, url: str) -> int:
+        """Сколько глав не скачано: по ID, а для старых записей -- по счётчику."""
+        missing = self.missing_ids(url)
+        if missing is not None:
+            return len(missing)
+        entry = self._manga.get(url) or {}
+        return max(0, entry.get("last_known_total", 0) - entry.get("last_chapter_downloaded", 0))
 
     def delete(self, url: str) -> bool:
         """Удаляет запись. Возвращает ``True`` если запись существовала."""
         if url in self._manga:
             del self._manga[url]
-            self.save()
+            self.save(url)
             return True
         return False
 
+
+def _backfill_ids(entry: dict[str, Any], site_ids: list[str]) -> None:
+    """Восстанавливает ID скачанных глав старой записи по их порядковым номерам."""
+    entry["downloaded_ids"] = sorted(
+        site_ids[n - 1]
+        for n in ChapterSet.from_json(entry.get("downloaded_chapters"))
+        if 0 < n <= len(site_ids)
+    )
+
+
+def _dumps(entry: dict[str, Any]) -> str:
+    return json.dumps(entry, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+
+def _merge_entry(base: dict[str, Any], local: dict[str, Any], remote: dict[str, Any]) -> dict[str, Any]:
+    """Трёхстороннее слияние записи, изменённой и у нас, и другим процессом.
+
+    Поля, которые мы меняли, берутся наши, остальные -- из базы. Скачанные
+    главы объединяются: скачанное в любом из процессов не теряется.
+    """
+    merged = dict(remote)
+    for key in local.keys() | base.keys():
+        if local.get(key) != base.get(key):
+            if key in local:
+                merged[key] = local[key]
+            else:
+                merged.pop(key, None)
+
+    chapters = ChapterSet.from_json(local.get("downloaded_chapters")).union(
+        ChapterSet.from_json(remote.get("downloaded_chapters"))
+    )
+    merged["downloaded_chapters"] = chapters.to_json()
+    merged["last_chapter_downloaded"] = chapters.max()
+    if "downloaded_ids" in local or "downloaded_ids" in remote:
+        merged["downloaded_ids"] = sorted(
+            set(local.get("downloaded_ids", [])) | set(remote.get("downloaded_ids", []))
+        )
+    return merged
+
+
+@contextmanager
+def _transaction(conn: sqlite3.Connection, begin: str) -> Iterator[None]:
+    conn.execute(begin)
+    try:
+        yield
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _next_revision(conn: sqlite3.Connection) -> int:
+    """Следующий номер ревизии (внутри транзакции записи)."""
+    conn.execute("UPDATE revision SET value = value + 1 WHERE id = 0")
+    return conn.execute("SELECT value FROM revision WHERE id = 0").fetchone()[0]
+
+
+def _user_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _data_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA data_version").fetchone()[0]
@@ -4,64 +4,61 @@ QThread-воркер для скачивания манги.
 Управляет жизненным циклом:
 1. Открытие браузера и авторизация.
 2. Мониторинг страниц манги.
-3. Скачивание глав через FallbackDownloader.
-4. Сборка CBZ-архива (новый или дополнение существующего).
+3. Запуск движка скачивания (:mod:`manga_downloader.manga.engine`)
+   в дочернем процессе и трансляция его событий в Qt-сигналы.
 """
 
 from __future__ import annotations
 
-import json
-import os
-import re
-import shutil
 import time
-import zipfile
+from concurrent.futures import Future
 from pathlib import Path
 from threading import Event
 
 from PyQt5.QtCore import QThread, pyqtSignal
 from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
 
+from manga_downloader.auth_probe import (
+    AUTH_CHALLENGE,
+    AUTH_EXPIRED,
+    AUTH_NO_MARKER,
+    ensure_auth,
+)
+from manga_downloader.browser import open_chrome, restore_session
+from manga_downloader.cancellation import CancelToken
+from manga_downloader.clearance import refresh_clearance
 from manga_downloader.config import (
     BASE_URL,
-    DOWNLOADS_DIR,
-    IMAGE_EXTENSIONS,
     LOGIN_WAIT_TIMEOUT,
     OUTPUT_DIR,
+    PAGE_CACHE_FRESH,
     PAGE_LOAD_DELAY,
-    POLL_INTERVAL,
-    REQUEST_DELAY,
-    SELENIUM_WAIT_TIMEOUT,
-    TEMP_DIR,
-    USER_AGENT,
 )
 from manga_downloader.cookies import CookieManager
-from manga_downloader.downloaders import FallbackDownloader
+from manga_downloader.manga.engine import (
+    EVENT_CBZ,
+    EVENT_COMPLETE,
+    EVENT_FAILED,
+    EVENT_LOG,
+    EVENT_PARTIAL,
+    EVENT_PROGRESS,
+    EVENT_TIMEOUTS,
+    DownloadJob,
+    EngineProcess,
+    cleanup_workdirs,
+)
+from manga_downloader.manga.page_analyzer import PageAnalyzer
+from manga_downloader.manga.page_events import (
+    PAGE_BUTTON,
+    PAGE_DOWNLOAD,
+    PAGE_OPENED,
+    PageEvents,
+)
 from manga_downloader.manga.parser import MangaInfo, MangaParser
+from manga_downloader.metrics import host_timeouts
 from manga_downloader.utils import sanitize_filename
 
 
-# JS-код для замены кнопки «Отслеживать» на «Скачать»
-_INJECT_DOWNLOAD_BTN_JS = """
-arguments[0].textContent = '⬇️ Скачать';
-arguments[0].style.backgroundColor = '#28a745';
-arguments[0].style.color = '#fff';
-arguments[0].style.fontWeight = 'bold';
-arguments[0].style.padding = '10px 20px';
-arguments[0].style.borderRadius = '5px';
-arguments[0].style.cursor = 'pointer';
-arguments[0].onclick = function() {
-    window.location.href = window.location.href + '/download';
-};
-"""
-
-_PAGE_INDEX_RE = re.compile(r"^(\d+)\.")
-
-
 class ChapterWorker(QThread):
     """Фоновый поток загрузки манги.
 
@@ -70,38 +67,45 @@ class ChapterWorker(QThread):
         finished_ok(bool): завершение (True = успех).
         download_started(): начало скачивания.
         chapters_found(int, str, str): (кол-во глав, название, URL).
+        manga_info_ready(int, str, str, list): (кол-во глав, название, URL,
+            ID глав на сайте) -- нужно подтверждение скачивания.
         cancellation_info(int): кол-во пропущенных глав при частичном завершении.
         chapter_progress(int, int, str): (текущая глава, всего глав, название).
         cbz_ready(str): абсолютный путь к готовому CBZ-файлу.
-        download_complete_info(str, str, str, str, int):
-            (url, title, news_id, json-список скачанных индексов, total_on_site).
+        download_complete_info(str, str, str, str, str, int):
+            (url, title, news_id, json-список скачанных индексов,
+            json-список скачанных ID, total_on_site).
     """
 
     log = pyqtSignal(str)
     finished_ok = pyqtSignal(bool)
     download_started = pyqtSignal()
     chapters_found = pyqtSignal(int, str, str)
-    manga_info_ready = pyqtSignal(int, str, str)
+    manga_info_ready = pyqtSignal(int, str, str, list)
     cancellation_info = pyqtSignal(int)
     chapter_progress = pyqtSignal(int, int, str)
     cbz_ready = pyqtSignal(str)
-    download_complete_info = pyqtSignal(str, str, str, str, int)
+    download_complete_info = pyqtSignal(str, str, str, str, str, int)
 
     def __init__(self) -> None:
         super().__init__()
         self.url: str | None = None
         self._initial_url: str | None = None
-        self._cancel_event = Event()
+        self._cancel = CancelToken()
         self._confirm_event = Event()
         self._failed_chapters: list[str] = []
         self._chapter_range: tuple[int, int] | None = None
+        self._skip_ids: set[str] | None = None
+        self._after_ids: set[str] | None = None
         self._driver: webdriver.Chrome | None = None
+        self._page_events: PageEvents | None = None
         self._cookie_manager = CookieManager()
+        self._engine: EngineProcess | None = None
 
         self._download_mode: str = "new"
         self._existing_cbz_path: Path | None = None
-        self._downloaded_indices: list[int] = []
         self._library_mode: bool = False
+        self._max_rate: int = 0
 
     # -- Публичный API ---------------------------------------------------------
 
@@ -113,6 +117,10 @@ class ChapterWorker(QThread):
         """Включает режим библиотеки: скачивание без браузера через cookies."""
         self._library_mode = enabled
 
+    def set_max_rate(self, bytes_per_second: int) -> None:
+        """Ограничивает скорость загрузки глав (0 -- без ограничения)."""
+        self._max_rate = max(0, bytes_per_second)
+
     def set_chapter_range(self, start: int | None = None, end: int | None = None) -> None:
         if start is not None and end is not None:
             self._chapter_range = (start, end)
@@ -121,6 +129,23 @@ class ChapterWorker(QThread):
             self._chapter_range = None
             self.log.emit("📊 Установлено скачивание всех глав")
 
+    def set_skip_chapter_ids(self, chapter_ids: set[str] | None) -> None:
+        """Скачивать только главы, ID которых нет в *chapter_ids* (недостающие)."""
+        self._skip_ids = set(chapter_ids) if chapter_ids is not None else None
+        if self._skip_ids is not None:
+            self.log.emit(f"📊 Режим недостающих глав: пропуск {len(self._skip_ids)} скачанных")
+
+    def set_after_chapter_ids(self, chapter_ids: set[str] | None) -> None:
+        """Скачивать только главы после последней из *chapter_ids* (скачанных).
+
+        Граница ищется на свежей странице, а не по прошлой проверке: глава,
+        добавленная сайтом в середину, в выборку не попадёт и не нарушит
+        порядок глав при дописывании в конец архива.
+        """
+        self._after_ids = set(chapter_ids) if chapter_ids is not None else None
+        if self._after_ids is not None:
+            self.log.emit("📊 Режим новых глав: только после последней скачанной")
+
     def set_download_mode(self, mode: str, existing_cbz_path: str | None = None) -> None:
         """Устанавливает режим: ``'new'`` или ``'append'``."""
         self._download_mode = mode
@@ -131,12 +156,15 @@ class ChapterWorker(QThread):
         self._confirm_event.set()
 
     def cancel(self) -> None:
-        self._cancel_event.set()
+        self._cancel.cancel()
         self._confirm_event.set()
+        engine = self._engine
+        if engine is not None:
+            engine.cancel()
 
     @property
     def is_cancelled(self) -> bool:
-        return self._cancel_event.is_set()
+        return self._cancel.cancelled
 
     @property
     def failed_count(self) -> int:
@@ -145,7 +173,7 @@ class ChapterWorker(QThread):
     # -- QThread ---------------------------------------------------------------
 
     def run(self) -> None:
-        self._cleanup()
+        cleanup_workdirs()
         try:
             if self._library_mode and self._initial_url:
                 self._run_library_download()
@@ -165,10 +193,30 @@ class ChapterWorker(QThread):
             self.finished_ok.emit(False)
             return
 
+        if self._cookie_manager.clearance.needs_refresh():
+            self.log.emit("🍪 cf_clearance скоро истечёт — обновляю без браузера...")
+            if refresh_clearance(self._cookie_manager):
+                self.log.emit("✅ cf_clearance обновлён")
+
+        # Одна проверка вместо провала каждого запроса с cookies и без.
+        verdict = ensure_auth(self._cookie_manager, self._cancel)
+        if verdict == AUTH_EXPIRED:
+            self.log.emit("❌ Сайт не узнаёт аккаунт: cookies устарели.")
+            self.log.emit("💡 Нажмите «Открыть сайт и начать» и войдите заново.")
+            self.finished_ok.emit(False)
+            return
+        if verdict == AUTH_CHALLENGE:
+            self.log.emit("❌ Cloudflare не пропускает, а обновить cf_clearance без браузера не удалось.")
+            self.log.emit("💡 Нажмите «Открыть сайт и начать» для обновления сессии.")
+            self.finished_ok.emit(False)
+            return
+        if verdict == AUTH_NO_MARKER:
+            self.log.emit("⚠️ Вход на сайте не подтверждён: возможно, cookies устарели.")
+
         parser = MangaParser(self._cookie_manager)
         try:
             self.log.emit(f"📥 Получение данных манги: {self.url}")
-            info = parser.fetch(self.url)
+            info = parser.fetch(self.url, max_age=PAGE_CACHE_FRESH)
 
             if not info:
                 self.log.emit("❌ Не удалось получить данные манги. Cookies могли устареть.")
@@ -178,7 +226,7 @@ class ChapterWorker(QThread):
 
             self.log.emit(f"📍 Начинаем скачивание манги: {self.url}")
             self.chapters_found.emit(info.total_chapters, info.title, self.url)
-            self._download_manga_with_info(parser, info)
+            self._download_manga_with_info(info)
             self.finished_ok.emit(not self.is_cancelled)
         finally:
             parser.close()
@@ -186,42 +234,44 @@ class ChapterWorker(QThread):
     def _run_browser_flow(self) -> None:
         """Стандартный режим: открытие браузера и мониторинг."""
         self.log.emit("🌐 Открытие браузера...")
-        self._driver = self._open_browser()
+        start_url = BASE_URL
+        if self._initial_url:
+            start_url = self._initial_url.rstrip("/") + "/download"
+            self.log.emit(f"📍 Переход на страницу манги: {self._initial_url}")
+        self._driver = self._open_browser(start_url)
         if self._driver:
-            if self._initial_url:
-                download_url = self._initial_url.rstrip("/") + "/download"
-                self.log.emit(f"📍 Переход на страницу манги: {self._initial_url}")
-                self._driver.get(download_url)
-                time.sleep(PAGE_LOAD_DELAY)
             self.log.emit("🔎 Запуск отслеживания страницы манги...")
             self._monitor_pages()
 
     # -- Браузер и авторизация -------------------------------------------------
 
-    def _open_browser(self) -> webdriver.Chrome | None:
-        options = Options()
-        options.add_experimental_option("detach", True)
-        options.add_experimental_option("excludeSwitches", ["enable-logging"])
-        options.add_argument(f"--user-agent={USER_AGENT}")
-        options.add_argument("--log-level=3")
-        driver = webdriver.Chrome(options=options)
-        driver.get(BASE_URL)
+    def _open_browser(self, start_url: str) -> webdriver.Chrome | None:
+        """Открывает Chrome сразу на *start_url* уже авторизованным, если можно.
 
+        Авторизация берётся из постоянного профиля или, если он пуст, из
+        файла cookies (кладутся до навигации), так что страница грузится
+        один раз.
+        """
+        driver = open_chrome(detach=True)
+        self._page_events = PageEvents(driver)
+        self._page_events.install()
         if self._cookie_manager.path.exists():
-            self.log.emit("🍪 Пробую восстановить сессию...")
             self._cookie_manager.load()
-            self._apply_cookies_to_driver(driver)
-            driver.refresh()
-            time.sleep(PAGE_LOAD_DELAY)
+        if restore_session(driver, self._cookie_manager):
+            self.log.emit("🍪 Сессия найдена в профиле браузера")
+        elif self._cookie_manager.cookies:
+            self.log.emit("🍪 Пробую восстановить сессию...")
+        driver.get(start_url)
+        self._cancel.wait(PAGE_LOAD_DELAY)
 
-            if self._cookie_manager.has_auth(driver):
-                self._cookie_manager.update_from_driver(driver)
-                self._cookie_manager.save_all()
-                self.log.emit("✅ Авторизация восстановлена!")
-                return driver
+        if self._cookie_manager.has_auth(driver):
+            self._cookie_manager.update_from_driver(driver)
+            self._cookie_manager.save_all()
+            self.log.emit("✅ Авторизация восстановлена!")
+            return driver
 
+        if self._cookie_manager.cookies:
             self.log.emit("⚠️ Сессия устарела, нужна новая авторизация")
-
         self.log.emit("🔐 Войдите вручную, я запомню cookies")
         self.log.emit("📦 Ожидание страницы манги...")
 
@@ -236,111 +286,102 @@ class ChapterWorker(QThread):
                 driver.quit()
                 self.finished_ok.emit(False)
                 return None
-            QThread.msleep(1000)
+            self._cancel.wait(1)
 
         self._cookie_manager.update_from_driver(driver)
         self._cookie_manager.save_all()
         return driver
 
-    def _apply_cookies_to_driver(self, driver: webdriver.Chrome) -> None:
-        driver.delete_all_cookies()
-        for c in self._cookie_manager.cookies:
-            cookie = dict(c)
-            cookie.pop("sameSite", None)
-            cookie.pop("secure", None)
-            cookie.pop("httpOnly", None)
-            try:
-                driver.add_cookie(cookie)
-            except Exception as exc:
-                self.log.emit(f"⚠️ Cookie {cookie.get('name')} не добавлен: {exc}")
-
     # -- Мониторинг страниц ----------------------------------------------------
 
     def _monitor_pages(self) -> None:
-        processed_urls: set[str] = set()
-        last_info: MangaInfo | None = None
-        wait = WebDriverWait(self._driver, SELENIUM_WAIT_TIMEOUT)
-        parser = MangaParser(self._cookie_manager)
+        """Реагирует на события страниц браузера (см. :class:`PageEvents`).
 
-        while not self.is_cancelled:
-            try:
-                current_url = self._driver.current_url
-
-                if current_url and current_url.endswith("/download"):
-                    self.url = current_url.replace("/download", "")
-                    self.log.emit(f"📍 Обнаружен запрос на скачивание: {self.url}")
-
-                    self._cookie_manager.update_from_driver(self._driver)
-                    self._cookie_manager.save_all()
-                    self._driver.quit()
-                    self._driver = None
-
-                    if not last_info or self.url not in processed_urls:
-                        last_info = parser.fetch(self.url)
-
-                    if not last_info:
-                        self.log.emit("❌ Не удалось получить данные манги")
-                        self.finished_ok.emit(False)
-                        return
-
-                    self.manga_info_ready.emit(
-                        last_info.total_chapters, last_info.title, self.url,
-                    )
-                    self.log.emit("⏳ Ожидание подтверждения...")
-
-                    self._confirm_event.wait()
-                    if self.is_cancelled:
-                        self.log.emit("⏹️ Скачивание отменено пользователем.")
-                        self.finished_ok.emit(False)
-                        return
-
-                    self.log.emit(f"📍 Начинаем скачивание манги: {self.url}")
-                    self.chapters_found.emit(
-                        last_info.total_chapters, last_info.title, self.url,
-                    )
-                    self._download_manga_with_info(parser, last_info)
-                    self.finished_ok.emit(True)
+        Страницы манги разбираются в фоне (:class:`PageAnalyzer`), так что
+        цикл событий не ждёт сети.
+        """
+        analyzer = PageAnalyzer(self._cookie_manager)
+        try:
+            while not self.is_cancelled:
+                try:
+                    for event in self._page_events.next():
+                        if event.kind == PAGE_DOWNLOAD:
+                            self._download_from_browser(analyzer, event.url)
+                            return
+                        if event.kind == PAGE_BUTTON:
+                            self.log.emit("✅ Кнопка заменена на 'Скачать'")
+                        elif event.kind == PAGE_OPENED and ".html" in event.url:
+                            future = analyzer.prefetch(event.url)
+                            if future is not None:
+                                self.log.emit(f"🔍 Обнаружена страница манги: {event.url}")
+                                future.add_done_callback(
+                                    lambda f, url=event.url: self._on_page_analyzed(url, f),
+                                )
+
+                except Exception as exc:
+                    self.log.emit(f"❌ Ошибка: {exc}")
+                    if self._driver:
+                        self._driver.quit()
+                        self._driver = None
+                    self.finished_ok.emit(False)
                     return
+        finally:
+            analyzer.close()
 
-                if current_url and "/" in current_url and ".html" in current_url:
-                    if current_url not in processed_urls:
-                        self.log.emit(f"🔍 Обнаружена страница манги: {current_url}")
-                        info = parser.fetch(current_url)
-                        if info:
-                            last_info = info
-                            self.log.emit(f"📊 Найдено глав: {info.total_chapters}")
-                            self.chapters_found.emit(
-                                info.total_chapters, info.title, current_url,
-                            )
-                            processed_urls.add(current_url)
-
-                        self._inject_download_button(wait)
-
-                QThread.msleep(int(POLL_INTERVAL * 1000))
-
-            except Exception as exc:
-                self.log.emit(f"❌ Ошибка: {exc}")
-                if self._driver:
-                    self._driver.quit()
-                    self._driver = None
-                self.finished_ok.emit(False)
-                return
+    def _on_page_analyzed(self, url: str, future: Future[MangaInfo | None]) -> None:
+        """Фоновый разбор страницы завершён (в потоке пула) или отменён.
 
-    def _inject_download_button(self, wait: WebDriverWait) -> None:
-        try:
-            btn = wait.until(
-                EC.presence_of_element_located(
-                    (By.CSS_SELECTOR, "a.page__btn-sec.js-follow-status")
-                )
-            )
-            self._driver.execute_script(_INJECT_DOWNLOAD_BTN_JS, btn)
-            self.log.emit("✅ Кнопка заменена на 'Скачать'")
-        except Exception as exc:
-            self.log.emit(f"⚠️ Кнопка не найдена: {exc}")
+        Отменяется разбор, не начатый до перехода на другую страницу.
+        """
+        if future.cancelled() or self.is_cancelled:
+            return
+        info = future.result()
+        if info is None:
+            return
+        self.log.emit(f"📊 Найдено глав: {info.total_chapters}")
+        self.chapters_found.emit(info.total_chapters, info.title, url)
+
+    def _download_from_browser(self, analyzer: PageAnalyzer, url: str) -> None:
+        """Скачивание по кнопке в браузере: закрывает его и ждёт подтверждения.
+
+        Данные страницы обычно уже разобраны в фоне, пока её смотрели.
+        """
+        self.url = url
+        self.log.emit(f"📍 Обнаружен запрос на скачивание: {self.url}")
+
+        self._cookie_manager.update_from_driver(self._driver)
+        self._cookie_manager.save_all()
+        self._driver.quit()
+        self._driver = None
+
+        info = analyzer.get(self.url)
+        if not info:
+            self.log.emit("❌ Не удалось получить данные манги")
+            self.finished_ok.emit(False)
+            return
+
+        self.manga_info_ready.emit(
+            info.total_chapters,
+            info.title,
+            self.url,
+            [ch.id for ch in info.chapters],
+        )
+        self.log.emit("⏳ Ожидание подтверждения...")
+
+        self._confirm_event.wait()
+        if self.is_cancelled:
+            self.log.emit("⏹️ Скачивание отменено пользователем.")
+            self.finished_ok.emit(False)
+            return
+
+        self.log.emit(f"📍 Начинаем скачивание манги: {self.url}")
+        self.chapters_found.emit(info.total_chapters, info.title, self.url)
+        self._download_manga_with_info(info)
+        self.finished_ok.emit(True)
 
     # -- Скачивание манги ------------------------------------------------------
 
-    def _download_manga_with_info(self, parser: MangaParser, info: MangaInfo) -> None:
+    def _download_manga_with_info(self, info: MangaInfo) -> None:
         """Скачивание с уже полученными метаданными манги."""
         if not self._cookie_manager.cookies:
             self.log.emit("⚠️ Cookies не заданы — загружаю из файла")
@@ -357,8 +398,21 @@ class ChapterWorker(QThread):
 
         if self._chapter_range:
             start, end = self._chapter_range
-            chapters = chapters[max(0, start - 1):min(len(chapters), end)]
+            chapters = info.between(start, end)
             self.log.emit(f"📊 Выбран диапазон глав: {start}-{end} (всего {len(chapters)} глав)")
+        elif self._after_ids is not None:
+            last = max(
+                (i for i, ch in enumerate(chapters) if ch.id in self._after_ids), default=None,
+            )
+            if last is None:
+                self.log.emit("⚠️ Скачанных глав нет на странице — новые главы не определить")
+                chapters = []
+            else:
+                chapters = chapters[last + 1:]
+            self.log.emit(f"📊 Выбраны новые главы (всего {len(chapters)} глав)")
+        elif self._skip_ids is not None:
+            chapters = [ch for ch in chapters if ch.id not in self._skip_ids]
+            self.log.emit(f"📊 Выбраны недостающие главы (всего {len(chapters)} глав)")
         else:
             self.log.emit(f"📊 Выбраны все главы (всего {len(chapters)} глав)")
 
@@ -374,191 +428,43 @@ class ChapterWorker(QThread):
         if self._download_mode == "append" and self._existing_cbz_path:
             final_cbz = self._existing_cbz_path
 
-        DOWNLOADS_DIR.mkdir(exist_ok=True)
-        TEMP_DIR.mkdir(exist_ok=True)
-
         self._failed_chapters = []
-        self._downloaded_indices = []
-
-        with FallbackDownloader(self.url, self._cookie_manager, self.log.emit) as dl:
-            self._download_chapters(chapters, info.news_id, dl)
-
-        if self._failed_chapters and not self.is_cancelled:
-            self.log.emit(f"\n⚠️ Не удалось скачать {len(self._failed_chapters)} глав:")
-            for ch in self._failed_chapters:
-                self.log.emit(f"  • {ch}")
-            self.log.emit("")
-
-        if not self.is_cancelled:
-            if self._failed_chapters:
-                self.log.emit("⚠️ Некоторые главы не удалось скачать, но архив будет создан из успешных")
-            self._create_cbz(final_cbz)
-
-        self._cleanup()
-
-        if not self.is_cancelled:
-            if self._failed_chapters:
-                self.log.emit(f"\n⚠️ Частично завершено. Пропущено глав: {len(self._failed_chapters)}")
-                self.log.emit(f"📦 Архив создан: {final_cbz.resolve()} (без пропущенных глав)")
-                self.cancellation_info.emit(len(self._failed_chapters))
-            else:
-                self.log.emit(f"\n✅ Полностью готово: {final_cbz.resolve()}")
-
-            if final_cbz.exists():
-                self.cbz_ready.emit(str(final_cbz.resolve()))
-
-            indices_json = json.dumps(self._downloaded_indices)
-            self.download_complete_info.emit(
-                self.url or "",
-                info.title,
-                info.news_id,
-                indices_json,
-                info.total_chapters,
-            )
-
-    def _download_chapters(
-        self,
-        chapters: list[dict],
-        news_id: str,
-        downloader: FallbackDownloader,
-    ) -> None:
-        total = len(chapters)
-        self.log.emit(f"\n🔢 Начинаем скачивание {total} глав...")
-        self.log.emit("📡 Используются методы: curl_cffi → cloudscraper → Selenium\n")
-
-        range_start = self._chapter_range[0] if self._chapter_range else 1
-
-        for i, chapter in enumerate(chapters, 1):
-            if self.is_cancelled:
-                self.log.emit("❌ Скачивание отменено")
-                return
-
-            title = chapter["title"]
-            chapter_id = chapter["id"]
-            filename = sanitize_filename(f"{i:04}_{title}") + ".zip"
-            zip_path = DOWNLOADS_DIR / filename
-
-            global_index = range_start + i - 1
-
-            self.chapter_progress.emit(i, total, title)
-            self.log.emit(f"📖 Глава {i}/{total}: {title}")
-            self.log.emit(f"   ID: {chapter_id}")
-
-            success = downloader.download(chapter_id, news_id, zip_path, title)
-
-            if success:
-                self.log.emit("  ✅ Успешно\n")
-                self._downloaded_indices.append(global_index)
-            else:
-                self._failed_chapters.append(f"Глава {i}: {title}")
-                self.log.emit("  ❌ Не удалось скачать\n")
-
-            time.sleep(REQUEST_DELAY)
-
-    # -- CBZ -------------------------------------------------------------------
-
-    def _create_cbz(self, final_cbz: Path) -> None:
-        self.log.emit("📦 Архивация в CBZ...")
-        zip_files = sorted(DOWNLOADS_DIR.glob("*.zip"))
-
-        if not zip_files:
-            self.log.emit("❌ Нет файлов для архивации")
-            return
-
-        start_index = 1
-        zip_mode = "w"
-
-        if self._download_mode == "append" and final_cbz.exists():
-            zip_mode = "a"
-            start_index = self._get_max_page_index(final_cbz) + 1
-            self.log.emit(f"📦 Дополнение архива, начиная со страницы {start_index}")
-
-        index = start_index
-        successful = 0
-        total_pages = 0
 
+        job = DownloadJob(
+            url=self.url or "",
+            title=info.title,
+            news_id=info.news_id,
+            chapters=chapters,
+            total_on_site=info.total_chapters,
+            final_cbz=str(final_cbz),
+            download_mode=self._download_mode,
+            cookies=self._cookie_manager.cookies,
+            max_rate=self._max_rate,
+            timeouts=host_timeouts.snapshot(),
+        )
+        self._run_engine(job)
+
+    def _run_engine(self, job: DownloadJob) -> None:
+        """Запускает движок в дочернем процессе и транслирует его события."""
+        engine = EngineProcess(job)
+        self._engine = engine
+        engine.start()
         try:
-            with zipfile.ZipFile(final_cbz, zip_mode, zipfile.ZIP_DEFLATED) as cbz:
-                for zip_file in zip_files:
-                    if self.is_cancelled:
-                        self.log.emit("❌ Архивация отменена")
-                        break
-
-                    self.log.emit(f"📦 Обработка: {zip_file.name}")
-                    try:
-                        chapter_pages, index = self._process_chapter_zip(
-                            zip_file, cbz, index,
-                        )
-                        self.log.emit(f"  📄 Страниц в главе: {chapter_pages}")
-                        successful += 1
-                        total_pages += chapter_pages
-                    except Exception as exc:
-                        self.log.emit(f"  ⚠️ Ошибка при обработке {zip_file.name}: {exc}")
-
-            self.log.emit(f"\n📊 Статистика:")
-            self.log.emit(f"  • Всего страниц: {total_pages}")
-            self.log.emit(f"  • Успешно обработано глав: {successful}/{len(zip_files)}")
-
-            if successful == 0:
-                self.log.emit("❌ Не удалось обработать ни одной главы")
-                if zip_mode == "w" and final_cbz.exists():
-                    final_cbz.unlink()
-
-        except Exception as exc:
-            self.log.emit(f"❌ Ошибка при создании CBZ: {exc}")
-            if zip_mode == "w" and final_cbz.exists():
-                final_cbz.unlink()
-
-    @staticmethod
-    def _get_max_page_index(cbz_path: Path) -> int:
-        """Определяет максимальный индекс страницы в существующем CBZ."""
-        max_idx = 0
-        try:
-            with zipfile.ZipFile(cbz_path, "r") as zf:
-                for name in zf.namelist():
-                    m = _PAGE_INDEX_RE.match(name)
-                    if m:
-                        max_idx = max(max_idx, int(m.group(1)))
-        except Exception:
-            pass
-        return max_idx
-
-    @staticmethod
-    def _process_chapter_zip(
-        zip_file: Path,
-        cbz: zipfile.ZipFile,
-        start_index: int,
-    ) -> tuple[int, int]:
-        """Извлекает изображения из ZIP главы и добавляет в CBZ.
-
-        Возвращает (кол-во страниц, следующий индекс).
-        """
-        index = start_index
-        pages = 0
-
-        with zipfile.ZipFile(zip_file, "r") as zf:
-            for name in sorted(zf.namelist()):
-                ext = os.path.splitext(name)[1].lower()
-                if ext not in IMAGE_EXTENSIONS:
-                    continue
-
-                out_name = f"{index:06}{ext}"
-                src = TEMP_DIR / name
-                dst = TEMP_DIR / out_name
-
-                zf.extract(name, path=TEMP_DIR)
-                if src.exists():
-                    src.rename(dst)
-                    cbz.write(dst, arcname=out_name)
-                    index += 1
-                    pages += 1
-
-        return pages, index
-
-    # -- Очистка ---------------------------------------------------------------
-
-    @staticmethod
-    def _cleanup() -> None:
-        for dir_path in (DOWNLOADS_DIR, TEMP_DIR):
-            if dir_path.exists():
-                shutil.rmtree(dir_path)
+            for kind, *args in engine.events(lambda: self.is_cancelled):
+                if kind == EVENT_LOG:
+                    self.log.emit(*args)
+                elif kind == EVENT_PROGRESS:
+                    self.chapter_progress.emit(*args)
+                elif kind == EVENT_FAILED:
+                    self._failed_chapters = list(args[0])
+                elif kind == EVENT_PARTIAL:
+                    self.cancellation_info.emit(*args)
+                elif kind == EVENT_CBZ:
+                    self.cbz_ready.emit(*args)
+                elif kind == EVENT_COMPLETE:
+                    self.download_complete_info.emit(*args)
+                elif kind == EVENT_TIMEOUTS:
+                    host_timeouts.merge(args[0])
+        finally:
+            self._engine = None
+            engine.join(timeout=5)
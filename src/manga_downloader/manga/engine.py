@@ -0,0 +1,380 @@
+"""
+Движок скачивания глав и сборки CBZ в отдельном процессе.
+
+Скачивание, распаковка и упаковка в ZIP конкурируют за GIL с event loop Qt,
+поэтому вся тяжёлая работа вынесена в дочерний процесс. Связь с GUI --
+компактные кортежи ``(тип, *аргументы)`` через :class:`multiprocessing.Queue`,
+которые :class:`ChapterWorker` переводит в свои Qt-сигналы.
+"""
+
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import queue
+import re
+import shutil
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from manga_downloader.cancellation import CancelToken
+from manga_downloader.clearance import ClearanceRefresher
+from manga_downloader.config import (
+    DOWNLOADS_DIR,
+    IMAGE_EXTENSIONS,
+    POLL_INTERVAL,
+    REQUEST_DELAY,
+    TEMP_DIR,
+)
+from manga_downloader.cookies import CookieList, CookieManager
+from manga_downloader.downloaders import FallbackDownloader
+from manga_downloader.manga.models import Chapter
+from manga_downloader.metrics import TimeoutsSnapshot, host_timeouts
+from manga_downloader.utils import sanitize_filename
+
+# --- Типы событий IPC ---
+EVENT_LOG = "log"            # (str)
+EVENT_PROGRESS = "progress"  # (текущая, всего, название)
+EVENT_FAILED = "failed"      # (список непрошедших глав)
+EVENT_PARTIAL = "partial"    # (кол-во пропущенных глав)
+EVENT_CBZ = "cbz"            # (путь к CBZ)
+EVENT_COMPLETE = "complete"  # (url, title, news_id, json индексов, json ID, total_on_site)
+EVENT_TIMEOUTS = "timeouts"  # (снимок сетевых замеров, см. HostTimeouts.snapshot)
+EVENT_EXIT = "exit"          # () -- процесс завершил работу
+
+EngineEvent = tuple[Any, ...]
+EmitCallback = Callable[..., None]
+
+_PAGE_INDEX_RE = re.compile(r"^(\d+)\.")
+
+
+@dataclass
+class DownloadJob:
+    """Задание для движка: что качать и куда складывать."""
+
+    url: str
+    title: str
+    news_id: str
+    chapters: list[Chapter]
+    total_on_site: int
+    final_cbz: str
+    download_mode: str = "new"
+    cookies: CookieList = field(default_factory=list)
+    max_rate: int = 0  # байт в секунду на загрузку глав, 0 -- без ограничения
+    timeouts: TimeoutsSnapshot = field(default_factory=dict)  # замеры прошлых заданий
+
+
+class DownloadEngine:
+    """Скачивает главы задания и собирает их в CBZ.
+
+    Не зависит от Qt: все события отдаются через *emit*.
+    """
+
+    def __init__(self, job: DownloadJob, emit: EmitCallback, cancel_event: Any) -> None:
+        self._job = job
+        self._emit = emit
+        self._cancel = CancelToken(cancel_event)
+        self._cookie_manager = CookieManager()
+        self._cookie_manager.cookies = job.cookies
+        self._failed_chapters: list[str] = []
+        self._downloaded_indices: list[int] = []
+        self._downloaded_ids: list[str] = []
+        self._refresher: ClearanceRefresher | None = None
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._cancel.cancelled
+
+    def log(self, msg: str) -> None:
+        self._emit(EVENT_LOG, msg)
+
+    # -- Основной сценарий -----------------------------------------------------
+
+    def run(self) -> None:
+        job = self._job
+        final_cbz = Path(job.final_cbz)
+
+        DOWNLOADS_DIR.mkdir(exist_ok=True)
+        TEMP_DIR.mkdir(exist_ok=True)
+
+        self._refresher = ClearanceRefresher(self._cookie_manager)
+        self._refresher.start()
+        unsubscribe = self._cookie_manager.subscribe(self._on_cookies_changed)
+        try:
+            with FallbackDownloader(
+                job.url,
+                self._cookie_manager,
+                self.log,
+                cancel=self._cancel,
+                max_rate=job.max_rate,
+            ) as dl:
+                self._download_chapters(dl)
+        finally:
+            unsubscribe()
+            self._refresher.stop()
+
+        if self._failed_chapters:
+            self._emit(EVENT_FAILED, list(self._failed_chapters))
+
+        if self._failed_chapters and not self.is_cancelled:
+            self.log(f"\n⚠️ Не удалось скачать {len(self._failed_chapters)} глав:")
+            for ch in self._failed_chapters:
+                self.log(f"  • {ch}")
+            self.log("")
+
+        if not self.is_cancelled:
+            if self._failed_chapters:
+                self.log("⚠️ Некоторые главы не удалось скачать, но архив будет создан из успешных")
+            self._create_cbz(final_cbz)
+
+        cleanup_workdirs()
+
+        if not self.is_cancelled:
+            if self._failed_chapters:
+                self.log(f"\n⚠️ Частично завершено. Пропущено глав: {len(self._failed_chapters)}")
+                self.log(f"📦 Архив создан: {final_cbz.resolve()} (без пропущенных глав)")
+                self._emit(EVENT_PARTIAL, len(self._failed_chapters))
+            else:
+                self.log(f"\n✅ Полностью готово: {final_cbz.resolve()}")
+
+            if final_cbz.exists():
+                self._emit(EVENT_CBZ, str(final_cbz.resolve()))
+
+            self._emit(
+                EVENT_COMPLETE,
+                job.url,
+                job.title,
+                job.news_id,
+                json.dumps(self._downloaded_indices),
+                json.dumps(self._downloaded_ids),
+                job.total_on_site,
+            )
+
+    def _download_chapters(self, downloader: FallbackDownloader) -> None:
+        chapters = self._job.chapters
+        news_id = self._job.news_id
+        total = len(chapters)
+        self.log(f"\n🔢 Начинаем скачивание {total} глав...")
+        self.log("📡 Используются методы: curl_cffi → cloudscraper → Selenium\n")
+
+        for i, chapter in enumerate(chapters, 1):
+            if self.is_cancelled:
+                self.log("❌ Скачивание отменено")
+                return
+
+            title = chapter.title
+            chapter_id = chapter.id
+            filename = sanitize_filename(f"{i:04}_{title}") + ".zip"
+            zip_path = DOWNLOADS_DIR / filename
+
+            self._emit(EVENT_PROGRESS, i, total, title)
+            self.log(f"📖 Глава {i}/{total}: {title}")
+            self.log(f"   ID: {chapter_id}")
+
+            # Cookies, сохранённые другим процессом (браузер в GUI), живые
+            # сессии загрузчиков подхватят при следующем запросе.
+            self._cookie_manager.reload_if_changed()
+            success = downloader.download(chapter_id, news_id, zip_path, title)
+            if self.is_cancelled:
+                self.log("❌ Скачивание отменено")
+                return
+
+            if success:
+                self.log("  ✅ Успешно\n")
+                self._downloaded_indices.append(chapter.ordinal)
+                self._downloaded_ids.append(chapter.id)
+            else:
+                self._failed_chapters.append(f"Глава {i}: {title}")
+                self.log("  ❌ Не удалось скачать\n")
+
+            self._cancel.wait(REQUEST_DELAY)
+
+    def _on_cookies_changed(self, generation: int) -> None:
+        """Cookies сменились (продление cf_clearance, Selenium, другой процесс)."""
+        self.log("🍪 Cookies обновлены, сессии подхватят их со следующего запроса")
+
+    # -- CBZ -------------------------------------------------------------------
+
+    def _create_cbz(self, final_cbz: Path) -> None:
+        self.log("📦 Архивация в CBZ...")
+        zip_files = sorted(DOWNLOADS_DIR.glob("*.zip"))
+
+        if not zip_files:
+            self.log("❌ Нет файлов для архивации")
+            return
+
+        start_index = 1
+        zip_mode = "w"
+
+        if self._job.download_mode == "append" and final_cbz.exists():
+            zip_mode = "a"
+            start_index = self._get_max_page_index(final_cbz) + 1
+            self.log(f"📦 Дополнение архива, начиная со страницы {start_index}")
+
+        index = start_index
+        successful = 0
+        total_pages = 0
+
+        try:
+            with zipfile.ZipFile(final_cbz, zip_mode, zipfile.ZIP_DEFLATED) as cbz:
+                for zip_file in zip_files:
+                    if self.is_cancelled:
+                        self.log("❌ Архивация отменена")
+                        break
+
+                    self.log(f"📦 Обработка: {zip_file.name}")
+                    try:
+                        chapter_pages, index = self._process_chapter_zip(
+                            zip_file, cbz, index,
+                        )
+                        self.log(f"  📄 Страниц в главе: {chapter_pages}")
+                        successful += 1
+                        total_pages += chapter_pages
+                    except Exception as exc:
+                        self.log(f"  ⚠️ Ошибка при обработке {zip_file.name}: {exc}")
+
+            self.log(f"\n📊 Статистика:")
+            self.log(f"  • Всего страниц: {total_pages}")
+            self.log(f"  • Успешно обработано глав: {successful}/{len(zip_files)}")
+
+            if successful == 0:
+                self.log("❌ Не удалось обработать ни одной главы")
+                if zip_mode == "w" and final_cbz.exists():
+                    final_cbz.unlink()
+
+        except Exception as exc:
+            self.log(f"❌ Ошибка при создании CBZ: {exc}")
+            if zip_mode == "w" and final_cbz.exists():
+                final_cbz.unlink()
+
+    @staticmethod
+    def _get_max_page_index(cbz_path: Path) -> int:
+        """Определяет максимальный индекс страницы в существующем CBZ."""
+        max_idx = 0
+        try:
+            with zipfile.ZipFile(cbz_path, "r") as zf:
+                for name in zf.namelist():
+                    m = _PAGE_INDEX_RE.match(name)
+                    if m:
+                        max_idx = max(max_idx, int(m.group(1)))
+        except Exception:
+            pass
+        return max_idx
+
+    @staticmethod
+    def _process_chapter_zip(
+        zip_file: Path,
+        cbz: zipfile.ZipFile,
+        start_index: int,
+    ) -> tuple[int, int]:
+        """Извлекает изображения из ZIP главы и добавляет в CBZ.
+
+        Возвращает (кол-во страниц, следующий индекс).
+        """
+        index = start_index
+        pages = 0
+
+        with zipfile.ZipFile(zip_file, "r") as zf:
+            for name in sorted(zf.namelist()):
+                ext = os.path.splitext(name)[1].lower()
+                if ext not in IMAGE_EXTENSIONS:
+                    continue
+
+                out_name = f"{index:06}{ext}"
+                src = TEMP_DIR / name
+                dst = TEMP_DIR / out_name
+
+                zf.extract(name, path=TEMP_DIR)
+                if src.exists():
+                    src.rename(dst)
+                    cbz.write(dst, arcname=out_name)
+                    index += 1
+                    pages += 1
+
+        return pages, index
+
+
+def cleanup_workdirs() -> None:
+    """Удаляет временные папки со скачанными главами и страницами."""
+    for dir_path in (DOWNLOADS_DIR, TEMP_DIR):
+        if dir_path.exists():
+            # Брошенная хедж-попытка может ещё держать свой .part-файл.
+            shutil.rmtree(dir_path, ignore_errors=True)
+
+
+# -- Дочерний процесс ----------------------------------------------------------
+
+
+def _engine_main(job: DownloadJob, events: Any, cancel_event: Any) -> None:
+    """Точка входа дочернего процесса.
+
+    Сетевые замеры приходят с заданием и уходят обратно перед выходом,
+    чтобы таймауты следующего задания опирались на них, а не на умолчания.
+    """
+    host_timeouts.merge(job.timeouts)
+    engine = DownloadEngine(job, lambda *ev: events.put(ev), cancel_event)
+    try:
+        engine.run()
+    except Exception as exc:
+        events.put((EVENT_LOG, f"❌ Ошибка: {exc}"))
+    finally:
+        events.put((EVENT_TIMEOUTS, host_timeouts.snapshot()))
+        events.put((EVENT_EXIT,))
+
+
+class EngineProcess:
+    """Запускает :class:`DownloadEngine` в дочернем процессе.
+
+    Используется контекст ``spawn``: fork процесса с живыми потоками Qt
+    небезопасен, а на Windows другого варианта и нет.
+    """
+
+    def __init__(self, job: DownloadJob) -> None:
+        ctx = multiprocessing.get_context("spawn")
+        self._events = ctx.Queue()
+        self._cancel_event = ctx.Event()
+        self._process = ctx.Process(
+            target=_engine_main,
+            args=(job, self._events, self._cancel_event),
+            name="manga-download-engine",
+            daemon=True,
+        )
+
+    def start(self) -> None:
+        self._process.start()
+
+    def cancel(self) -> None:
+        """Просит движок остановиться (безопасно из любого потока)."""
+        self._cancel_event.set()
+
+    def events(self, should_cancel: Callable[[], bool] | None = None) -> Iterator[EngineEvent]:
+        """Отдаёт события движка до его завершения.
+
+        *should_cancel* опрашивается между событиями; при ``True`` движку
+        передаётся запрос отмены. Если процесс умер, не отправив
+        ``EVENT_EXIT``, выбрасывается ``RuntimeError``.
+        """
+        while True:
+            if should_cancel is not None and should_cancel():
+                self.cancel()
+            try:
+                event = self._events.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                if not self._process.is_alive():
+                    raise RuntimeError(
+                        f"Процесс загрузки завершился аварийно (код {self._process.exitcode})"
+                    )
+                continue
+            if event[0] == EVENT_EXIT:
+                return
+            yield event
+
+    def join(self, timeout: float | None = None) -> None:
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join()
+        self._events.close()
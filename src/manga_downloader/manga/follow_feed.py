@@ -0,0 +1,157 @@
+"""
+Лента подписок аккаунта на сайте (тайтлы, на которые нажата «Подписка»).
+
+Несколько постраничных запросов дают для всех отслеживаемых тайтлов
+метку последнего обновления. Проверка библиотеки сравнивает метки с
+сохранёнными и запрашивает страницы только тех тайтлов, где метка
+изменилась, вместо запроса страницы каждого тайтла.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import html
+import logging
+import re
+from dataclasses import dataclass
+
+import curl_cffi
+
+from manga_downloader.cancellation import CancelToken
+from manga_downloader.config import (
+    BASE_URL,
+    BROWSE_HEADERS,
+    FOLLOW_FEED_MAX_PAGES,
+    FOLLOW_FEED_URL,
+)
+from manga_downloader.cookies import CookieManager
+from manga_downloader.metrics import host_timeouts
+from manga_downloader.rate_limit import site_limiter
+
+logger = logging.getLogger(__name__)
+
+_MANGA_LINK_RE = re.compile(
+    r'href="((?:' + re.escape(BASE_URL) + r')?/\d+-[^"#?]+\.html)"',
+)
+_TAG_RE = re.compile(r"<[^>]+>")
+# Признаки обновления в карточке: номер главы/тома и дата/время выхода.
+# Счётчики просмотров и рейтинг в метку не попадают, как и относительные
+# даты («сегодня», «вчера»): они меняются сами с ходом дня.
+_UPDATE_MARK_RE = re.compile(
+    r"(?:глава|том|chapter|#)\s*\d+(?:[.,]\d+)?"
+    r"|\d{1,2}\.\d{1,2}\.\d{2,4}"
+    r"|\d{1,2}:\d{2}",
+    re.IGNORECASE,
+)
+
+
+@dataclass(frozen=True)
+class FeedItem:
+    """Тайтл из ленты подписок.
+
+    ``marker`` -- отпечаток признаков обновления из карточки тайтла
+    или ``None``, если их не удалось найти (тогда тайтл проверяется
+    запросом его страницы).
+    """
+
+    url: str
+    marker: str | None
+
+
+class FollowFeed:
+    """Загружает ленту подписок постранично через одну keep-alive сессию."""
+
+    def __init__(self, cookie_manager: CookieManager) -> None:
+        self._cookie_manager = cookie_manager
+
+    # -- Публичный интерфейс ---------------------------------------------------
+
+    def fetch(self, cancel: CancelToken | None = None) -> dict[str, FeedItem] | None:
+        """Все тайтлы ленты по URL.
+
+        ``None``, если ленту получить не удалось (нет авторизации, другая
+        разметка, сайт недоступен) -- тогда нужна обычная проверка по тайтлам.
+        """
+        items: dict[str, FeedItem] = {}
+        session = curl_cffi.Session()
+        session.headers.update(BROWSE_HEADERS)
+        self._cookie_manager.apply_to_session(session)
+        try:
+            for page in range(1, FOLLOW_FEED_MAX_PAGES + 1):
+                if not site_limiter.acquire(cancel):
+                    return None
+                page_html = self._get_page(session, page)
+                if page_html is None:
+                    break
+                found = self._parse_page(page_html)
+                fresh = {url: item for url, item in found.items() if url not in items}
+                if not fresh:
+                    break
+                items.update(fresh)
+                if f"/page/{page + 1}/" not in page_html:
+                    break
+        except Exception as exc:
+            logger.debug("Лента подписок недоступна: %s", exc)
+            return None
+        finally:
+            session.close()
+
+        if not items:
+            logger.debug("Лента подписок пуста или не распознана: %s", FOLLOW_FEED_URL)
+            return None
+        return items
+
+    # -- Внутренние методы -----------------------------------------------------
+
+    @staticmethod
+    def _page_url(page: int) -> str:
+        if page == 1:
+            return FOLLOW_FEED_URL
+        return f"{FOLLOW_FEED_URL.rstrip('/')}/page/{page}/"
+
+    def _get_page(self, session: curl_cffi.Session, page: int) -> str | None:
+        url = self._page_url(page)
+        response = session.get(
+            url,
+            impersonate="chrome",
+            timeout=host_timeouts.stream_timeout(url),
+        )
+        if page > 1 and response.status_code == 404:
+            return None
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}")
+        if "/login" in str(response.url):
+            raise RuntimeError("требуется авторизация")
+        return response.text
+
+    @staticmethod
+    def _parse_page(page_html: str) -> dict[str, FeedItem]:
+        """Карточки тайтлов страницы: от ссылки на тайтл до ссылки на следующий."""
+        links = [
+            (m.start(), _absolute(m.group(1)))
+            for m in _MANGA_LINK_RE.finditer(page_html)
+        ]
+        items: dict[str, FeedItem] = {}
+        for i, (start, url) in enumerate(links):
+            if url in items:
+                continue
+            # Карточка тайтла тянется до первой ссылки на другой тайтл.
+            end = len(page_html)
+            for next_start, next_url in links[i + 1:]:
+                if next_url != url:
+                    end = next_start
+                    break
+            items[url] = FeedItem(url, _marker(page_html[start:end]))
+        return items
+
+
+def _absolute(url: str) -> str:
+    return url if url.startswith("http") else BASE_URL + url
+
+
+def _marker(card_html: str) -> str | None:
+    text = html.unescape(_TAG_RE.sub(" ", card_html))
+    marks = [" ".join(m.lower().split()) for m in _UPDATE_MARK_RE.findall(text)]
+    if not marks:
+        return None
+    return hashlib.sha1("|".join(marks).encode("utf-8")).hexdigest()[:16]
@@ -0,0 +1,66 @@
+"""
+Модели данных манги: главы, разобранная страница и сводка для проверок.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+
+class Chapter:
+    """Глава манги: только то, что нужно для скачивания.
+
+    *ordinal* -- порядковый номер на сайте, с 1 от первой главы.
+    """
+
+    __slots__ = ("id", "title", "ordinal")
+
+    def __init__(self, id: str, title: str, ordinal: int) -> None:
+        self.id = id
+        self.title = title
+        self.ordinal = ordinal
+
+    def __repr__(self) -> str:
+        return f"Chapter(id={self.id!r}, title={self.title!r}, ordinal={self.ordinal})"
+
+    def __getstate__(self) -> tuple[str, str, int]:
+        return self.id, self.title, self.ordinal
+
+    def __setstate__(self, state: tuple[str, str, int]) -> None:
+        self.id, self.title, self.ordinal = state
+
+
+@dataclass
+class MangaInfo:
+    """Результат парсинга страницы манги."""
+
+    title: str
+    news_id: str
+    chapters: list[Chapter]  # от первой к последней, chapters[i].ordinal == i + 1
+
+    @property
+    def total_chapters(self) -> int:
+        return len(self.chapters)
+
+    def between(self, start: int, end: int) -> list[Chapter]:
+        """Главы с порядковыми номерами от *start* до *end* включительно."""
+        return self.chapters[max(0, start - 1):max(0, end)]
+
+
+@dataclass(frozen=True)
+class MangaSummary:
+    """Сводка для проверки обновлений: счётчик и ID глав без остальных полей."""
+
+    title: str
+    news_id: str
+    total_chapters: int
+    chapter_ids: tuple[str, ...]  # от первой главы к последней
+
+    @classmethod
+    def of(cls, info: MangaInfo) -> MangaSummary:
+        return cls(
+            title=info.title,
+            news_id=info.news_id,
+            total_chapters=info.total_chapters,
+            chapter_ids=tuple(ch.id for ch in info.chapters),
+        )
@@ -0,0 +1,80 @@
+"""
+Фоновый разбор страниц манги, открытых в браузере.
+
+Пока пользователь переходит между тайтлами, их страницы разбираются в
+небольшом пуле потоков, а не в цикле событий браузера: быстрые переходы
+не выстраиваются в очередь, и нажатие «Скачать» не ждёт разбора чужих
+страниц. Результаты хранятся по URL, так что к нажатию метаданные
+обычно уже готовы.
+"""
+
+from __future__ import annotations
+
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+
+from manga_downloader.config import PAGE_ANALYSIS_WORKERS
+from manga_downloader.cookies import CookieManager
+from manga_downloader.manga.parser import MangaInfo, ParserPool
+
+logger = logging.getLogger(__name__)
+
+
+class PageAnalyzer:
+    """Пул разбора страниц с кэшем результатов (futures) по URL."""
+
+    def __init__(self, cookie_manager: CookieManager, workers: int = PAGE_ANALYSIS_WORKERS) -> None:
+        self._parsers = ParserPool(cookie_manager)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="page-analyzer")
+        self._futures: dict[str, Future[MangaInfo | None]] = {}
+        self._lock = Lock()
+
+    # -- Публичный интерфейс ---------------------------------------------------
+
+    def prefetch(self, url: str) -> Future[MangaInfo | None] | None:
+        """Начинает разбор *url* в фоне. ``None``, если он уже начат или готов.
+
+        Ещё не начатые разборы других страниц отменяются: пользователь с
+        них уже ушёл, и они только задержали бы разбор текущей.
+        """
+        with self._lock:
+            if url in self._futures:
+                return None
+            for other, pending in list(self._futures.items()):
+                if pending.cancel():
+                    del self._futures[other]
+            future = self._futures[url] = self._pool.submit(self._analyze, url)
+        return future
+
+    def get(self, url: str) -> MangaInfo | None:
+        """Данные страницы: готовые, дожидается идущего разбора или разбирает сам.
+
+        Разбор, который ещё ждёт в очереди пула, отменяется и выполняется
+        в вызывающем потоке -- без ожидания чужих страниц. Неудачный прошлый
+        разбор повторяется.
+        """
+        with self._lock:
+            future = self._futures.get(url)
+            if future is not None and (
+                future.cancel() or (future.done() and future.result() is None)
+            ):
+                del self._futures[url]
+                future = None
+        if future is not None:
+            return future.result()
+        return self._analyze(url)
+
+    def close(self) -> None:
+        """Отменяет неначатые разборы, дожидается идущих и закрывает сессии."""
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        self._parsers.close()
+
+    # -- Внутренние методы -----------------------------------------------------
+
+    def _analyze(self, url: str) -> MangaInfo | None:
+        try:
+            return self._parsers.get().fetch(url)
+        except Exception as exc:
+            logger.debug("Разбор страницы %s не удался: %s", url, exc)
+            return None
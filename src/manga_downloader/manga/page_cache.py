@@ -0,0 +1,190 @@
+"""
+Постоянный кэш страниц манги: валидаторы HTTP и разобранные данные.
+
+Для каждого URL хранятся ``ETag``/``Last-Modified`` последнего ответа и
+разобранный :class:`MangaInfo`. Парсер шлёт условный GET, и на ``304``
+данные берутся отсюда без скачивания и разбора страницы, а скачивание
+из библиотеки переиспользует свежий результат последней проверки.
+
+Кэш лежит в SQLite (WAL), по строке на URL. Строки читаются из базы при
+каждом обращении и в памяти не оседают; :meth:`PageCache.flush` пишет
+только изменившиеся -- а не весь кэш со списками глав каждого тайтла.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Any
+
+from manga_downloader.config import PAGE_CACHE_DB
+from manga_downloader.manga.models import Chapter, MangaInfo
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    checked_at REAL NOT NULL,
+    title TEXT NOT NULL,
+    news_id TEXT NOT NULL,
+    chapters TEXT NOT NULL
+)
+"""
+
+_BUSY_TIMEOUT = 10  # секунд ожидания, пока другой процесс держит запись
+
+
+class PageCache:
+    """SQLite-таблица ``url -> {валидаторы, время проверки, данные манги}``.
+
+    Потокобезопасен: им одновременно пользуются потоки проверки обновлений.
+    В памяти держатся только ещё не записанные изменения; остальное читается
+    из базы при обращении, так что видны и записи других процессов.
+    Изменения пишутся на диск через :meth:`flush`.
+    """
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path or PAGE_CACHE_DB
+        self._pending: dict[str, dict[str, Any]] = {}  # url -> новая строка
+        self._touched: dict[str, float] = {}  # url -> время подтверждения (304)
+        self._lock = Lock()
+        self._conn: sqlite3.Connection | None = None
+
+    # -- Публичный интерфейс ---------------------------------------------------
+
+    def validators(self, url: str) -> dict[str, str]:
+        """Заголовки условного запроса для *url* (пусто, если кэша нет)."""
+        with self._lock:
+            entry = self._pending.get(url)
+            if entry is not None:
+                etag, last_modified = entry["etag"], entry["last_modified"]
+            else:
+                row = self._select("etag, last_modified", url)
+                if row is None:
+                    return {}
+                etag, last_modified = row
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def get(self, url: str, max_age: float | None = None) -> MangaInfo | None:
+        """Данные манги из кэша; с *max_age* -- только проверенные недавно."""
+        with self._lock:
+            entry = self._pending.get(url)
+            if entry is not None:
+                checked_at, title, news_id, chapters = (
+                    entry["checked_at"], entry["title"], entry["news_id"], entry["chapters"],
+                )
+            else:
+                row = self._select("checked_at, title, news_id, chapters", url)
+                if row is None:
+                    return None
+                checked_at, title, news_id, chapters = row
+                checked_at = max(checked_at, self._touched.get(url, 0.0))
+        if max_age is not None and time.time() - checked_at > max_age:
+            return None
+        if isinstance(chapters, str):  # строка из базы, а не ожидающая записи
+            chapters = json.loads(chapters)
+        return MangaInfo(
+            title=title,
+            news_id=news_id,
+            chapters=[
+                Chapter(chapter_id, chapter_title, ordinal)
+                for ordinal, (chapter_id, chapter_title) in enumerate(chapters, 1)
+            ],
+        )
+
+    def store(
+        self,
+        url: str,
+        info: MangaInfo,
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ) -> None:
+        """Запоминает свежеразобранную страницу и её валидаторы."""
+        with self._lock:
+            self._pending[url] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "checked_at": time.time(),
+                "title": info.title,
+                "news_id": info.news_id,
+                "chapters": [[ch.id, ch.title] for ch in info.chapters],
+            }
+            self._touched.pop(url, None)
+
+    def touch(self, url: str) -> None:
+        """Отмечает, что страница подтверждена сервером (ответ ``304``)."""
+        with self._lock:
+            entry = self._pending.get(url)
+            if entry is not None:
+                entry["checked_at"] = time.time()
+            else:
+                self._touched[url] = time.time()
+
+    def flush(self) -> bool:
+        """Пишет изменившиеся строки на диск. Возвращает ``True`` при успехе."""
+        with self._lock:
+            if not self._pending and not self._touched:
+                return True
+            rows = [
+                (url, e["etag"], e["last_modified"], e["checked_at"], e["title"],
+                 e["news_id"], json.dumps(e["chapters"], ensure_ascii=False))
+                for url, e in self._pending.items()
+            ]
+            try:
+                conn = self._connect()
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO pages"
+                        " (url, etag, last_modified, checked_at, title, news_id, chapters)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        rows,
+                    )
+                    conn.executemany(
+                        "UPDATE pages SET checked_at = MAX(checked_at, ?) WHERE url = ?",
+                        [(checked_at, url) for url, checked_at in self._touched.items()],
+                    )
+                self._pending.clear()
+                self._touched.clear()
+                return True
+            except Exception as exc:
+                logger.error("Не удалось сохранить кэш страниц: %s", exc)
+                return False
+
+    # -- Внутренние методы -----------------------------------------------------
+
+    def _select(self, columns: str, url: str) -> tuple[Any, ...] | None:
+        """Колонки строки *url* из базы (``None``, если её нет или база недоступна)."""
+        try:
+            return self._connect().execute(
+                f"SELECT {columns} FROM pages WHERE url = ?", (url,),
+            ).fetchone()
+        except Exception as exc:
+            logger.error("Не удалось прочитать кэш страниц: %s", exc)
+            return None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Соединение делят потоки пула; доступ к нему -- под self._lock.
+            conn = sqlite3.connect(self.path, timeout=_BUSY_TIMEOUT, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+
+# Общий кэш процесса: его делят все экземпляры MangaParser.
+page_cache = PageCache()
@@ -0,0 +1,130 @@
+"""
+События страниц браузера без опроса ``current_url``.
+
+Через CDP ``Page.addScriptToEvaluateOnNewDocument`` в каждую страницу
+ставится мост: он сообщает об открытии страницы (в том числе о смене URL
+через History API), сам заменяет кнопку «Отслеживать» на «Скачать», как
+только её добавит ``MutationObserver``, и ловит нажатие на неё. События
+копятся в очереди страницы, а :meth:`PageEvents.next` забирает их одним
+``execute_async_script``, который ждёт внутри браузера (long-poll): пока
+на странице ничего не происходит, запросов к WebDriver почти нет.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from selenium import webdriver
+from selenium.common.exceptions import JavascriptException, TimeoutException
+
+from manga_downloader.config import BROWSER_EVENT_WAIT
+
+# --- Типы событий ---
+PAGE_OPENED = "page"         # открыта страница (url)
+PAGE_BUTTON = "button"       # кнопка «Скачать» поставлена на страницу (url)
+PAGE_DOWNLOAD = "download"   # запрошено скачивание манги (url без /download)
+
+_SCRIPT_TIMEOUT_MARGIN = 5  # секунд сверх ожидания внутри страницы
+
+_BRIDGE_JS = """
+(() => {
+  if (window.__mdBridge) return;
+  const queue = [];
+  let waiter = null;
+  const flush = () => {
+    if (waiter && queue.length) {
+      const done = waiter;
+      waiter = null;
+      done(queue.splice(0));
+    }
+  };
+  const push = (kind, url) => { queue.push({kind: kind, url: url}); flush(); };
+  const here = () => location.href.split('#')[0];
+  const downloadRe = /\\/download\\/?$/;
+
+  window.__mdBridge = {
+    wait(done, ms) {
+      waiter = done;
+      flush();
+      setTimeout(() => {
+        if (waiter === done) { waiter = null; done([]); }
+      }, ms);
+    },
+  };
+
+  const report = () => {
+    const url = here();
+    if (downloadRe.test(url)) push('download', url.replace(downloadRe, ''));
+    else push('page', url);
+  };
+  for (const name of ['pushState', 'replaceState']) {
+    const original = history[name];
+    history[name] = function () {
+      const result = original.apply(this, arguments);
+      report();
+      return result;
+    };
+  }
+  window.addEventListener('popstate', report);
+  report();
+
+  const decorate = () => {
+    const btn = document.querySelector('a.page__btn-sec.js-follow-status:not([data-md-download])');
+    if (!btn) return;
+    btn.dataset.mdDownload = '1';
+    btn.textContent = '⬇️ Скачать';
+    Object.assign(btn.style, {
+      backgroundColor: '#28a745', color: '#fff', fontWeight: 'bold',
+      padding: '10px 20px', borderRadius: '5px', cursor: 'pointer',
+    });
+    btn.addEventListener('click', (event) => {
+      event.preventDefault();
+      event.stopImmediatePropagation();
+      push('download', here());
+    }, true);
+    push('button', here());
+  };
+  new MutationObserver(decorate).observe(document, {childList: true, subtree: true});
+  decorate();
+})();
+"""
+
+_WAIT_JS = """
+const done = arguments[arguments.length - 1];
+if (window.__mdBridge) window.__mdBridge.wait(done, arguments[0]);
+else setTimeout(() => done([]), arguments[0]);
+"""
+
+
+@dataclass(frozen=True)
+class PageEvent:
+    kind: str
+    url: str
+
+
+class PageEvents:
+    """Мост событий страниц одного окна Chrome."""
+
+    def __init__(self, driver: webdriver.Chrome, wait: float = BROWSER_EVENT_WAIT) -> None:
+        self._driver = driver
+        self._wait = wait
+
+    def install(self) -> None:
+        """Ставит мост во все следующие документы и в текущий."""
+        self._driver.execute_cdp_cmd(
+            "Page.addScriptToEvaluateOnNewDocument", {"source": _BRIDGE_JS},
+        )
+        self._driver.execute_script(_BRIDGE_JS)
+        self._driver.set_script_timeout(self._wait + _SCRIPT_TIMEOUT_MARGIN)
+
+    def next(self) -> list[PageEvent]:
+        """События страницы; ждёт их не дольше *wait* секунд.
+
+        Пустой список -- событий не было или документ сменился посреди
+        ожидания (события нового документа придут следующим вызовом).
+        """
+        try:
+            raw = self._driver.execute_async_script(_WAIT_JS, int(self._wait * 1000))
+        except (JavascriptException, TimeoutException):
+            return []
+        return [PageEvent(e["kind"], e["url"]) for e in raw or []]
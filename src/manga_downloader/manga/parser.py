@@ -2,38 +2,53 @@
 Парсинг данных манги из HTML-страницы com-x.life.
 
 Извлекает ``window.__DATA__`` и возвращает список глав, название и news_id.
+Страница читается потоком: соединение закрывается, как только объект
+``window.__DATA__`` закрылся, остаток HTML не скачивается и не сканируется.
 """
 
 from __future__ import annotations
 
+import codecs
 import json
 import logging
 import re
-from dataclasses import dataclass
+import time
+from threading import Lock, local
 from typing import Any
 
 import curl_cffi
 
-from manga_downloader.config import BROWSE_HEADERS, HTTP_TIMEOUT
+try:  # опционально: orjson в разы быстрее на страницах с тысячами глав
+    import orjson
+except ImportError:
+    orjson = None
+
+from manga_downloader.config import BROWSE_HEADERS
 from manga_downloader.cookies import CookieManager
+from manga_downloader.manga.models import Chapter, MangaInfo, MangaSummary
+from manga_downloader.manga.page_cache import page_cache
+from manga_downloader.metrics import host_timeouts
+from manga_downloader.single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
-_DATA_RE = re.compile(r"window\.__DATA__\s*=\s*({.*?})\s*;", re.DOTALL)
+_DATA_START_RE = re.compile(r"window\.__DATA__\s*=\s*(?={)")
+_JSON_TOKEN_RE = re.compile(r'[{}"]')
+_STRING_TOKEN_RE = re.compile(r'["\\]')
 _NEWS_ID_RE = re.compile(r"/(\d+)-")
 
+# Одна страница -- один запрос, сколько бы парсеров её ни ждали
+# (проверка обновлений, мониторинг браузера, скачивание из библиотеки).
+_page_flights: SingleFlight[MangaInfo | None] = SingleFlight()
 
-@dataclass
-class MangaInfo:
-    """Результат парсинга страницы манги."""
+_CHUNK_SIZE = 16 * 1024
+_MARKER_TAIL = 64  # хвост буфера на случай маркера, разрезанного между кусками
 
-    title: str
-    news_id: str
-    chapters: list[dict[str, Any]]
 
-    @property
-    def total_chapters(self) -> int:
-        return len(self.chapters)
+def _loads(raw: str) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
 
 
 class MangaParser:
@@ -50,25 +65,35 @@ class MangaParser:
             self._session.headers.update(BROWSE_HEADERS)
             if use_cookies:
                 self._cookie_manager.apply_to_session(self._session)
+        elif use_cookies:
+            self._cookie_manager.sync_session(self._session)
         return self._session
 
     def close(self) -> None:
-        """Закрывает сессию."""
+        """Закрывает сессию и сохраняет кэш страниц."""
         if self._session is not None:
             self._session.close()
             self._session = None
+        page_cache.flush()
 
-    def fetch(self, url: str) -> MangaInfo | None:
+    def fetch(self, url: str, max_age: float | None = None) -> MangaInfo | None:
         """Загружает страницу и парсит данные манги.
 
+        Если задан *max_age* и страница проверялась не раньше, чем
+        *max_age* секунд назад, данные берутся из кэша без запроса.
         Пробует сначала с cookies, затем без них (curl_cffi может
         самостоятельно пройти Cloudflare challenge).
         Возвращает ``None`` при ошибке.
         """
+        if max_age is not None:
+            cached = page_cache.get(url, max_age=max_age)
+            if cached is not None:
+                logger.debug("Данные %s взяты из кэша страниц", url)
+                return cached
+
         for use_cookies in (True, False):
             try:
-                html = self._fetch_html(url, use_cookies=use_cookies)
-                result = self._parse_html(html, url)
+                result = self._fetch_info(url, use_cookies=use_cookies)
                 if result:
                     return result
             except Exception as exc:
@@ -76,40 +101,196 @@ class MangaParser:
                 logger.debug("Попытка %s не удалась для %s: %s", label, url, exc)
         return None
 
-    def fetch_quick(self, url: str, timeout: int = 10) -> MangaInfo | None:
-        """Быстрая проверка: одна попытка с cookies и коротким таймаутом."""
+    def fetch_quick(self, url: str, timeout: int = 10) -> MangaSummary | None:
+        """Быстрая проверка: одна попытка с cookies и коротким таймаутом.
+
+        Если страница не изменилась (``304``), сводка строится из кэша
+        без скачивания и разбора страницы.
+        """
         try:
-            html = self._fetch_html(url, use_cookies=True, timeout=timeout)
-            return self._parse_html(html, url)
+            info = self._fetch_info(url, use_cookies=True, timeout=timeout)
+            return MangaSummary.of(info) if info else None
         except Exception as exc:
             logger.debug("Быстрая проверка не удалась для %s: %s", url, exc)
             return None
 
-    def _fetch_html(self, url: str, *, use_cookies: bool = True, timeout: int = HTTP_TIMEOUT) -> str:
+    def _fetch_info(
+        self, url: str, *, use_cookies: bool = True, timeout: float | None = None,
+    ) -> MangaInfo | None:
+        """Данные страницы; одновременные запросы одного URL идут одним."""
+        return _page_flights.do(
+            (url, use_cookies),
+            lambda: self._request_info(url, use_cookies=use_cookies, timeout=timeout),
+        )
+
+    def _request_info(
+        self, url: str, *, use_cookies: bool = True, timeout: float | None = None,
+    ) -> MangaInfo | None:
+        """Условный GET страницы с разбором и обновлением кэша."""
         session = self._get_session(use_cookies=use_cookies)
-        response = session.get(url, impersonate="chrome", timeout=timeout)
-        if response.status_code != 200:
-            raise RuntimeError(f"HTTP {response.status_code}")
-        return response.text
+        started = time.monotonic()
+        response = session.get(
+            url,
+            headers=page_cache.validators(url),
+            impersonate="chrome",
+            timeout=timeout or host_timeouts.stream_timeout(url),
+            stream=True,
+        )
+        host_timeouts.record_ttfb(url, time.monotonic() - started)
+        try:
+            if response.status_code == 304:
+                page_cache.touch(url)
+                cached = page_cache.get(url)
+                if cached is None:
+                    raise RuntimeError("HTTP 304 без записи в кэше")
+                return cached
+            if response.status_code != 200:
+                raise RuntimeError(f"HTTP {response.status_code}")
+            info = self._parse_data(self._read_data(response), url)
+            if info is not None:
+                page_cache.store(
+                    url,
+                    info,
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"),
+                )
+            return info
+        finally:
+            response.close()
+
+    @staticmethod
+    def _read_data(response: Any) -> str | None:
+        """Читает ответ потоком до конца ``window.__DATA__``.
+
+        Возвращает JSON-текст объекта или ``None``, если его на странице нет.
+        """
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        scanner = _DataScanner()
+        for chunk in response.iter_content(chunk_size=_CHUNK_SIZE):
+            raw = scanner.feed(decoder.decode(chunk))
+            if raw is not None:
+                return raw
+        return None
 
     @staticmethod
-    def _parse_html(html: str, url: str) -> MangaInfo | None:
-        match = _DATA_RE.search(html)
-        if not match:
+    def _parse_data(raw: str | None, url: str) -> MangaInfo | None:
+        if raw is None:
             logger.debug("Не найден window.__DATA__ на странице %s", url)
             return None
 
-        data = json.loads(match.group(1))
-        chapters = data["chapters"][::-1]  # от первой к последней
+        data = _loads(raw)
+        news_id = _resolve_news_id(data, url)
+        if news_id is None:
+            return None
+
+        raw_chapters = data["chapters"]  # сайт отдаёт от последней к первой
+        total = len(raw_chapters)
+        chapters = [
+            Chapter(str(ch["id"]), ch["title"], total - i)
+            for i, ch in enumerate(raw_chapters)
+        ]
+        chapters.reverse()
         title = data.get("title", "Manga").strip()
+        return MangaInfo(title=title, news_id=news_id, chapters=chapters)
 
-        news_id = data.get("news_id")
-        if not news_id:
-            url_match = _NEWS_ID_RE.search(url)
-            if url_match:
-                news_id = url_match.group(1)
-            else:
-                logger.error("news_id не найден ни в данных, ни в URL: %s", url)
+
+class ParserPool:
+    """Парсеры по одному на поток: keep-alive сессия и TLS-соединение потока
+    переживают страницы. Потокобезопасен; :meth:`close` закрывает все."""
+
+    def __init__(self, cookie_manager: CookieManager) -> None:
+        self._cookie_manager = cookie_manager
+        self._local = local()
+        self._parsers: list[MangaParser] = []
+        self._lock = Lock()
+
+    def get(self) -> MangaParser:
+        """Парсер текущего потока (создаётся при первом обращении)."""
+        parser = getattr(self._local, "parser", None)
+        if parser is None:
+            parser = self._local.parser = MangaParser(self._cookie_manager)
+            with self._lock:
+                self._parsers.append(parser)
+        return parser
+
+    def close(self) -> None:
+        with self._lock:
+            parsers, self._parsers = self._parsers, []
+        for parser in parsers:
+            parser.close()
+
+
+def _resolve_news_id(data: dict[str, Any], url: str) -> str | None:
+    """news_id из данных страницы, а при его отсутствии -- из URL."""
+    news_id = data.get("news_id")
+    if news_id:
+        return str(news_id)
+    url_match = _NEWS_ID_RE.search(url)
+    if url_match:
+        return url_match.group(1)
+    logger.error("news_id не найден ни в данных, ни в URL: %s", url)
+    return None
+
+
+class _DataScanner:
+    """Инкрементально вырезает объект ``window.__DATA__`` из потока HTML.
+
+    До маркера держит только короткий хвост текста. После него считает
+    фигурные скобки с учётом строк JSON, прыгая регуляркой от одного
+    значимого символа к другому, и отдаёт объект, как только тот закрылся.
+    """
+
+    def __init__(self) -> None:
+        self._buf = ""
+        self._pos = 0
+        self._found = False
+        self._depth = 0
+        self._in_string = False
+
+    def feed(self, text: str) -> str | None:
+        """Добавляет кусок HTML. Возвращает JSON-текст, когда объект закрылся."""
+        self._buf += text
+        if not self._found:
+            match = _DATA_START_RE.search(self._buf)
+            if not match:
+                self._buf = self._buf[-_MARKER_TAIL:]
                 return None
+            self._buf = self._buf[match.end():]
+            self._found = True
+        return self._scan()
 
-        return MangaInfo(title=title, news_id=str(news_id), chapters=chapters)
+    def _scan(self) -> str | None:
+        buf = self._buf
+        pos = self._pos
+        while True:
+            if self._in_string:
+                m = _STRING_TOKEN_RE.search(buf, pos)
+                if not m:
+                    pos = len(buf)
+                    break
+                if m.group() == "\\":
+                    if m.end() >= len(buf):
+                        pos = m.start()  # экранируемый символ ещё не пришёл
+                        break
+                    pos = m.end() + 1
+                    continue
+                self._in_string = False
+                pos = m.end()
+                continue
+
+            m = _JSON_TOKEN_RE.search(buf, pos)
+            if not m:
+                pos = len(buf)
+                break
+            pos = m.end()
+            token = m.group()
+            if token == '"':
+                self._in_string = True
+            elif token == "{":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    return buf[:pos]
+        self._pos = pos
+        return None
@@ -0,0 +1,189 @@
+"""
+Скользящая статистика сетевых замеров (задержки, скорости)
+и адаптивные таймауты на её основе.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from collections import deque
+from threading import Lock
+from typing import Iterable
+from urllib.parse import urlsplit
+
+from manga_downloader.config import (
+    METRICS_MIN_SAMPLES,
+    METRICS_WINDOW,
+    STALL_MIN_RATE,
+    STALL_RATE_FRACTION,
+    STALL_WINDOW,
+    TTFB_TIMEOUT_DEFAULT,
+    TTFB_TIMEOUT_FACTOR,
+    TTFB_TIMEOUT_MAX,
+    TTFB_TIMEOUT_MIN,
+)
+
+_MIN_RATE_SAMPLE_BYTES = 256 * 1024
+
+# {"ttfb" | "rates": {хост: замеры}} -- сериализуемый снимок HostTimeouts.
+TimeoutsSnapshot = dict[str, dict[str, list[float]]]
+
+
+class RollingWindow:
+    """Последние *size* замеров с вычислением перцентилей.
+
+    Потокобезопасен: замеры добавляются из потоков загрузки.
+    """
+
+    def __init__(self, size: int, values: Iterable[float] = ()) -> None:
+        self._values: deque[float] = deque(values, maxlen=size)
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def values(self) -> list[float]:
+        """Копия замеров, от старых к новым."""
+        with self._lock:
+            return list(self._values)
+
+    def add(self, value: float) -> None:
+        with self._lock:
+            self._values.append(value)
+
+    def percentile(self, q: float) -> float | None:
+        """Перцентиль *q* (0..1) методом ближайшего ранга; ``None`` без данных."""
+        with self._lock:
+            if not self._values:
+                return None
+            ordered = sorted(self._values)
+        rank = max(1, math.ceil(q * len(ordered)))
+        return ordered[rank - 1]
+
+
+class StallDetector:
+    """Следит, чтобы скорость передачи не падала ниже *min_rate* байт/с.
+
+    Скорость меряется окнами по *window* секунд, поэтому короткие паузы
+    не считаются зависанием.
+    """
+
+    def __init__(self, min_rate: float, window: float = STALL_WINDOW) -> None:
+        self._min_rate = min_rate
+        self._window = window
+        self._mark_time = time.monotonic()
+        self._mark_bytes = 0
+
+    def update(self, total_bytes: int) -> None:
+        """Принимает общее число полученных байт; при зависании -- ``RuntimeError``."""
+        now = time.monotonic()
+        elapsed = now - self._mark_time
+        if elapsed < self._window:
+            return
+        rate = (total_bytes - self._mark_bytes) / elapsed
+        if rate < self._min_rate:
+            raise RuntimeError(
+                f"Передача зависла: {rate / 1024:.1f} KB/s "
+                f"(минимум {self._min_rate / 1024:.1f} KB/s)"
+            )
+        self._mark_time = now
+        self._mark_bytes = total_bytes
+
+
+class HostTimeouts:
+    """Адаптивные таймауты по скользящим замерам для каждого хоста.
+
+    Вместо фиксированных 30/60 секунд: ожидание первого байта -- кратное
+    p95 наблюдаемых TTFB, а длинная передача живёт, пока держит скорость
+    не ниже доли от медианной для этого хоста.
+    """
+
+    def __init__(self, window: int = METRICS_WINDOW) -> None:
+        self._window = window
+        self._ttfb: dict[str, RollingWindow] = {}
+        self._rates: dict[str, RollingWindow] = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def _host(url: str) -> str:
+        return urlsplit(url).netloc.lower()
+
+    def _series(self, table: dict[str, RollingWindow], url: str) -> RollingWindow:
+        host = self._host(url)
+        with self._lock:
+            series = table.get(host)
+            if series is None:
+                series = table[host] = RollingWindow(self._window)
+            return series
+
+    # -- Перенос между процессами ---------------------------------------------
+
+    def snapshot(self) -> TimeoutsSnapshot:
+        """Замеры по хостам -- для передачи в процесс движка и обратно."""
+        with self._lock:
+            tables = {"ttfb": dict(self._ttfb), "rates": dict(self._rates)}
+        return {
+            kind: {host: series.values() for host, series in table.items()}
+            for kind, table in tables.items()
+        }
+
+    def merge(self, snapshot: TimeoutsSnapshot) -> None:
+        """Принимает замеры из снимка; хосты из него заменяют свои окна.
+
+        Движок начинает со снимка GUI-процесса и возвращает его дополненным,
+        так что его окна -- более свежие.
+        """
+        with self._lock:
+            for kind, table in (("ttfb", self._ttfb), ("rates", self._rates)):
+                for host, values in snapshot.get(kind, {}).items():
+                    table[host] = RollingWindow(self._window, values)
+
+    # -- Замеры ----------------------------------------------------------------
+
+    def record_ttfb(self, url: str, seconds: float) -> None:
+        self._series(self._ttfb, url).add(seconds)
+
+    def record_transfer(self, url: str, size: int, seconds: float) -> None:
+        """Запоминает скорость передачи (маленькие файлы не показательны)."""
+        if size >= _MIN_RATE_SAMPLE_BYTES and seconds > 0:
+            self._series(self._rates, url).add(size / seconds)
+
+    # -- Дедлайны --------------------------------------------------------------
+
+    def ttfb_timeout(self, url: str) -> float:
+        """Сколько ждать соединения и первого байта ответа."""
+        series = self._series(self._ttfb, url)
+        if len(series) < METRICS_MIN_SAMPLES:
+            return TTFB_TIMEOUT_DEFAULT
+        p95 = series.percentile(0.95) or 0.0
+        return min(TTFB_TIMEOUT_MAX, max(TTFB_TIMEOUT_MIN, p95 * TTFB_TIMEOUT_FACTOR))
+
+    def min_rate(self, url: str) -> float:
+        """Минимальная допустимая скорость передачи, байт/с."""
+        median = self._series(self._rates, url).percentile(0.5)
+        if median is None:
+            return STALL_MIN_RATE
+        return max(STALL_MIN_RATE, median * STALL_RATE_FRACTION)
+
+    def request_timeout(self, url: str) -> tuple[float, float]:
+        """``(connect, read)`` для коротких запросов (API, HTML)."""
+        ttfb = self.ttfb_timeout(url)
+        return ttfb, ttfb
+
+    def stream_timeout(self, url: str) -> tuple[float, float]:
+        """``(connect, read)`` для потоковых скачиваний.
+
+        Общего лимита нет: большой файл на медленном канале качается сколько
+        нужно, а мёртвое соединение обрывается через окно без данных.
+        """
+        ttfb = self.ttfb_timeout(url)
+        return ttfb, max(ttfb, STALL_WINDOW)
+
+    def stall_detector(self, url: str) -> StallDetector:
+        return StallDetector(self.min_rate(url))
+
+
+# Замеры общие для всех загрузчиков и парсеров процесса. Движок скачивания
+# живёт в своём процессе: замеры переносятся туда и обратно снимками.
+host_timeouts = HostTimeouts()
@@ -0,0 +1,54 @@
+"""
+Ограничитель частоты (token bucket): запросы к сайту и байты загрузки.
+"""
+
+from __future__ import annotations
+
+import time
+from threading import Lock
+
+from manga_downloader.cancellation import CancelToken
+from manga_downloader.config import UPDATE_CHECK_BURST, UPDATE_CHECK_RATE
+
+
+class RateLimiter:
+    """Не больше *rate* операций в секунду со всплеском до *burst*.
+
+    Потокобезопасен: один экземпляр делят все потоки, которые ходят на сайт.
+    """
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self._rate = rate
+        self._burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = Lock()
+
+    def acquire(self, cancel: CancelToken | None = None, amount: float = 1) -> bool:
+        """Ждёт разрешения на *amount* единиц. ``False``, если ожидание отменили.
+
+        Порция больше *burst* пропускается при полном ведре и уводит его
+        в минус: следующие вызовы ждут, пока долг не погасится.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self._burst, self._tokens + (now - self._updated) * self._rate,
+                )
+                self._updated = now
+                need = min(amount, self._burst)
+                if self._tokens >= need:
+                    self._tokens -= amount
+                    return True
+                delay = (need - self._tokens) / self._rate
+            if cancel is not None:
+                if cancel.wait(delay):
+                    return False
+            else:
+                time.sleep(delay)
+
+
+# Один лимит на все фоновые запросы к сайту в процессе: лента подписок
+# и проверки тайтлов, повторный запуск проверки не удваивает нагрузку.
+site_limiter = RateLimiter(UPDATE_CHECK_RATE, UPDATE_CHECK_BURST)
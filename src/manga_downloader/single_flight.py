@@ -0,0 +1,56 @@
+"""
+Схлопывание одновременных одинаковых запросов (single-flight).
+
+Если несколько потоков одновременно просят один и тот же ключ, работу
+выполняет первый, а остальные ждут и получают его результат (или его
+исключение).
+"""
+
+from __future__ import annotations
+
+from threading import Event, Lock
+from typing import Any, Callable, Generic, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight(Generic[T]):
+    """Группа вызовов, в которой на каждый ключ одновременно идёт один."""
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._calls: dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """Выполняет *fn* или присоединяется к уже идущему вызову с *key*."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
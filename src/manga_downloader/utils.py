@@ -1,11 +1,14 @@
 """
-Утилиты: парсинг URL, санитизация имён файлов, валидация ZIP.
+Утилиты: парсинг URL, санитизация имён файлов, валидация ZIP, атомарная запись.
 """
 
+import json
 import os
 import re
+import tempfile
 import zipfile
 from pathlib import Path
+from typing import Any
 
 
 def parse_download_url(raw_url: str) -> str:
@@ -32,3 +35,25 @@ def validate_zip_file(path: Path) -> bool:
 def get_file_size_kb(path: Path) -> float:
     """Возвращает размер файла в килобайтах."""
     return os.path.getsize(path) / 1024
+
+
+def atomic_write_json(path: Path, data: Any, **dump_kwargs: Any) -> None:
+    """Пишет JSON во временный файл рядом с *path* и атомарно подменяет его.
+
+    Падение посреди записи оставляет на диске прежнюю версию файла,
+    а не обрезанную.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(data, fh, **dump_kwargs)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,55 @@
+"""Регрессионные тесты истории, которую делят несколько процессов."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from manga_downloader.history import DownloadHistory
+
+
+def _pair(tmp_path: Path) -> tuple[DownloadHistory, DownloadHistory]:
+    db = tmp_path / "history.db"
+    legacy = tmp_path / "missing.json"
+    return DownloadHistory(db, legacy), DownloadHistory(db, legacy)
+
+
+def test_noop_flush_does_not_hide_other_process_update(tmp_path: Path) -> None:
+    a, b = _pair(tmp_path)
+    a.upsert("u", "Title", "1", [1, 2, 3], "u.cbz", total_on_site=5)
+    assert a.flush()
+    b.refresh()
+
+    # Сброс без записанных строк не должен «занять» номер ревизии.
+    b.update_total("u", 5)
+    assert b.flush()
+
+    a.update_total("u", 7)
+    assert a.flush()
+    assert b.refresh() == {"u"}
+
+    b.set_auto_sync("u", True)
+    assert b.flush()
+
+    fresh = DownloadHistory(tmp_path / "history.db", tmp_path / "missing.json")
+    entry = fresh.get("u")
+    assert entry["last_known_total"] == 7
+    assert entry["auto_sync"] is True
+
+
+def test_revision_is_not_reused_after_delete(tmp_path: Path) -> None:
+    a, b = _pair(tmp_path)
+    a.upsert("u1", "One", "1", [1], "1.cbz")
+    assert a.flush()
+    a.upsert("u2", "Two", "2", [1], "2.cbz")
+    assert a.flush()
+    b.refresh()
+
+    # Удаление записи с наибольшей ревизией не возвращает номер в оборот.
+    a.delete("u2")
+    assert a.flush()
+    a.upsert("u3", "Three", "3", [1], "3.cbz")
+    assert a.flush()
+
+    assert "u3" in b.refresh()
+    assert b.get("u3") is not None
+    assert b.get("u2") is None